@@ -8,21 +8,72 @@ API docs: https://projects.propublica.org/api-docs/campaign-finance/
 __author__ = "Oluseyi Sonaiya (oluseyi@oluseyi.info)"
 __version__ = "0.1.0"
 
+import importlib
 import os
 
-from .client import Client
-from .utils import CampaignFinanceError, NotFound, CURRENT_CYCLE
+import six
 
-# subclients
-from candidates import CandidatesClient
-from committees import CommitteesClient
-from electioneering import ElectioneeringClient
-from filings import FilingsClient
-from independent_spending import IndependentSpendingClient
-from presidential import PresidentialClient
+from .batch import BatchResult, WorkerPool
+from .cache import FOREVER, ResponseCache
+from .ratelimit import RateLimiter, RetryPolicy, INTERACTIVE, NORMAL, BACKGROUND
+from .singleflight import SingleFlight
+from .stats import Stats
+from .client import Client, Subclient
+from .utils import CampaignFinanceError, NotFound, QuotaExceeded, CURRENT_CYCLE
 
+# imported on first use, so that importing the package stays fast
+LAZY = {
+    'AsyncCampaignFinance': '.aio',
+    'Store': '.store',
+    'Sync': '.sync',
+    'Feed': '.sync',
+    'Change': '.sync',
+    'RaceMatrix': '.races',
+    'LeadersMatrix': '.leaders',
+    'AmendmentIndex': '.amendments',
+    'EntityGraph': '.graph',
+    'NameIndex': '.names',
+    'History': '.history',
 
-__all__ = ('CampaignFinance', 'CampaignFinanceError', 'NotFound', 'CURRENT_CYCLE')
+    # typed records
+    'Candidate': '.records',
+    'Committee': '.records',
+    'ElectioneeringCommunication': '.records',
+    'Filing': '.records',
+    'IndependentExpenditure': '.records',
+    'LateContribution': '.records',
+
+    # subclients
+    'CandidatesClient': '.candidates',
+    'CommitteesClient': '.committees',
+    'ElectioneeringClient': '.electioneering',
+    'FilingsClient': '.filings',
+    'IndependentSpendingClient': '.independent_spending',
+    'PresidentialClient': '.presidential',
+}
+
+
+def __getattr__(name):
+    module = LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY))
+
+
+__all__ = ('CampaignFinance', 'AsyncCampaignFinance', 'BatchResult', 'WorkerPool', 'ResponseCache',
+           'RateLimiter', 'RetryPolicy', 'INTERACTIVE', 'NORMAL', 'BACKGROUND', 'SingleFlight', 'Stats', 'Store',
+           'Sync', 'Feed', 'Change', 'History', 'FOREVER', 'RaceMatrix', 'LeadersMatrix',
+           'AmendmentIndex', 'EntityGraph', 'NameIndex',
+           'Candidate', 'Committee', 'ElectioneeringCommunication', 'Filing',
+           'IndependentExpenditure', 'LateContribution',
+           'CampaignFinanceError', 'NotFound', 'QuotaExceeded', 'CURRENT_CYCLE')
 
 
 class CampaignFinance(Client):
@@ -30,6 +81,7 @@ class CampaignFinance(Client):
     Implements the public interface for the ProPublica Campaign Finance API
 
     Methods are namespaced by topic (though some have multiple access points).
+    Each namespace is built the first time it is used.
     Everything returns decoded JSON, with fat trimmed.
 
     In addition, the top-level namespace is itself a client, which
@@ -44,16 +96,89 @@ class CampaignFinance(Client):
     By default, it uses `httplib2.FileCache <https://httplib2.readthedocs.io/en/latest/libhttplib2.html#httplib2.FileCache>`_,
     in a directory called ``.cache``, but it should also work with memcache
     or anything else that exposes the same interface as FileCache (per httplib2 docs).
+    Pass a ``ResponseCache`` instead for a tiered cache of decoded results,
+    with per-endpoint TTLs and a bounded size. Its results are shared by
+    every caller that gets them, so treat them as read-only and copy one
+    before changing it.
+
+    Batch methods such as ``fetch_many`` and ``candidates.get_many`` share
+    one pool of ``workers`` threads, each with its own connection.
+
+    All subclients share one ``RateLimiter`` (by default, 5,000 requests
+    a day, ProPublica's daily quota, at up to 5 a second) and ``RetryPolicy``.
+    Pass ``False`` for either to turn it off. Clients sharing a limiter
+    are served by ``priority``.
+
+    Concurrent requests for the same URL, from any subclient or thread,
+    are coalesced into one through a shared ``SingleFlight``, whose
+    counters show how many calls were saved.
+
+    With ``records=True``, results come back as compact typed records
+    (``Candidate``, ``Committee``, ``Filing`` and so on) instead of dicts.
+
+    Pass a ``Store`` (or a path for one) as ``store`` to keep a local,
+    indexed copy of every record fetched. Fresh responses are answered from
+    it, and ``query`` methods on the subclients search it without requests.
+
+    ``base_uri`` sends requests somewhere other than ProPublica, such as the
+    local stand-in API in ``mock_api.py``, for tests and benchmarks.
+
+    Pass a ``Stats`` to record, per endpoint, request counts and latency,
+    bytes received, cache hits and misses, decode time and errors, and
+    export them with ``stats.to_prometheus()``. Without one, none of it
+    is measured.
     """
 
-    def __init__(self, apikey=None, cache='.cache', http=None):
+    def __init__(self, apikey=None, cache='.cache', http=None, workers=8,
+                 limiter=None, retry=None, priority=NORMAL, singleflight=None, records=False, store=None,
+                 base_uri=None, stats=None):
         if apikey is None:
             apikey = os.environ.get('PROPUBLICA_API_KEY')
 
-        super(CampaignFinance, self).__init__(apikey, cache, http)
-        self.candidates = CandidatesClient(self.apikey, cache, self.http)
-        self.committees = CommitteesClient(self.apikey, cache, self.http)
-        self.electioneering = ElectioneeringClient(self.apikey, cache, self.http)
-        self.filings = FilingsClient(self.apikey, cache, self.http)
-        self.independent_spending = IndependentSpendingClient(self.apikey, cache, self.http)
-        self.presidential = PresidentialClient(self.apikey, cache, self.http)
+        if limiter is None:
+            limiter = RateLimiter(rate=5, daily=5000)
+        if retry is None:
+            retry = RetryPolicy()
+        if singleflight is None:
+            singleflight = SingleFlight()
+        if isinstance(store, six.string_types):
+            from .store import Store
+            store = Store(store)
+
+        pool = WorkerPool(workers, None if isinstance(cache, ResponseCache) else cache)
+        super(CampaignFinance, self).__init__(
+            apikey, cache, http, pool, limiter or None, retry or None, priority,
+            singleflight or None, records, store, base_uri, stats)
+        self._cache = cache
+
+    # subclients are built, and their modules imported, on first access
+    candidates = Subclient('.candidates', 'CandidatesClient')
+    committees = Subclient('.committees', 'CommitteesClient')
+    electioneering = Subclient('.electioneering', 'ElectioneeringClient')
+    filings = Subclient('.filings', 'FilingsClient')
+    independent_spending = Subclient('.independent_spending', 'IndependentSpendingClient')
+    presidential = Subclient('.presidential', 'PresidentialClient')
+
+    def subclient_args(self):
+        "Arguments for each subclient, which share this client's connection, pool, limiter and so on"
+        shared = dict(pool=self.pool, limiter=self.limiter, retry=self.retry, priority=self.priority,
+                      singleflight=self.singleflight, records=self.records, store=self.store,
+                      base_uri=self.BASE_URI, stats=self.stats)
+        return (self.apikey, self._cache, self.http), shared
+
+    def sync(self, state=None, feeds=None, window=5000, cycle=CURRENT_CYCLE):
+        """
+        Return a Sync: a change feed of new filings, amendments, late contributions
+        and committees, which fetches only what is past each feed's high-water mark.
+        ``state`` is a JSON file path to keep marks across runs.
+        """
+        from .sync import Sync
+        return Sync(self, feeds, state, window, cycle)
+
+    def graph(self, cycle=CURRENT_CYCLE):
+        """
+        Return an EntityGraph: committees, candidates and races in a cycle, linked by
+        independent spending, which fetches each one's spending the first time it is asked about
+        """
+        from .graph import EntityGraph
+        return EntityGraph(self, cycle)
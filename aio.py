@@ -0,0 +1,497 @@
+"""
+Asynchronous clients, built on `aiohttp <https://docs.aiohttp.org/>`_
+
+Every subclient has an async counterpart with awaitable methods of the same
+names, returning the same parsed results and raising the same exceptions::
+
+    >>> import asyncio
+    >>> from campaign_finance import AsyncCampaignFinance
+    >>> async def main(ids):
+    ...     async with AsyncCampaignFinance(limit=50) as client:
+    ...         return await asyncio.gather(*[client.committees.get(i) for i in ids])
+
+Methods that yield results in the blocking client, such as ``get_many``,
+``fetch_many``, ``stream``, the ``iter_`` listings and the ``by_date_range``
+sweeps, are async generators here, for use with ``async for``; their
+requests run concurrently on the event loop. Those that return one table,
+such as ``presidential.sweep_states``, are awaited like any other method.
+
+All subclients share one connection pool, and no more than ``limit``
+requests are in flight at once, no matter how many coroutines are waiting.
+"""
+import asyncio
+import collections
+import os
+import time
+
+import six
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .batch import BatchResult
+from .cache import FOREVER, LRUCache
+from .client import Client, Subclient, _stream_results, all_results, first_result, ijson, log, page_path
+from .geo import state_for_zip
+from .history import History, history_cycles
+from .ratelimit import NORMAL, RateLimiter, RetryPolicy
+from .singleflight import SingleFlight
+from .store import Store
+from .sweep import day_path, resume, sweep_key
+from .utils import CURRENT_CYCLE, NotFound
+from .candidates import CandidatesClient
+from .committees import CommitteesClient
+from .electioneering import ElectioneeringClient
+from .amendments import AmendmentIndex
+from .filings import FilingsClient
+from .independent_spending import IndependentSpendingClient
+from .presidential import PresidentialClient
+
+
+class AsyncHttp(object):
+    """
+    A keep-alive aiohttp session that caps the number of requests in flight.
+
+    Mirrors ``httplib2.Http.request``, except that ``request`` is a coroutine.
+    The session is opened lazily, inside whichever event loop first uses it.
+    """
+
+    def __init__(self, limit=20, timeout=30, session=None):
+        if aiohttp is None:
+            raise ImportError("Async clients require aiohttp: pip install aiohttp")
+
+        self.limit = limit
+        self.timeout = timeout
+        self.session = session
+        self._semaphore = None
+
+    async def request(self, url, headers=None):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        async with self._semaphore:
+            async with self.session.get(url, headers=headers) as resp:
+                content = await resp.read()
+
+        return resp, content
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+class AsyncClient(Client):
+    """
+    Asynchronous base client. ``fetch`` is a coroutine; response handling,
+    caching, rate limiting, retries and coalescing work as in the blocking client.
+    """
+
+    def __init__(self, apikey=None, http=None, limit=20, cache=None,
+                 limiter=None, retry=None, priority=NORMAL, singleflight=None, records=False, store=None,
+                 base_uri=None, stats=None):
+        self.apikey = apikey
+        if base_uri:
+            self.BASE_URI = base_uri.rstrip('/') + '/'
+        self.cache = cache
+        self.limiter = limiter
+        self.retry = retry
+        self.priority = priority
+        self.singleflight = singleflight
+        self.records = records
+        self.store = store
+        self.stats = stats
+        self.closed = LRUCache(4096)
+        self.names = {}
+
+        if isinstance(http, AsyncHttp):
+            self.http = http
+        else:
+            self.http = AsyncHttp(limit)
+
+    async def fetch(self, path, parse=first_result, record=None, ttl=None, fresh=False):
+        "Make an API request, with authentication, without blocking the event loop; see ``Client.fetch``"
+        url = self.BASE_URI + path
+        content = None if fresh else self.lookup(path, url, record, ttl)
+        if content is not None and self.stats is not None:
+            self.stats.cache(path, True)
+
+        if content is None and self.singleflight is not None:
+            content = await self.singleflight.do_async(url, lambda: self.load(path, url, record, ttl, fresh))
+        elif content is None:
+            content = await self.load(path, url, record, ttl, fresh)
+
+        return self.result(content, parse, record)
+
+    async def load(self, path, url, record=None, ttl=None, fresh=False):
+        """
+        Request a URL and return its decoded response, before parsing, saving its records to the Store.
+        An expired ResponseCache entry is revalidated with a conditional request, and served on 304.
+        """
+        stale = self.cache.stale(url) if self.cache is not None else None
+
+        log.debug(url)
+
+        try:
+            resp, content = await self.request(url, self.headers(stale, fresh))
+            content, served = self.revalidate(path, url, resp, content, stale, ttl)
+        except Exception as e:
+            if self.stats is not None:
+                self.stats.error(path, e)
+            raise
+
+        if self.stats is not None:
+            self.stats.cache(path, False)
+            self.stats.serve(path, served)
+
+        if self.store is not None and record is not None:
+            self.store.save(path, record.__name__, content.get('results'))
+
+        return content
+
+    async def imap(self, fn, items, ordered=True, window=None):
+        """
+        Await ``fn(item)`` for each item concurrently, yielding a BatchResult
+        per item, in input order or as each one finishes; see ``WorkerPool.imap``.
+        At most ``window`` items (twice the connection ``limit`` by default)
+        are in flight or waiting to be consumed; the rest start as results are
+        taken. Closing the generator cancels whatever is still running.
+        """
+        async def call(item):
+            try:
+                return BatchResult(item, await fn(item), None)
+            except Exception as e:
+                return BatchResult(item, None, e)
+
+        window = window or self.http.limit * 2
+        items = iter(items)
+        pending = collections.OrderedDict()
+
+        def fill():
+            for item in items:
+                pending[asyncio.ensure_future(call(item))] = item
+                if len(pending) >= window:
+                    break
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    task = next(iter(pending))
+                    await asyncio.wait([task])
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    task = next(t for t in pending if t in done)
+
+                del pending[task]
+                result = task.result()
+                fill()
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def collect(self, fn, items, build):
+        "Await ``fn(item)`` for each item concurrently and return ``build(results, errors)``; see ``Client.collect``"
+        results, errors = {}, {}
+        fetched = self.imap(fn, items)
+        try:
+            async for result in fetched:
+                if result.ok:
+                    results[result.key] = result.value or []
+                elif isinstance(result.error, NotFound):
+                    results[result.key] = []
+                else:
+                    errors[result.key] = result.error
+        finally:
+            await fetched.aclose()
+        return build(results, errors)
+
+    async def stream(self, path, record=None):
+        "Yield the items of a response's ``results`` one at a time; see ``Client.stream``"
+        url = self.BASE_URI + path
+        content = self.lookup(path, url, record)
+        if self.stats is not None:
+            self.stats.cache(path, content is not None)
+        if content is not None:
+            for item in self.result(content, all_results, record):
+                yield item
+            return
+
+        log.debug(url)
+
+        resp, body = await self.request(url, self.headers())
+        if self.stats is not None:
+            self.stats.serve(path, len(body))
+
+        if ijson is not None:
+            events = _stream_results(body)
+            status = next(events, None)
+            if status == 'OK':
+                for item in events:
+                    yield self.result(item, None, record)
+                return
+
+        for item in self.handle(path, url, resp, body, all_results):
+            yield self.result(item, None, record)
+
+    async def iter_pages(self, path, page_size=20, record=None, fresh=False):
+        "Yield every result from a paged endpoint, fetching the next page while the caller works; see ``Client.iter_pages``"
+        offset = 0
+        task = asyncio.ensure_future(self.fetch(path, all_results, record, fresh=fresh))
+        try:
+            while task is not None:
+                results = await task
+                if len(results) < page_size:
+                    task = None
+                else:
+                    offset += page_size
+                    task = asyncio.ensure_future(self.fetch(page_path(path, offset), all_results, record, fresh=fresh))
+
+                for result in results:
+                    yield result
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def sweep_dates(self, path, start, end, cycle=None, checkpoint=None, record=None, fresh=False):
+        "Yield every result from a by-date endpoint for each day from start to end, in date order; see ``Client.sweep_dates``"
+        def fetch_day(day):
+            return self.fetch(day_path(path, day, cycle), all_results, record, fresh=fresh)
+
+        key = sweep_key(path, start, end, cycle)
+        checkpoint, days = resume(start, end, checkpoint, key)
+
+        # closed as soon as the sweep stops, so no days are fetched after a break
+        fetched = self.imap(fetch_day, days)
+        try:
+            async for result in fetched:
+                if result.error is not None and not isinstance(result.error, NotFound):
+                    raise result.error
+
+                for item in result.value or ():
+                    yield item
+
+                if checkpoint is not None:
+                    checkpoint.save(key, result.key)
+        finally:
+            await fetched.aclose()
+
+        if checkpoint is not None:
+            checkpoint.clear(key)
+
+    async def fetch_cycle(self, path, cycle, parse=first_result, record=None):
+        "Fetch a path for one cycle, keeping closed cycles for good; see ``Client.fetch_cycle``"
+        if cycle >= CURRENT_CYCLE:
+            return await self.fetch(path, parse, record)
+        if self.cache is not None:
+            return await self.fetch(path, parse, record, FOREVER)
+
+        key = (path, parse, record, self.records)
+        hit = self.closed.get(key)
+        if hit is not None:
+            return hit[0]
+        result = await self.fetch(path, parse, record)
+        self.closed.set(key, result, None, 1)
+        return result
+
+    async def fetch_history(self, fec_id, path, cycles=None, record=None):
+        "Fetch one record in every cycle concurrently and return a History; see ``Client.fetch_history``"
+        cycles = list(cycles or history_cycles())
+        fetched = await asyncio.gather(*[
+            self.fetch_cycle(path.format(cycle=cycle), cycle, first_result, record) for cycle in cycles],
+            return_exceptions=True)
+
+        results = {}
+        for cycle, result in zip(cycles, fetched):
+            if isinstance(result, NotFound):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            results[cycle] = result
+
+        return History(fec_id, cycles, results)
+
+    async def search_names(self, path, query, cycle, record=None, limit=None, local=True):
+        "Answer a name search locally when the index has a match, else from the API; see ``Client.search_names``"
+        index = self.name_index(cycle)
+        if local and index.search(query, 1, False):
+            return index.search(query, limit)
+
+        try:
+            results = await self.fetch(path, all_results, record)
+        except NotFound:
+            results = []
+        index.add(results)
+        if not results and local:
+            return index.search(query, limit)
+        return results[:limit]
+
+    async def request(self, url, headers):
+        """
+        Send a GET request, waiting on the rate limiter and retrying
+        transient failures, without blocking the event loop.
+        """
+        attempt = 0
+        stats = self.stats
+        path = url[len(self.BASE_URI):]
+
+        while True:
+            if self.limiter is not None:
+                waited = time.perf_counter()
+                await self.limiter.acquire_async(self.priority)
+                if stats is not None:
+                    stats.wait(path, time.perf_counter() - waited)
+
+            sent = time.perf_counter()
+            try:
+                resp, content = await self.http.request(url, headers=headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if self.retry is None or not self.retry.should_retry(attempt):
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                if stats is not None:
+                    # aiohttp decompresses bodies, but leaves Content-Length as sent
+                    transferred = int(resp.headers.get('Content-Length', len(content)))
+                    stats.request(path, time.perf_counter() - sent, len(content), resp.status, transferred)
+                if self.limiter is not None:
+                    self.limiter.feedback(resp.status)
+                if self.retry is None or not self.retry.should_retry(attempt, resp.status):
+                    return resp, content
+                delay = self.retry.delay(attempt, resp.headers.get('Retry-After'))
+
+            log.debug("retrying %s in %.2fs", url, delay)
+            if stats is not None:
+                stats.retry(path)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+# subclient methods build a path and return self.fetch(path),
+# so with an async fetch they return awaitables unchanged
+
+class AsyncCandidatesClient(AsyncClient, CandidatesClient):
+    pass
+
+
+class AsyncCommitteesClient(AsyncClient, CommitteesClient):
+    pass
+
+
+class AsyncElectioneeringClient(AsyncClient, ElectioneeringClient):
+    pass
+
+
+class AsyncFilingsClient(AsyncClient, FilingsClient):
+
+    async def latest_by_date_range(self, start, end, cycle=None, checkpoint=None, index=None):
+        "Yield a Version for each filing from start to end that is the latest of its report; see ``FilingsClient``"
+        if index is None:
+            index = AmendmentIndex()
+        filings = self.by_date_range(start, end, cycle, checkpoint)
+        try:
+            async for filing in filings:
+                version = index.add(filing)
+                if version is not None:
+                    yield version
+        finally:
+            await filings.aclose()
+
+
+class AsyncIndependentSpendingClient(AsyncClient, IndependentSpendingClient):
+    pass
+
+
+class AsyncPresidentialClient(AsyncClient, PresidentialClient):
+
+    async def sweep_zips(self, zips, cycle=CURRENT_CYCLE, previous=None, budget=None, states=None):
+        "Fetch totals for ZIP codes concurrently into a PlaceTotals table; see ``PresidentialClient``"
+        zips = list(zips)
+        if states is None:
+            wanted = sorted(set(filter(None, map(state_for_zip, zips))))
+            states = await self.sweep_states(cycle, wanted, budget=budget)
+            if budget is not None:
+                budget = max(0, budget - len(wanted))
+
+        path = "{cycle}/president/zips/{{place}}.json".format(cycle=cycle)
+        table = await self.sweep_places(path, cycle, zips, self.carried_zips(zips, cycle, previous, states), budget)
+        table.states = states
+        return table
+
+    async def sweep_places(self, path, cycle, places, known=None, budget=None):
+        "Fetch a place path template for each place concurrently into a PlaceTotals table; see ``PresidentialClient``"
+        results = dict(known or {})
+        todo = [place for place in places if place not in results]
+        if budget is not None:
+            todo = todo[:budget]
+
+        fetched = self.imap(lambda place: self.fetch(path.format(place=place), all_results), todo, False)
+        try:
+            collected = [result async for result in fetched]
+        finally:
+            await fetched.aclose()
+        return self.tabulate(cycle, places, results, collected)
+
+
+class AsyncCampaignFinance(AsyncClient):
+    """
+    Async counterpart to ``CampaignFinance``, with the same namespaces.
+
+    ``limit`` caps the number of requests in flight across all subclients,
+    which also share an optional ResponseCache, and the same default
+    RateLimiter and RetryPolicy as ``CampaignFinance``; pass ``False`` for
+    either to turn it off. A limiter can be shared with blocking clients, too. Concurrent requests
+    for the same URL are coalesced, unless ``singleflight`` is False, and
+    ``records=True`` returns typed records instead of dicts. A ``store``
+    (a Store, or a path to one) mirrors fetched records locally, and
+    ``stats`` (a Stats) records per-endpoint metrics.
+    Use it as an async context manager, or await ``close()`` when done,
+    to release pooled connections.
+    """
+
+    def __init__(self, apikey=None, http=None, limit=20, cache=None,
+                 limiter=None, retry=None, priority=NORMAL, singleflight=None, records=False, store=None,
+                 base_uri=None, stats=None):
+        if apikey is None:
+            apikey = os.environ.get('PROPUBLICA_API_KEY')
+        if limiter is None:
+            limiter = RateLimiter(rate=5, daily=5000)
+        if retry is None:
+            retry = RetryPolicy()
+        if singleflight is None:
+            singleflight = SingleFlight()
+        if isinstance(store, six.string_types):
+            store = Store(store)
+
+        super(AsyncCampaignFinance, self).__init__(
+            apikey, http, limit, cache, limiter or None, retry or None, priority, singleflight or None,
+            records, store, base_uri, stats)
+
+    candidates = Subclient('.aio', 'AsyncCandidatesClient')
+    committees = Subclient('.aio', 'AsyncCommitteesClient')
+    electioneering = Subclient('.aio', 'AsyncElectioneeringClient')
+    filings = Subclient('.aio', 'AsyncFilingsClient')
+    independent_spending = Subclient('.aio', 'AsyncIndependentSpendingClient')
+    presidential = Subclient('.aio', 'AsyncPresidentialClient')
+
+    def subclient_args(self):
+        shared = dict(cache=self.cache, limiter=self.limiter, retry=self.retry, priority=self.priority,
+                      singleflight=self.singleflight, records=self.records, store=self.store,
+                      base_uri=self.BASE_URI, stats=self.stats)
+        return (self.apikey, self.http), shared
@@ -0,0 +1,183 @@
+"""
+Amendment chains: which version of each report is current
+
+Filing listings (``filings.by_date_range``, ``recent_amendments``,
+``committees.recent_committee_filings``) mix original reports with their
+amendments. An AmendmentIndex links each filing to the original it amends,
+as filings arrive, in any order::
+
+    >>> from campaign_finance.amendments import AmendmentIndex
+    >>> index = AmendmentIndex.from_filings(client.filings.by_date_range(start, end))
+    >>> index.update(client.filings.recent_amendments())
+    >>> index.current(1082345)['filing_id']
+    1099710
+    >>> index.superseded('C00575795')
+    [1082345]
+
+Later filing IDs supersede earlier ones in the same chain. ``stream``
+passes through only filings that are the current version when they arrive,
+each with the version it replaces, so running totals can swap one for the
+other rather than count a report twice.
+"""
+import collections
+
+
+class Version(collections.namedtuple('Version', ['filing', 'supersedes'])):
+    """
+    A filing that is now the current version of its report, and the filing
+    it replaced, or None. ``filing`` is None when two partial chains joined
+    and one's current version was already current for the other.
+    """
+    __slots__ = ()
+
+
+def _field(filing, name):
+    if isinstance(filing, dict):
+        return filing.get(name)
+    return getattr(filing, name, None)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def filing_id(filing):
+    "A filing's ID, as an int, or None"
+    return _int(_field(filing, 'filing_id') or _field(filing, 'id'))
+
+
+def original_id(filing):
+    "The ID of the filing an amendment amends, or None for an original"
+    return _int(_field(filing, 'original_filing'))
+
+
+class AmendmentIndex(object):
+    """
+    Filings grouped into amendment chains, keyed by the ID of each chain's
+    original filing, updated one filing at a time.
+
+    Every filing maps straight to its chain's original, and each chain
+    keeps its current (highest) filing ID, so ``current``, ``chain`` and
+    ``superseded`` are dict lookups however many filings are indexed.
+    An amendment that arrives before the filing it amends starts a chain
+    under that ID, which the original joins when it arrives.
+    """
+
+    def __init__(self):
+        self.filings = {}
+        self._root = {}
+        self._chains = {}
+        self._current = {}
+        self._superseded = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self.filings)
+
+    def __contains__(self, fid):
+        return fid in self.filings
+
+    @classmethod
+    def from_filings(cls, filings):
+        "Build an index from an iterable of filing dicts or records"
+        index = cls()
+        index.update(filings)
+        return index
+
+    def update(self, filings):
+        "Index filings, returning a Version for each change to a current version"
+        return [version for version in (self.add(filing) for filing in filings) if version is not None]
+
+    def add(self, filing):
+        """
+        Index one filing. Returns a Version if the current version of its
+        report changed, or None if it is a repeat or already superseded.
+        """
+        fid = filing_id(filing)
+        if fid is None or fid in self.filings:
+            return None
+
+        self.filings[fid] = filing
+        original = original_id(filing)
+        root = self.root(original) if original is not None and original != fid else fid
+
+        merged = None
+        if fid in self._chains and root != fid:
+            # amendments that arrived first started a chain under this filing
+            merged = self._merge(fid, root)
+        self._root[fid] = root
+        self._chains.setdefault(root, []).append(fid)
+
+        current = self._current.get(root)
+        if current is None or fid > current:
+            self._current[root] = fid
+            if current is not None:
+                self._supersede(current)
+            return Version(filing, self.filings.get(current))
+
+        self._supersede(fid)
+        return merged
+
+    def _merge(self, child, root):
+        """
+        Move the chain started under ``child`` into ``root``'s. If both had a
+        current version, the older is superseded, and returned as a Version
+        (with ``filing`` None if the one that stays current was already).
+        """
+        for fid in self._chains.pop(child):
+            self._root[fid] = root
+            self._chains.setdefault(root, []).append(fid)
+
+        moved = self._current.pop(child)
+        current = self._current.get(root)
+        if current is None:
+            self._current[root] = moved
+            return None
+        if moved > current:
+            self._current[root] = moved
+            self._supersede(current)
+            return Version(None, self.filings[current])
+        self._supersede(moved)
+        return Version(None, self.filings[moved])
+
+    def _supersede(self, fid):
+        committee = _field(self.filings[fid], 'fec_committee_id')
+        self._superseded[committee].add(fid)
+
+    def root(self, fid):
+        "Return the ID of the original filing in a filing's chain"
+        return self._root.get(fid, fid)
+
+    def chain(self, fid):
+        "Return the IDs of every indexed filing in a filing's chain, oldest first"
+        return sorted(self._chains.get(self.root(fid), ()))
+
+    def current(self, fid):
+        "Return the current version of the report a filing belongs to, or None if none of it is indexed"
+        return self.filings.get(self._current.get(self.root(fid)))
+
+    def is_current(self, fid):
+        return self._current.get(self.root(fid)) == fid
+
+    def superseded(self, fec_committee_id):
+        "Return the IDs of a committee's filings that later amendments replaced, oldest first"
+        return sorted(self._superseded.get(fec_committee_id, ()))
+
+    def latest(self):
+        "Yield the current version of every report, in filing ID order"
+        for fid in sorted(self._current.values()):
+            if fid in self.filings:
+                yield self.filings[fid]
+
+    def stream(self, filings):
+        """
+        Index filings as they arrive, yielding a Version whenever the current
+        version of a report changes; repeats and filings already superseded
+        are dropped.
+        """
+        for filing in filings:
+            version = self.add(filing)
+            if version is not None:
+                yield version
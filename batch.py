@@ -0,0 +1,129 @@
+"""
+Worker pools for running many requests in parallel
+
+httplib2.Http objects are not thread-safe, so every worker thread in a pool
+gets its own, and with it its own keep-alive connection.
+"""
+import collections
+import threading
+
+
+class BatchResult(collections.namedtuple('BatchResult', 'key value error')):
+    """
+    The outcome of one item in a batch: the input ``key``, and either
+    a ``value`` or the ``error`` raised while fetching it.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class WorkerPool(object):
+    """
+    A lazily started thread pool where each worker owns an httplib2.Http,
+    created with the given cache. One pool can be shared between clients.
+    """
+
+    def __init__(self, workers=8, cache='.cache'):
+        self.workers = workers
+        self.cache = cache
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _start_worker(self):
+        from .transport import Http
+        self._local.http = Http(self.cache)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # concurrent.futures is imported when the pool starts, not with the package
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix='campaign_finance',
+                        initializer=self._start_worker)
+        return self._executor
+
+    @property
+    def http(self):
+        "The calling worker's httplib2.Http, or None outside the pool"
+        return getattr(self._local, 'http', None)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule ``fn(*args, **kwargs)`` on the pool and return a Future.
+        Called from inside a worker, it runs inline instead, since waiting
+        on our own pool could deadlock it.
+        """
+        if self.http is None:
+            return self.executor.submit(fn, *args, **kwargs)
+
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def imap(self, fn, items, ordered=True, window=None):
+        """
+        Call ``fn(item)`` for each item on the pool, yielding a BatchResult
+        per item, in input order or as each one finishes.
+
+        An exception raised for one item is reported in its result rather
+        than aborting the batch. At most ``window`` items (twice the number
+        of workers by default) are in flight or waiting to be consumed.
+        Called from inside a worker, items run inline, so nested batches
+        cannot deadlock the pool.
+        """
+        if self.http is not None:
+            for item in items:
+                yield _call(fn, item)
+            return
+
+        window = window or self.workers * 2
+        items = iter(items)
+        pending = collections.OrderedDict()
+
+        def fill():
+            for item in items:
+                pending[self.submit(_call, fn, item)] = item
+                if len(pending) >= window:
+                    break
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    future = next(iter(pending))
+                else:
+                    from concurrent.futures import wait, FIRST_COMPLETED
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = next(f for f in pending if f in done)
+
+                del pending[future]
+                result = future.result()
+                fill()
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait)
+            self._executor = None
+
+
+def _call(fn, item):
+    try:
+        return BatchResult(item, fn(item), None)
+    except Exception as e:
+        return BatchResult(item, None, e)
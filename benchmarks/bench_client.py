@@ -0,0 +1,223 @@
+"""
+Client benchmark against the local stand-in API (campaign_finance.mock_api)
+
+For each subclient method, measures requests per second and p50/p99
+latency under sequential, threaded and async load, the cost of decoding
+one response, and the memory allocated per call. No quota is used: the
+mock API runs in its own process, so it doesn't compete with the client
+for the GIL.
+
+    python benchmarks/bench_client.py [--requests 500] [--workers 8] [--methods candidates.get,...]
+                                      [--modes sequential,threaded,async] [--latency 0]
+                                      [--save results.json] [--compare results.json --tolerance 0.25]
+
+With ``--compare``, exits non-zero if any method's throughput fell, or its
+p99 latency rose, by more than ``tolerance`` against a saved run.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+from campaign_finance import AsyncCampaignFinance, CampaignFinance
+from campaign_finance.utils import loads
+
+CYCLE = 2016
+
+# name, call(client, i); i varies IDs, so that no two calls share a path
+METHODS = [
+    ('candidates.get', lambda c, i: c.candidates.get('H6CA{0:05d}'.format(i), CYCLE)),
+    ('candidates.search', lambda c, i: c.candidates.search('name{0}'.format(i), CYCLE)),
+    ('candidates.leaders', lambda c, i: c.candidates.leaders('end-cash', CYCLE - 2 * (i % 10))),
+    ('candidates.late_contributions_by_date', lambda c, i: c.candidates.late_contributions_by_date(
+        CYCLE, '{0:02d}'.format(i % 12 + 1), '{0:02d}'.format(i % 28 + 1), CYCLE - 2 * (i // 336))),
+    ('committees.get', lambda c, i: c.committees.get('C{0:08d}'.format(i), CYCLE)),
+    ('committees.recent_committee_filings', lambda c, i: c.committees.recent_committee_filings('C{0:08d}'.format(i), CYCLE)),
+    ('electioneering.by_date', lambda c, i: c.electioneering.by_date(
+        CYCLE, '{0:02d}'.format(i % 12 + 1), '{0:02d}'.format(i % 28 + 1), CYCLE - 2 * (i // 336))),
+    ('filings.by_date', lambda c, i: c.filings.by_date(
+        CYCLE, '{0:02d}'.format(i % 12 + 1), '{0:02d}'.format(i % 28 + 1), CYCLE - 2 * (i // 336))),
+    ('filings.presidential_summary', lambda c, i: c.filings.presidential_summary(1000000 + i, CYCLE)),
+    ('independent_spending.get', lambda c, i: c.independent_spending.get(CYCLE, offset=20 * i)),
+    ('independent_spending.by_committee', lambda c, i: c.independent_spending.by_committee('C{0:08d}'.format(i), CYCLE)),
+    ('presidential.zip_totals', lambda c, i: c.presidential.zip_totals('{0:05d}'.format(i), CYCLE)),
+]
+
+
+class Recorder(object):
+    "Wraps an httplib2.Http, keeping the last response body"
+
+    def __init__(self, http):
+        self.http = http
+        self.body = None
+
+    def request(self, url, headers=None):
+        resp, self.body = self.http.request(url, headers=headers)
+        return resp, self.body
+
+
+def start_server(latency):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'campaign_finance.mock_api', '--port', '0', '--latency', str(latency),
+         '--page-total', '1000000'],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    return proc, proc.stdout.readline().strip()
+
+
+def client(url, workers, records):
+    return CampaignFinance('key', cache=None, workers=workers, limiter=False, singleflight=False,
+                           records=records, base_uri=url)
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def sequential(url, call, n, workers, records):
+    c = client(url, workers, records)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        call(c, i)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def threaded(url, call, n, workers, records):
+    c = client(url, workers, records)
+
+    def timed(i):
+        t = time.perf_counter()
+        call(c, i)
+        return time.perf_counter() - t
+
+    started = time.perf_counter()
+    latencies = [result.value for result in c.pool.imap(timed, range(n)) if result.ok]
+    elapsed = time.perf_counter() - started
+    c.pool.shutdown()
+    return summarize(latencies, elapsed)
+
+
+def concurrent(url, call, n, workers, records):
+    async def run():
+        async with AsyncCampaignFinance('key', limit=workers, limiter=False, singleflight=False,
+                                        records=records, base_uri=url) as c:
+            async def timed(i):
+                t = time.perf_counter()
+                await call(c, i)
+                return time.perf_counter() - t
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[timed(i) for i in range(n)])
+            return summarize(latencies, time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+MODES = {'sequential': sequential, 'threaded': threaded, 'async': concurrent}
+
+
+def decode(url, call):
+    "Microseconds to decode one response, and bytes per response"
+    c = client(url, 1, False)
+    c.http = Recorder(c.http)
+    call(c, 0)
+    body = c.http.body
+    number = max(1, 200000 // len(body))
+    seconds = min(timeit.repeat(lambda: loads(body), number=number, repeat=3)) / number
+    return {'decode_us': seconds * 1e6, 'bytes': len(body)}
+
+
+def memory(url, call, records, n=50):
+    "Bytes allocated at peak, and still held, per call, keeping every result"
+    c = client(url, 1, records)
+    call(c, 0)
+    gc.collect()
+    tracemalloc.start()
+    results = [call(c, i) for i in range(1, n + 1)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return {'peak_kb_per_call': peak / n / 1024, 'held_kb_per_call': current / n / 1024}
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if result['rps'] < before['rps'] * (1 - tolerance):
+            failures.append("{0}: {1:.0f} rps, was {2:.0f}".format(key, result['rps'], before['rps']))
+        if result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            failures.append("{0}: p99 {1:.2f}ms, was {2:.2f}ms".format(key, result['p99_ms'], before['p99_ms']))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--methods', help="comma-separated method names; all by default")
+    parser.add_argument('--modes', default='sequential,threaded,async')
+    parser.add_argument('--latency', type=float, default=0, help="mock API delay per response, in seconds")
+    parser.add_argument('--records', action='store_true', help="return typed records instead of dicts")
+    parser.add_argument('--url', help="use a mock API already running here")
+    parser.add_argument('--save', help="write results to a JSON file")
+    parser.add_argument('--compare', help="compare against results saved earlier")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_server(args.latency)
+
+    names = args.methods.split(',') if args.methods else [name for name, _ in METHODS]
+    modes = args.modes.split(',')
+    methods = [(name, call) for name, call in METHODS if name in names]
+
+    results = {}
+    try:
+        print("%-40s %-10s %9s %9s %9s %10s %9s %11s %11s" % (
+            'method', 'mode', 'rps', 'p50 ms', 'p99 ms', 'decode us', 'bytes', 'peak KB/op', 'held KB/op'))
+        for name, call in methods:
+            static = decode(url, call)
+            static.update(memory(url, call, args.records))
+            for mode in modes:
+                result = MODES[mode](url, call, args.requests, args.workers, args.records)
+                result.update(static)
+                results["{0} {1}".format(name, mode)] = result
+                print("%-40s %-10s %9.0f %9.2f %9.2f %10.1f %9d %11.1f %11.1f" % (
+                    name, mode, result['rps'], result['p50_ms'], result['p99_ms'], result['decode_us'],
+                    result['bytes'], result['peak_kb_per_call'], result['held_kb_per_call']))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print("REGRESSION " + failure)
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
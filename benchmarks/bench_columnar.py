@@ -0,0 +1,61 @@
+"""
+Aggregation benchmark: looping over expenditure dicts vs. ExpenditureColumns
+
+    python benchmarks/bench_columnar.py [count]
+"""
+import collections
+import random
+import sys
+import time
+
+from campaign_finance.columnar import ExpenditureColumns
+
+
+def expenditures(count, seed=1):
+    rand = random.Random(seed)
+    committees = ['C%08d' % rand.randrange(10 ** 8) for _ in range(2000)]
+    candidates = [('%s%06d' % (rand.choice('HS'), i), rand.choice(['CA', 'TX', 'NY', 'FL']), '%02d' % rand.randrange(1, 40))
+                  for i in range(3000)]
+    for _ in range(count):
+        candidate, state, district = rand.choice(candidates)
+        yield {
+            'fec_committee_id': rand.choice(committees), 'fec_candidate_id': candidate,
+            'office': candidate[0], 'state': state, 'district': district,
+            'support_or_oppose': rand.choice('SO'), 'amount': rand.random() * 10000,
+            'date': '2018-%02d-%02d' % (rand.randrange(1, 13), rand.randrange(1, 29)),
+        }
+
+
+def timed(label, fn):
+    started = time.time()
+    result = fn()
+    print("  %-40s %9.1f ms" % (label, (time.time() - started) * 1000))
+    return result
+
+
+def loop_totals(rows, key):
+    totals = collections.defaultdict(lambda: {'support': 0.0, 'oppose': 0.0})
+    for row in rows:
+        side = 'support' if row['support_or_oppose'] == 'S' else 'oppose'
+        totals[row[key]][side] += row['amount']
+    return totals
+
+
+def main(count):
+    rows = list(expenditures(count))
+    print("%d independent expenditures" % count)
+
+    timed('dict loop: totals per candidate', lambda: loop_totals(rows, 'fec_candidate_id'))
+    timed('dict loop: totals per committee', lambda: loop_totals(rows, 'fec_committee_id'))
+    timed('dict loop: totals per day', lambda: loop_totals(rows, 'date'))
+
+    columns = timed('build columns (one pass)', lambda: ExpenditureColumns.from_records(rows))
+    timed('columns: support/oppose per candidate', lambda: columns.sums('candidate'))
+    timed('columns: support/oppose per committee', lambda: columns.sums('committee'))
+    timed('columns: support/oppose per race', lambda: columns.sums('race'))
+    timed('columns: totals per day', columns.totals_by_day)
+    timed('columns: top 10 candidates', lambda: columns.top('candidate'))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,109 @@
+"""
+Decode benchmark: the cost of turning response bytes into objects, per endpoint
+
+Compares the old decode path (utils.u, then .replace('\\r\\n', '\\n'), then
+json.loads), json.loads straight from bytes, the fastest backend installed
+(utils.loads) and incremental streaming with ijson, on synthetic responses
+shaped like each endpoint's.
+
+    python benchmarks/bench_decode.py
+"""
+import json
+import random
+import timeit
+
+from campaign_finance import client
+from campaign_finance.utils import loads, u
+
+rand = random.Random(1)
+
+
+def money():
+    return round(rand.random() * 1000000, 2)
+
+
+def candidate():
+    return {
+        'id': 'H8CA%05d' % rand.randrange(10 ** 5), 'name': 'DOE, JANE', 'party': 'DEM', 'state': '/states/CA.json',
+        'district': '/seats/CA/house/12.json', 'fec_uri': 'https://www.fec.gov/', 'committee': '/committees/C001.json',
+        'mailing_address': '123 MAIN ST', 'mailing_city': 'SAN FRANCISCO', 'mailing_state': 'CA', 'mailing_zip': '94110',
+        'status': 'C', 'total_receipts': money(), 'total_from_individuals': money(), 'total_from_pacs': money(),
+        'total_contributions': money(), 'candidate_loans': money(), 'total_disbursements': money(),
+        'begin_cash': money(), 'end_cash': money(), 'total_refunds': money(), 'debts_owed': money(),
+        'date_coverage_from': '2017-01-01', 'date_coverage_to': '2018-06-30',
+    }
+
+
+def expenditure():
+    return {
+        'fec_committee_id': 'C%08d' % rand.randrange(10 ** 8), 'committee_name': 'SUPER PAC FOR AMERICA',
+        'fec_candidate_id': 'S8TX%05d' % rand.randrange(10 ** 5), 'candidate_name': 'SMITH, JOHN',
+        'office': 'S', 'state': 'TX', 'district': '00', 'support_or_oppose': rand.choice('SO'),
+        'date': '2018-10-01', 'date_received': '2018-10-02', 'amount': money(),
+        'purpose': 'TV AD', 'payee': 'MEDIA BUYERS LLC', 'transaction_id': 'SE.%d' % rand.randrange(10 ** 6),
+    }
+
+
+def filing():
+    return {
+        'filing_id': rand.randrange(10 ** 6), 'fec_committee_id': 'C%08d' % rand.randrange(10 ** 8),
+        'committee_name': 'FRIENDS OF SOMEONE', 'form_type': 'F3', 'report_title': 'OCTOBER QUARTERLY',
+        'date_filed': '2018-10-15', 'date_coverage_from': '2018-07-01', 'date_coverage_to': '2018-09-30',
+        'amended': False, 'receipts_total': money(), 'disbursements_total': money(), 'cash_on_hand': money(),
+    }
+
+
+def late_contribution():
+    return {
+        'fec_candidate_id': 'H8NY%05d' % rand.randrange(10 ** 5), 'candidate_name': 'ROE, RICHARD',
+        'contributor_fname': 'ALEX', 'contributor_lname': 'JONES', 'contributor_city': 'ALBANY',
+        'contributor_state': 'NY', 'contributor_zip': '12201', 'contribution_amount': 2700.0,
+        'contribution_date': '2018-10-30', 'transaction_id': 'SA.%d' % rand.randrange(10 ** 6),
+    }
+
+
+ENDPOINTS = [
+    ('{cycle}/candidates/{fec_id}.json', candidate, 1),
+    ('{cycle}/candidates/leaders/{category}.json', candidate, 20),
+    ('{cycle}/independent_expenditures.json', expenditure, 20),
+    ('{cycle}/filings/{year}/{month}/{day}.json', filing, 200),
+    ('{cycle}/contributions/48hour.json', late_contribution, 200),
+    ('{cycle}/independent_expenditures/{year}/{month}/{day}.json', expenditure, 5000),
+]
+
+
+def body(make, count):
+    return json.dumps({
+        'status': 'OK', 'copyright': 'Copyright (c) ProPublica Inc. All Rights Reserved.',
+        'num_results': count, 'results': [make() for _ in range(count)],
+    }, indent=2).replace('\n', '\r\n').encode('utf-8')
+
+
+def legacy(content):
+    return json.loads(u(content))
+
+
+def streamed(content):
+    return list(client._stream_results(content))
+
+
+def main():
+    decoders = [('legacy', legacy), ('json.loads', json.loads), ('utils.loads', loads)]
+    if client.ijson is not None:
+        decoders.append(('stream', streamed))
+
+    print("backend: utils.loads is %s.%s" % (loads.__module__, loads.__name__))
+    print("%-58s %9s " % ('endpoint', 'bytes') + ''.join('%13s' % name for name, _ in decoders))
+
+    for template, make, count in ENDPOINTS:
+        content = body(make, count)
+        number = max(1, 200000 // len(content))
+        timings = []
+        for name, decode in decoders:
+            seconds = min(timeit.repeat(lambda: decode(content), number=number, repeat=3)) / number
+            timings.append('%10.1fus' % (seconds * 1e6))
+        print("%-58s %9d " % (template, len(content)) + ' '.join(timings))
+
+
+if __name__ == '__main__':
+    main()
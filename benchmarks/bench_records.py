@@ -0,0 +1,76 @@
+"""
+Memory benchmark: raw result dicts vs. typed records
+
+Builds a synthetic cycle's worth of independent expenditures, decoded from
+JSON the way Client.fetch decodes them, and compares the memory held by
+the dicts with the memory held by IndependentExpenditure records.
+
+    python benchmarks/bench_records.py [count]
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from campaign_finance.records import IndependentExpenditure
+
+
+def expenditures(count, seed=1):
+    rand = random.Random(seed)
+    committees = ['C%08d' % rand.randrange(10 ** 8) for _ in range(500)]
+    candidates = ['%s%d%s%05d' % (rand.choice('HSP'), rand.choice([6, 8]), rand.choice(['CA', 'TX', 'NY', 'FL', 'OH']),
+                                 rand.randrange(10 ** 5)) for _ in range(800)]
+    for i in range(count):
+        committee, candidate = rand.choice(committees), rand.choice(candidates)
+        yield {
+            'fec_committee_id': committee,
+            'committee': '/committees/%s.json' % committee,
+            'committee_name': 'COMMITTEE %s' % committee,
+            'fec_candidate_id': candidate,
+            'candidate': '/candidates/%s.json' % candidate,
+            'candidate_name': 'CANDIDATE %s' % candidate,
+            'office': candidate[0],
+            'state': candidate[2:4],
+            'district': '%02d' % rand.randrange(1, 53),
+            'support_or_oppose': rand.choice('SO'),
+            'date': '2016-%02d-%02d' % (rand.randrange(1, 13), rand.randrange(1, 29)),
+            'date_received': '2016-%02d-%02d' % (rand.randrange(1, 13), rand.randrange(1, 29)),
+            'dissemination_date': '2016-%02d-%02d' % (rand.randrange(1, 13), rand.randrange(1, 29)),
+            'amount': '%.2f' % (rand.random() * 100000),
+            'purpose': rand.choice(['TV AD', 'DIGITAL ADS', 'MAILER', 'PHONE BANK']),
+            'payee': 'VENDOR %d' % rand.randrange(300),
+            'transaction_id': 'SE.%d' % i,
+            'unique_id': 'ie-%d' % i,
+            'filing_id': 1000000 + i // 20,
+            'amendment': False,
+        }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.time()
+    result = build()
+    elapsed = time.time() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main(count):
+    # round-trip through JSON, so every dict has its own key strings, as decoded responses do
+    body = json.dumps({'status': 'OK', 'results': list(expenditures(count))}).encode('utf-8')
+
+    dicts, dict_bytes, dict_time = measure(lambda: json.loads(body)['results'])
+    records, record_bytes, record_time = measure(lambda: [IndependentExpenditure(d) for d in json.loads(body)['results']])
+
+    print("%d independent expenditures" % count)
+    print("  dicts:   %8.1f MB  %6.0f bytes each  %.2fs" % (dict_bytes / 1e6, dict_bytes / count, dict_time))
+    print("  records: %8.1f MB  %6.0f bytes each  %.2fs" % (record_bytes / 1e6, record_bytes / count, record_time))
+    print("  saving:  %7.0f%%" % (100 * (1 - record_bytes / float(dict_bytes))))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark: import time, and time to a first response
+
+Each run is a fresh interpreter, as in a serverless handler's cold start.
+Measures ``import campaign_finance`` alone, then import, client creation
+and one ``candidates.get`` against a local stub server, and lists which
+heavy optional modules the import pulled in.
+
+    python benchmarks/bench_startup.py [runs] [--max-import-ms N] [--max-first-request-ms N]
+
+Exits non-zero if the import pulls in any of the HEAVY modules, which
+should load only when the feature needing them is first used, or, with a
+limit set, when the median goes over it, so CI can keep cold starts bounded.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+HEAVY = ('aiohttp', 'asyncio', 'httplib2', 'sqlite3', 'numpy', 'dateutil', 'concurrent.futures')
+
+IMPORT = """
+import sys, time
+started = time.perf_counter()
+import campaign_finance
+elapsed = time.perf_counter() - started
+print(elapsed, ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+FIRST_REQUEST = """
+import time
+started = time.perf_counter()
+import campaign_finance
+campaign_finance.Client.BASE_URI = {base!r}
+client = campaign_finance.CampaignFinance('key', cache=None)
+client.candidates.get('P80003338')
+print(time.perf_counter() - started)
+"""
+
+
+class Stub(BaseHTTPRequestHandler):
+    body = json.dumps({'status': 'OK', 'results': [{'id': 'P80003338', 'name': 'OBAMA, BARACK'}]}).encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(code, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        results.append(out.split())
+    return results
+
+
+def limit(name):
+    if name in sys.argv:
+        return float(sys.argv[sys.argv.index(name) + 1])
+    return None
+
+
+def main():
+    args = [a for i, a in enumerate(sys.argv[1:], 1) if not a.startswith('--') and not sys.argv[i - 1].startswith('--')]
+    runs = int(args[0]) if args else 10
+
+    server = HTTPServer(('127.0.0.1', 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://127.0.0.1:{0}/'.format(server.server_port)
+
+    imports = run(IMPORT.format(heavy=HEAVY), runs)
+    first = run(FIRST_REQUEST.format(base=base), runs)
+    server.shutdown()
+
+    import_ms = statistics.median(float(r[0]) for r in imports) * 1000
+    first_ms = statistics.median(float(r[0]) for r in first) * 1000
+    loaded = imports[0][1] if len(imports[0]) > 1 else '(none)'
+
+    print("runs:                  %d" % runs)
+    print("import, median:        %7.1fms  (max %.1fms)" % (import_ms, max(float(r[0]) for r in imports) * 1000))
+    print("first request, median: %7.1fms  (max %.1fms)" % (first_ms, max(float(r[0]) for r in first) * 1000))
+    print("heavy modules loaded by import: %s" % loaded)
+
+    failed = False
+    if len(imports[0]) > 1:
+        print("FAIL: import campaign_finance loaded %s" % loaded)
+        failed = True
+    for name, value in (('--max-import-ms', import_ms), ('--max-first-request-ms', first_ms)):
+        bound = limit(name)
+        if bound is not None and value > bound:
+            print("FAIL: %s %.1f > %.1f" % (name, value, bound))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
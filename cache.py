@@ -0,0 +1,327 @@
+"""
+Tiered response cache: a bounded in-process LRU of decoded results,
+backed by a single-file SQLite store of response bodies.
+
+Pass a ResponseCache as the ``cache`` argument to a client to use it
+in place of httplib2's FileCache::
+
+    >>> from campaign_finance import CampaignFinance, ResponseCache
+    >>> client = CampaignFinance(cache=ResponseCache('.cache.sqlite'))
+
+Entries expire according to TTLs set per endpoint pattern. Warm lookups
+are answered from memory, without disk I/O or JSON decoding, so cached
+results are shared between callers and should be treated as read-only.
+
+Expired entries are kept, with the ETag and Last-Modified validators their
+response came with, so that a client can revalidate them with a conditional
+request and, on 304 Not Modified, keep serving the decoded result.
+"""
+import collections
+import fnmatch
+import threading
+import time
+
+import six
+
+from .utils import loads
+
+
+# (path pattern, seconds), first match wins
+DEFAULT_TTLS = (
+    ('*/filings/types.json', 7 * 24 * 60 * 60),
+    ('*/candidates/leaders/*', 24 * 60 * 60),
+    ('*/contributions/48hour*', 5 * 60),
+    ('*/48hour.json', 5 * 60),
+    ('*/filings/amendments.json', 15 * 60),
+    ('*/committees/new.json', 15 * 60),
+    ('*/committees/superpacs.json', 15 * 60),
+    ('*/independent_expenditures.json*', 15 * 60),
+)
+
+DEFAULT_TTL = 60 * 60
+
+def ttl_for(path, ttls=DEFAULT_TTLS, default_ttl=DEFAULT_TTL):
+    "Return the TTL in seconds for a path: the first matching pattern's, or ``default_ttl``"
+    for pattern, seconds in ttls:
+        if fnmatch.fnmatchcase(path, pattern):
+            return seconds
+    return default_ttl
+
+
+# a TTL for responses that will never change, such as those for closed cycles
+FOREVER = float('inf')
+
+# a decoded response, with the validators to revalidate it once it expires
+Entry = collections.namedtuple('Entry', 'content etag last_modified size')
+
+
+class LRUCache(object):
+    """
+    In-memory least-recently-used store, bounded by the total size
+    (in response bytes) of what it holds.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        "Return (value, expires), or None"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, value, expires, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, expires, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class SQLiteCache(object):
+    """
+    Response bodies in a single SQLite file, bounded by total bytes.
+    The least recently used bodies are evicted first.
+    """
+
+    def __init__(self, path='.cache.sqlite', max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # sqlite3 is imported when a cache file is opened, not with the package
+        import sqlite3
+        self._binary = sqlite3.Binary
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires REAL, accessed REAL NOT NULL, etag TEXT, last_modified TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(responses)")]
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self._db.execute("ALTER TABLE responses ADD COLUMN {0} TEXT".format(column))
+        self.size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        "Return (body, expires, etag, last_modified), or None"
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, expires, etag, last_modified FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url))
+            return bytes(row[0]), row[1], row[2], row[3]
+
+    def set(self, url, body, expires, etag=None, last_modified=None):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if old is not None:
+                self.size -= old[0]
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, body, size, expires, accessed, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, self._binary(body), size, expires, time.time(), etag, last_modified))
+            self.size += size
+
+            while self.size > self.max_bytes:
+                url, evicted = self._db.execute(
+                    "SELECT url, size FROM responses ORDER BY accessed LIMIT 1").fetchone()
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.size -= evicted
+                self.evictions += 1
+
+    def touch(self, url, expires):
+        "Set a new expiry time for a body, as after revalidating it"
+        with self._lock:
+            self._db.execute("UPDATE responses SET expires = ?, accessed = ? WHERE url = ?", (expires, time.time(), url))
+
+    def delete(self, url):
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if old is not None:
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.size -= old[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self.size = 0
+
+    def close(self):
+        self._db.close()
+
+
+class ResponseCache(object):
+    """
+    Caches decoded API responses in two tiers: a bounded in-memory LRU of
+    decoded results in front of a bounded SQLite file of response bodies.
+
+    ``ttls`` is a sequence of ``(pattern, seconds)`` pairs, matched in order
+    against the request path (e.g. ``2018/filings/types.json``) with shell-style
+    wildcards; paths that match nothing get ``default_ttl``. A TTL of None
+    never expires. Set ``path`` to None for a memory-only cache.
+
+    Entries are kept after they expire, until evicted, for ``stale``
+    and ``revalidate``.
+    """
+
+    def __init__(self, path='.cache.sqlite', ttls=DEFAULT_TTLS, default_ttl=DEFAULT_TTL,
+                 memory_bytes=64 * 1024 * 1024, disk_bytes=512 * 1024 * 1024):
+        self.ttls = list(ttls or ())
+        self.default_ttl = default_ttl
+        self.memory = LRUCache(memory_bytes)
+        self.disk = SQLiteCache(path, disk_bytes) if path else None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def ttl(self, path):
+        "Return the TTL in seconds for a path"
+        return ttl_for(path, self.ttls, self.default_ttl)
+
+    def get(self, url):
+        """
+        Return the decoded response for a URL, or None if it is missing or expired.
+        Warm hits return the cached object itself, not a copy, so it must not be changed.
+        """
+        now = time.time()
+
+        entry = self.memory.get(url)
+        if entry is not None and not _expired(entry[1], now):
+            self.hits += 1
+            self.memory_hits += 1
+            return entry[0].content
+
+        if self.disk is not None:
+            row = self.disk.get(url)
+            if row is not None and not _expired(row[1], now):
+                body, expires, etag, last_modified = row
+                content = loads(body)
+                self.memory.set(url, Entry(content, etag, last_modified, len(body)), expires, len(body))
+                self.hits += 1
+                self.disk_hits += 1
+                return content
+
+        self.misses += 1
+        return None
+
+    def stale(self, url):
+        """
+        Return the Entry for a URL whether or not it has expired,
+        or None if there is none or it has no ETag or Last-Modified to revalidate with
+        """
+        entry = self.memory.get(url)
+        if entry is not None:
+            stale = entry[0]
+        elif self.disk is not None:
+            row = self.disk.get(url)
+            if row is None or not (row[2] or row[3]):
+                return None
+            stale = Entry(loads(row[0]), row[2], row[3], len(row[0]))
+            self.memory.set(url, stale, row[1], stale.size)
+        else:
+            return None
+
+        if not (stale.etag or stale.last_modified):
+            return None
+        return stale
+
+    def revalidate(self, url, path, ttl=None):
+        "Renew an entry the API answered 304 Not Modified for, from now, keeping its decoded result"
+        expires = self.expires(path, ttl)
+        entry = self.memory.get(url)
+        if entry is not None:
+            self.memory.set(url, entry[0], expires, entry[0].size)
+        if self.disk is not None:
+            self.disk.touch(url, expires)
+        self.revalidations += 1
+
+    def expires(self, path, ttl=None):
+        "Return when an entry stored now expires: after ``ttl``, or by default the path's TTL"
+        if ttl is None:
+            ttl = self.ttl(path)
+        return None if ttl is None or ttl == FOREVER else time.time() + ttl
+
+    def set(self, url, path, content, body, ttl=None, etag=None, last_modified=None):
+        """
+        Store a decoded response and its raw body, to expire after ``ttl``
+        seconds, or by default the path's TTL. FOREVER never expires.
+        ``etag`` and ``last_modified`` are the response's validators, if any.
+        """
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        expires = self.expires(path, ttl)
+
+        self.memory.set(url, Entry(content, etag, last_modified, len(body)), expires, len(body))
+        if self.disk is not None:
+            self.disk.set(url, body, expires, etag, last_modified)
+
+    def delete(self, url):
+        self.memory.delete(url)
+        if self.disk is not None:
+            self.disk.delete(url)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        "Return hit, miss, size and eviction counters"
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'revalidations': self.revalidations,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory.size,
+            'memory_evictions': self.memory.evictions,
+            'disk_bytes': self.disk.size if self.disk is not None else 0,
+            'disk_evictions': self.disk.evictions if self.disk is not None else 0,
+        }
+
+
+def _expired(expires, now):
+    return expires is not None and expires <= now
@@ -1,18 +1,64 @@
-from .client import Client
+from six.moves.urllib.parse import quote
+
+from .client import Client, all_results
+from .geo import SENATE_STATES, STATES, districts
+from .leaders import LeadersMatrix
+from .races import Race, RaceMatrix, race_path
+from .records import Candidate, LateContribution
 from .utils import CURRENT_CYCLE
 
 
 class CandidatesClient(Client):
 
-    def search(self, query, cycle=CURRENT_CYCLE):
-        "Takes a campaign cycle and a candidate first or last name, returns matching candidates"
-        path = "{cycle}/candidates/search.json?query={query}".format(cycle=cycle, query=query)
-        return self.fetch(path)
+    def search(self, query, cycle=CURRENT_CYCLE, limit=None, local=True):
+        """
+        Takes a campaign cycle and a candidate first or last name, returns matching candidates
+
+        Names are looked up in the client's local index for the cycle (see ``name_index()``)
+        first, and requested only when none match; candidates the API returns are added to it.
+
+        Parameter	Description
+        =========   ===========
+        limit	    Return at most this many candidates
+        local	    False to always ask the API
+        """
+        path = "{cycle}/candidates/search.json?query={query}".format(cycle=cycle, query=quote(query))
+        return self.search_names(path, query, cycle, Candidate, limit, local)
 
     def get(self, fec_id, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle and an FEC-assigned 9-character ID, returns a candidate"
         path = "{cycle}/candidates/{fec_id}.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=Candidate)
+
+    def query(self, order=None, limit=None, **filters):
+        """
+        Returns candidates saved in the local Store, without a request
+
+        Parameter	Description
+        =========   ===========
+        filters	    Any of key (FEC ID), cycle, name, party, state and district
+        """
+        return self.query_store(Candidate, None, None, order, limit, **filters)
+
+    def history(self, fec_id, cycles=None):
+        """
+        Takes an FEC-assigned 9-character ID, fetches the candidate in every cycle from 1996
+        to the current one in parallel, and returns a History, a time series by cycle.
+        Cycles without the candidate are gaps; closed cycles are cached for good.
+
+        Parameter	Description
+        =========   ===========
+        cycles	    Cycles to fetch instead of all of them
+        """
+        path = "{{cycle}}/candidates/{fec_id}.json".format(fec_id=fec_id)
+        return self.fetch_history(fec_id, path, cycles, Candidate)
+
+    def get_many(self, fec_ids, cycle=CURRENT_CYCLE, ordered=True):
+        """
+        Takes FEC-assigned 9-character IDs and a campaign cycle, fetches each candidate in parallel
+        and yields a BatchResult per ID, in input order or as they finish
+        """
+        return self.imap(lambda fec_id: self.get(fec_id, cycle), fec_ids, ordered)
 
     def leader_categories(self):
         """
@@ -42,7 +88,33 @@ class CandidatesClient(Client):
         See `leader_categories()` for the labels and descriptions of the available categories
         """
         path = "{cycle}/candidates/leaders/{category}.json".format(cycle=cycle, category=category)
-        return self.fetch(path)
+        return self.fetch(path, all_results, Candidate)
+
+    def leaders_matrix(self, categories=None, cycles=None):
+        """
+        Takes financial categories and campaign cycles, fetches every leaderboard in parallel,
+        and returns a LeadersMatrix of ranks by candidate, category and cycle
+
+        Closed cycles are cached for good. See `leader_categories()` for the categories.
+
+        Parameter	Description
+        =========   ===========
+        categories	Categories to fetch, all of them by default
+        cycles	    Cycles to fetch, the current one by default
+        """
+        boards = [(category, cycle) for cycle in cycles or [CURRENT_CYCLE]
+                  for category in categories or self.leader_categories()]
+
+        def fetch(board):
+            category, cycle = board
+            path = "{cycle}/candidates/leaders/{category}.json".format(cycle=cycle, category=category)
+            return self.fetch_cycle(path, cycle, all_results, Candidate)
+
+        def build(results, errors):
+            return LeadersMatrix([(board, results[board]) for board in boards if board in results],
+                                 [board for board in boards if board not in results], errors)
+
+        return self.collect(fetch, boards, build)
 
     def races(self, state=None, chamber=None, district=None, cycle=CURRENT_CYCLE):
         """
@@ -56,19 +128,44 @@ class CandidatesClient(Client):
                     (AL, DE, DC, MT, ND, SD, VT).
                     (House requests only - districts with Senate requests will be ignored.)
         """
-        path = "{cycle}/races/{state}"
-        if chamber:
-            path = path + "/{chamber}"
-        if district:
-            path = path + "/{district}"
-        path = path + ".json"
-        path.format(state=state, chamber=chamber, district=district)
-        return self.fetch(path)
+        return self.fetch(race_path(cycle, state, chamber, district), all_results)
+
+    def race_matrix(self, cycle=CURRENT_CYCLE, states=None, chambers=('house', 'senate')):
+        """
+        Takes a campaign cycle, fetches the candidates in every race in parallel, and returns
+        a RaceMatrix indexed by state, chamber and district
+
+        House districts come from the apportionment for the cycle, in ``geo.py``. Every state's
+        Senate race is requested, so that special elections are included. Races in closed
+        cycles are cached for good.
+
+        Parameter	Description
+        =========   ===========
+        states	    Two-letter state abbreviations, instead of every state
+        chambers	`house`, `senate` or both
+        """
+        races = []
+        for state in states or STATES:
+            if 'senate' in chambers and state in SENATE_STATES:
+                races.append(Race(state, 'senate', None))
+            if 'house' in chambers:
+                races.extend(Race(state, 'house', district) for _, district in districts(cycle, [state]))
+
+        def build(results, errors):
+            return RaceMatrix(cycle, [(race, results[race]) for race in races if race in results],
+                              [race for race in races if race not in results], errors)
+
+        return self.collect(lambda race: self.fetch_cycle(race_path(cycle, *race), cycle, all_results), races, build)
 
     def late_contributions(self, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle, returns the most recent late contributions to candidates"
         path = "{cycle}/contributions/48hour.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=LateContribution)
+
+    def iter_late_contributions(self, cycle=CURRENT_CYCLE):
+        "Takes a campaign cycle, yields every late contribution to candidates, most recent first"
+        path = "{cycle}/contributions/48hour.json".format(cycle=cycle)
+        return self.iter_pages(path, record=LateContribution)
 
     def late_candidate_contributions(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -76,7 +173,7 @@ class CandidatesClient(Client):
         returns the most recent late contributions to a specific candidate
         """
         path = "{cycle}/candidates/{fec_id}/48hour.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=LateContribution)
 
     def late_committee_contributions(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -84,7 +181,7 @@ class CandidatesClient(Client):
         returns the most recent late contributions to a specific committee
         """
         path= "{cycle}/committees/{fec_id}/48hour.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=LateContribution)
     
     def late_contributions_by_date(self, year, month, day, cycle=CURRENT_CYCLE):
         """
@@ -97,4 +194,25 @@ class CandidatesClient(Client):
         day	        The two-digit day from 01-3
         """
         path = "{cycle}/contributions/48hour/{year}/{month}/{day}.json".format(cycle=cycle, year=year, month=month, day=day)
-        return self.fetch(path)
+        return self.fetch(path, record=LateContribution)
+
+    def late_contributions_by_date_range(self, start, end, cycle=None, checkpoint=None):
+        """
+        Takes a start and end date, yields every late contribution from start to end, in date order.
+        Days are fetched in parallel; pass a checkpoint file to make a long sweep resumable.
+        """
+        return self.sweep_dates(
+            "{cycle}/contributions/48hour/{year}/{month}/{day}.json",
+            start, end, cycle, checkpoint, LateContribution)
+
+
+    def query_late_contributions(self, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Returns late contributions saved in the local Store, optionally from start to end, without a request
+
+        Parameter	        Description
+        =========           ===========
+        start, end	        Dates bounding contribution_date, inclusive
+        filters	            Any of cycle, fec_candidate_id, fec_committee_id and contribution_amount
+        """
+        return self.query_store(LateContribution, start, end, order, limit, **filters)
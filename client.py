@@ -1,39 +1,162 @@
 """
 Base client outlining how we fetch and parse responses
 """
-import json
+import importlib
+import io
 import logging
-import httplib2
+import socket
+import time
 
-from .utils import NotFound, CampaignFinanceError, u
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from .batch import WorkerPool
+from .cache import FOREVER, LRUCache, ResponseCache, ttl_for
+from .ratelimit import NORMAL
+from .utils import CURRENT_CYCLE, NotFound, CampaignFinanceError, loads
 
 log = logging.getLogger('campaign_finance')
 
 
+def first_result(response):
+    "Default parser: return the first item in a response's results"
+    return response['results'][0]
+
+
+def all_results(response):
+    "Parser for list endpoints: return every item in a response's results"
+    return response['results']
+
+
+def page_path(path, offset):
+    "A paged endpoint's path for the page starting at ``offset``"
+    if not offset:
+        return path
+    sep = '&' if '?' in path else '?'
+    return path + "{sep}offset={offset}".format(sep=sep, offset=offset)
+
+
+class Subclient(object):
+    """
+    Descriptor for a namespace such as ``client.candidates``. The subclient,
+    and the module defining it, are loaded on first access, with arguments
+    from the parent's ``subclient_args()``, and then kept on the instance.
+    """
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+        self.attr = None
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, client, owner):
+        if client is None:
+            return self
+
+        cls = getattr(importlib.import_module(self.module, __package__), self.name)
+        args, kwargs = client.subclient_args()
+        # if two threads race to build it, both get the one stored first
+        return client.__dict__.setdefault(self.attr, cls(*args, **kwargs))
+
+
 class Client(object):
     """
     Client classes deal with fetching responses from the ProPublica Congress
     API and parsing what comes back. In addition to storing API credentials,
     a client can use a custom cache, or even a customized
     httplib2.Http instance.
+
+    A ResponseCache passed as ``cache`` replaces httplib2's own caching
+    with a tiered cache of decoded results, consulted before any request.
+
+    Batches of requests run on a WorkerPool, where each worker thread
+    uses its own httplib2.Http, since those are not thread-safe.
+
+    Requests wait on an optional RateLimiter, at the client's ``priority``,
+    and failed requests are retried according to an optional RetryPolicy.
+    With a SingleFlight, concurrent fetches of the same URL share one request.
+
+    With ``records=True``, results come back as compact typed records
+    (see ``records.py``) rather than dicts. With a Store, fetched records
+    are saved in a local indexed database, which answers repeat fetches
+    while they are fresh and backs each subclient's ``query`` methods.
+
+    ``base_uri`` points the client at another server, such as the
+    local stand-in in ``mock_api.py``.
+
+    Give it a Stats object (see ``stats.py``) to record per-endpoint
+    latency, bytes, cache hits, decode time and errors.
+
+    Responses are requested gzipped. With a ResponseCache, expired entries
+    are revalidated with If-None-Match and If-Modified-Since, so unchanged
+    results cost a 304 rather than a download and decode.
+
+    Results for closed cycles never change, so ``fetch_cycle`` keeps
+    them for good: in the ResponseCache, or in memory without one.
     """
 
     BASE_URI = "https://api.propublica.org/campaign-finance/v1/"
 
-    def __init__(self, apikey=None, cache='.cache', http=None):
+    def __init__(self, apikey=None, cache='.cache', http=None, pool=None,
+                 limiter=None, retry=None, priority=NORMAL, singleflight=None, records=False, store=None,
+                 base_uri=None, stats=None):
         self.apikey = apikey
+        if base_uri:
+            self.BASE_URI = base_uri.rstrip('/') + '/'
+        self.limiter = limiter
+        self.retry = retry
+        self.priority = priority
+        self.singleflight = singleflight
+        self.records = records
+        self.store = store
+        self.stats = stats
 
-        if isinstance(http, httplib2.Http):
-            self.http = http
+        if isinstance(cache, ResponseCache):
+            self.cache, cache = cache, None
         else:
-            self.http = httplib2.Http(cache)
+            self.cache = None
+
+        # closed-cycle results, when there is no ResponseCache to keep them; sized by entry count
+        self.closed = LRUCache(4096)
+
+        # names seen in searches, by cycle; see ``search_names``
+        self.names = {}
+
+        # httplib2 is imported, and the Http built, on first use
+        self._http = http
+        self._http_cache = cache
 
-    def fetch(self, path, parse=lambda r: r['results'][0]):
+        if isinstance(pool, WorkerPool):
+            self.pool = pool
+        else:
+            self.pool = WorkerPool(cache=cache)
+
+    @property
+    def http(self):
+        "This client's httplib2.Http, created on first use"
+        if self._http is None:
+            from .transport import Http
+            self._http = Http(self._http_cache)
+        return self._http
+
+    @http.setter
+    def http(self, http):
+        self._http = http
+
+    def fetch(self, path, parse=first_result, record=None, ttl=None, fresh=False):
         """
         Make an API request, with authentication.
 
         This method can be used directly to fetch new endpoints
-        or customize parsing.
+        or customize parsing. ``ttl`` overrides how long the ResponseCache
+        keeps the response; ``FOREVER`` keeps it for good. With ``fresh``,
+        the ResponseCache and Store are not consulted and the request
+        reaches the server (a cached copy is revalidated); the response
+        is still cached and saved.
 
         ::
 
@@ -45,13 +168,364 @@ class Client(object):
 
         """
         url = self.BASE_URI + path
-        headers = {'X-API-Key': self.apikey}
+        content = None if fresh else self.lookup(path, url, record, ttl)
+        if content is not None and self.stats is not None:
+            self.stats.cache(path, True)
+
+        if content is None and self.singleflight is not None:
+            content = self.singleflight.do(url, lambda: self.load(path, url, record, ttl, fresh))
+        elif content is None:
+            content = self.load(path, url, record, ttl, fresh)
+
+        return self.result(content, parse, record)
+
+    def lookup(self, path, url, record=None, ttl=None):
+        """
+        Return a decoded response from the ResponseCache or local Store without a request, or None.
+        Stored records answer only while they are younger than ``ttl``, or the path's cache TTL.
+        """
+        if self.cache is not None:
+            content = self.cache.get(url)
+            if content is not None:
+                return content
+
+        if self.store is not None and record is not None:
+            if ttl is None:
+                ttl = self.cache.ttl(path) if self.cache is not None else ttl_for(path)
+            return self.store.response(path, record.__name__, None if ttl == FOREVER else ttl)
+
+        return None
+
+    def result(self, content, parse=first_result, record=None):
+        "Parse a decoded response, wrapping the result in a record class if the client returns records"
+        if callable(parse):
+            content = parse(content)
+
+        if record is not None and self.records:
+            from .records import to_records
+            content = to_records(record, content)
+
+        return content
+
+    def load(self, path, url, record=None, ttl=None, fresh=False):
+        """
+        Request a URL and return its decoded response, before parsing, saving its records to the Store.
+        An expired ResponseCache entry is revalidated with a conditional request, and served on 304.
+        """
+        stale = self.cache.stale(url) if self.cache is not None else None
+
+        log.debug(url)
+
+        try:
+            resp, content = self.request(url, self.headers(stale, fresh))
+            content, served = self.revalidate(path, url, resp, content, stale, ttl)
+        except Exception as e:
+            if self.stats is not None:
+                self.stats.error(path, e)
+            raise
+
+        if self.stats is not None:
+            self.stats.cache(path, bool(getattr(resp, 'fromcache', False)))
+            self.stats.serve(path, served)
+
+        if self.store is not None and record is not None:
+            self.store.save(path, record.__name__, content.get('results'))
+
+        return content
+
+    def headers(self, stale=None, fresh=False):
+        """
+        Request headers: the API key, gzip, and a stale cache entry's validators.
+        ``fresh`` adds Cache-Control: no-cache, so httplib2's cache passes the request on.
+        """
+        headers = {'X-API-Key': self.apikey, 'Accept-Encoding': 'gzip, deflate'}
+        if fresh:
+            headers['Cache-Control'] = 'no-cache'
+        if stale is not None and stale.etag:
+            headers['If-None-Match'] = stale.etag
+        if stale is not None and stale.last_modified:
+            headers['If-Modified-Since'] = stale.last_modified
+        return headers
+
+    def revalidate(self, path, url, resp, content, stale=None, ttl=None):
+        """
+        Return a response's decoded content and its size: on 304 Not Modified,
+        the stale entry's content, renewed in the cache without decoding anything;
+        otherwise the body, decoded by ``handle``.
+        """
+        if resp.status == 304 and stale is not None:
+            self.cache.revalidate(url, path, ttl)
+            return stale.content, stale.size
+        return self.handle(path, url, resp, content, parse=None, ttl=ttl), len(content)
+
+    def query_store(self, record, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Query records saved in the client's local Store, without any request.
+        See ``Store.query`` for filters; results are records if the client returns records.
+        """
+        if self.store is None:
+            raise CampaignFinanceError("Local queries need a store, e.g. CampaignFinance(store='campaign_finance.sqlite')")
+
+        results = self.store.query(record.__name__, start, end, order, limit, **filters)
+        return self.result(results, None, record)
+
+    def request(self, url, headers):
+        """
+        Send a GET request, waiting on the rate limiter and retrying
+        transient failures. Returns the response and its raw body.
+        """
+        import httplib2
+
+        http = self.pool.http or self.http
+        attempt = 0
+        stats = self.stats
+        path = url[len(self.BASE_URI):]
+
+        while True:
+            if self.limiter is not None:
+                waited = time.perf_counter()
+                self.limiter.acquire(self.priority)
+                if stats is not None:
+                    stats.wait(path, time.perf_counter() - waited)
+
+            sent = time.perf_counter()
+            try:
+                resp, content = http.request(url, headers=headers)
+            except (socket.error, httplib2.HttpLib2Error):
+                if self.retry is None or not self.retry.should_retry(attempt):
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                if stats is not None:
+                    transferred = getattr(http, 'transferred', None)
+                    stats.request(path, time.perf_counter() - sent, len(content), resp.status, transferred)
+                if self.limiter is not None:
+                    self.limiter.feedback(resp.status)
+                if self.retry is None or not self.retry.should_retry(attempt, resp.status):
+                    return resp, content
+                delay = self.retry.delay(attempt, resp.get('retry-after'))
+
+            log.debug("retrying %s in %.2fs", url, delay)
+            if stats is not None:
+                stats.retry(path)
+            time.sleep(delay)
+            attempt += 1
+
+    def fetch_many(self, paths, parse=first_result, ordered=True, record=None):
+        """
+        Fetch many paths in parallel on the client's worker pool.
+
+        Yields a ``BatchResult(key, value, error)`` for each path, in input
+        order, or as each request finishes when ``ordered`` is False.
+        A failed request sets ``error`` instead of aborting the batch.
+
+        ::
+
+            >>> for result in client.fetch_many(paths):
+            ...     if result.ok:
+            ...         print(result.key, result.value['name'])
+
+        """
+        return self.imap(lambda path: self.fetch(path, parse, record), paths, ordered)
+
+    def imap(self, fn, items, ordered=True):
+        """
+        Call ``fn(item)`` for each item on the worker pool, yielding a BatchResult
+        per item; see ``WorkerPool.imap``. Batch methods go through this, so that
+        the async client can run them on its event loop instead.
+        """
+        return self.pool.imap(fn, items, ordered)
+
+    def collect(self, fn, items, build):
+        """
+        Call ``fn(item)`` for each item on the worker pool and return
+        ``build(results, errors)``: ``{item: value}`` for the items fetched,
+        with an empty list for NotFound, and ``{item: error}`` for the rest.
+        The async client's ``collect`` is a coroutine, so methods that return
+        this are awaitable there.
+        """
+        results, errors = {}, {}
+        for result in self.imap(fn, items):
+            if result.ok:
+                results[result.key] = result.value or []
+            elif isinstance(result.error, NotFound):
+                results[result.key] = []
+            else:
+                errors[result.key] = result.error
+        return build(results, errors)
+
+    def fetch_cycle(self, path, cycle, parse=first_result, record=None):
+        """
+        Fetch a path for one cycle. Results for closed cycles never change, so
+        they are kept for good: in the ResponseCache with a TTL of FOREVER, or
+        in memory without one.
+        """
+        if cycle >= CURRENT_CYCLE:
+            return self.fetch(path, parse, record)
+        if self.cache is not None:
+            return self.fetch(path, parse, record, FOREVER)
+
+        key = (path, parse, record, self.records)
+        hit = self.closed.get(key)
+        if hit is not None:
+            return hit[0]
+        result = self.fetch(path, parse, record)
+        self.closed.set(key, result, None, 1)
+        return result
+
+    def fetch_history(self, fec_id, path, cycles=None, record=None):
+        """
+        Fetch one record in every cycle, in parallel on the worker pool,
+        and return the results as a History.
+
+        ``path`` is a template with ``{cycle}``; ``cycles`` defaults to every
+        cycle from 1996 to the current one. A cycle with no record (NotFound)
+        is a gap in the History, not an error. Closed cycles are kept for
+        good (see ``fetch_cycle``), so only the current cycle is requested again later.
+        """
+        from .history import History, history_cycles
+
+        cycles = list(cycles or history_cycles())
+        results = {}
+        def fetch(cycle):
+            return self.fetch_cycle(path.format(cycle=cycle), cycle, first_result, record)
+
+        for result in self.imap(fetch, cycles):
+            if isinstance(result.error, NotFound):
+                continue
+            if result.error is not None:
+                raise result.error
+            results[result.key] = result.value
+
+        return History(fec_id, cycles, results)
+
+    def name_index(self, cycle=CURRENT_CYCLE):
+        "This client's NameIndex for a cycle, created on first use"
+        index = self.names.get(cycle)
+        if index is None:
+            from .names import NameIndex
+            index = self.names.setdefault(cycle, NameIndex())
+        return index
+
+    def search_names(self, path, query, cycle, record=None, limit=None, local=True):
+        """
+        Answer a name search from the client's NameIndex for ``cycle`` when
+        a name there starts with the query, or a word of one does. Otherwise
+        request ``path`` and add the results to the index. If the API has
+        nothing either, close misspellings from the index are returned.
+        With ``local=False``, always ask the API.
+        """
+        index = self.name_index(cycle)
+        if local and index.search(query, 1, False):
+            return index.search(query, limit)
+
+        try:
+            results = self.fetch(path, all_results, record)
+        except NotFound:
+            results = []
+        index.add(results)
+        if not results and local:
+            return index.search(query, limit)
+        return results[:limit]
+
+    def stream(self, path, record=None):
+        """
+        Yield the items of a response's ``results`` one at a time.
+
+        With `ijson <https://github.com/ICRAR/ijson>`_ installed, items are
+        parsed incrementally from the response bytes, so a very large results
+        array is never decoded into one list. Without it, or for error
+        responses, the body is decoded whole as usual. Streamed responses
+        are not saved to the ResponseCache or Store.
+        """
+        url = self.BASE_URI + path
+        content = self.lookup(path, url, record)
+        if self.stats is not None:
+            self.stats.cache(path, content is not None)
+        if content is not None:
+            for item in self.result(content, all_results, record):
+                yield item
+            return
 
         log.debug(url)
 
-        resp, content = self.http.request(url, headers=headers)
-        content = u(content)
-        content = json.loads(content)
+        resp, body = self.request(url, self.headers())
+        if self.stats is not None:
+            self.stats.serve(path, len(body))
+
+        if ijson is not None:
+            events = _stream_results(body)
+            status = next(events, None)
+            if status == 'OK':
+                for item in events:
+                    yield self.result(item, None, record)
+                return
+
+        for item in self.handle(path, url, resp, body, all_results):
+            yield self.result(item, None, record)
+
+    def iter_pages(self, path, page_size=20, record=None, fresh=False):
+        """
+        Yield every result from a paged endpoint, following ``offset``
+        until a page comes back with fewer than ``page_size`` results.
+        With ``fresh``, every page is requested from the server (see ``fetch``).
+
+        The next page is fetched on the worker pool while the caller works
+        through the current one, so memory stays at about one page however
+        long the listing is.
+        """
+        def page(offset):
+            return self.fetch(page_path(path, offset), all_results, record, fresh=fresh)
+
+        offset = 0
+        future = self.pool.submit(page, offset)
+        while future is not None:
+            results = future.result()
+            if len(results) < page_size:
+                future = None
+            else:
+                offset += page_size
+                future = self.pool.submit(page, offset)
+
+            for result in results:
+                yield result
+
+    def sweep_dates(self, path, start, end, cycle=None, checkpoint=None, record=None, fresh=False):
+        """
+        Yield every result from a by-date endpoint for each day from start to end,
+        in date order, fetching days in parallel on the worker pool.
+
+        ``path`` is a template with ``{cycle}``, ``{year}``, ``{month}`` and ``{day}``.
+        Without a ``cycle``, each day is requested in the cycle it falls in.
+        ``checkpoint`` is a file path (or Checkpoint) recording finished days,
+        so that an interrupted sweep resumes where it stopped.
+        With ``fresh``, every day is requested from the server (see ``fetch``).
+        """
+        from .sweep import day_path, sweep, sweep_key
+
+        def fetch_day(day):
+            return self.fetch(day_path(path, day, cycle), all_results, record, fresh=fresh)
+
+        return sweep(self.pool, fetch_day, start, end, checkpoint, sweep_key(path, start, end, cycle))
+
+    def handle(self, path, url, resp, content, parse=first_result, ttl=None):
+        """
+        Decode a raw response body, raise for API errors and parse the result.
+        The body is decoded straight from bytes, with orjson or ujson when installed.
+
+        Shared by every transport, so that blocking and asynchronous clients
+        return the same results and raise the same exceptions. Successful
+        responses are stored in the client's ResponseCache, if it has one.
+        """
+        body = content
+        started = time.perf_counter()
+        try:
+            content = loads(content)
+        except ValueError:
+            raise CampaignFinanceError(body, resp, url)
+
+        if self.stats is not None:
+            self.stats.decode(path, time.perf_counter() - started)
 
         # handle errors
         if not content.get('status') == 'OK':
@@ -64,7 +538,52 @@ class Client(object):
 
             raise CampaignFinanceError(content, resp, url)
 
+        if self.cache is not None:
+            self.cache.set(url, path, content, body, ttl, *validators(resp))
+
         if callable(parse):
             content = parse(content)
 
         return content
+
+
+def validators(resp):
+    "Return the ETag and Last-Modified headers of an httplib2 or aiohttp response"
+    headers = getattr(resp, 'headers', resp)
+    return headers.get('etag'), headers.get('last-modified')
+
+
+def _stream_results(body):
+    """
+    Incrementally parse a response body. Yields its status first, then,
+    if the status comes before the results, each item in ``results``.
+    """
+    status = None
+    builder = None
+
+    for prefix, event, value in ijson.parse(io.BytesIO(body), use_float=True):
+        if prefix == 'status' and event == 'string':
+            status = value
+            yield status
+            if status != 'OK':
+                return
+            continue
+
+        if not prefix.startswith('results.item'):
+            continue
+
+        if status is None:
+            # results came first; let the caller decode the whole body
+            yield None
+            return
+
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == 'results.item' and event in ('end_map', 'end_array'):
+                yield builder.value
+                builder = None
+        elif event in ('start_map', 'start_array'):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        else:
+            yield value
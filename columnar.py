@@ -0,0 +1,236 @@
+"""
+Columnar form of independent expenditures, with vectorized aggregation
+
+Requires `NumPy <https://numpy.org/>`_; Parquet export also needs pyarrow.
+
+::
+
+    >>> from campaign_finance.columnar import ExpenditureColumns
+    >>> columns = ExpenditureColumns.from_records(client.independent_spending.iter_all(2018))
+    >>> columns.totals_by('candidate')
+    {'S8TX00285': {'support': 1250000.0, 'oppose': 40000.0, 'total': 1290000.0}, ...}
+
+Amounts are a float64 array and dates a datetime64[D] array. Committee,
+candidate, race and support/oppose are dictionary-encoded: an integer code
+array plus the list of distinct values. Group-bys are single ``bincount``
+passes over those codes, so totals over millions of rows take milliseconds.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .utils import CampaignFinanceError
+
+SUPPORT, OPPOSE = 0, 1
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Columnar results require numpy: pip install numpy")
+
+
+class Dictionary(object):
+    "Encodes repeated strings as small integer codes"
+
+    def __init__(self, values=None):
+        self.values = list(values or ())
+        self.index = dict((value, code) for code, value in enumerate(self.values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _field(expenditure, name):
+    if isinstance(expenditure, dict):
+        return expenditure.get(name)
+    return getattr(expenditure, name, None)
+
+
+def _race(expenditure):
+    "state, office and district, e.g. TX-S or CA-H-12"
+    state, office = _field(expenditure, 'state') or '', _field(expenditure, 'office') or ''
+    district = _field(expenditure, 'district')
+    if office and office[:1].upper() == 'H' and district not in (None, '', '00', 0):
+        return "{0}-{1}-{2}".format(state, office[:1].upper(), district)
+    return "{0}-{1}".format(state, office[:1].upper())
+
+
+def _date(expenditure):
+    value = _field(expenditure, 'date')
+    if not value:
+        return 'NaT'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return value[:10]
+
+
+class ExpenditureColumns(object):
+    """
+    Independent expenditures held as parallel NumPy arrays.
+
+    ``amount`` (float64), ``date`` (datetime64[D]) and the code arrays
+    ``committee``, ``candidate``, ``race`` (int32) and ``support_or_oppose``
+    (int8: 0 support, 1 oppose, -1 unknown). The matching Dictionary
+    of each code array is in ``dictionaries``.
+    """
+
+    KEYS = ('committee', 'candidate', 'race')
+
+    def __init__(self, amount, date, committee, candidate, race, support_or_oppose, dictionaries):
+        _require_numpy()
+        self.amount = amount
+        self.date = date
+        self.committee = committee
+        self.candidate = candidate
+        self.race = race
+        self.support_or_oppose = support_or_oppose
+        self.dictionaries = dictionaries
+
+    def __len__(self):
+        return len(self.amount)
+
+    @classmethod
+    def from_records(cls, expenditures):
+        """
+        Build columns from an iterable of expenditure dicts or records,
+        such as ``independent_spending.iter_all(cycle)``, in one pass.
+        """
+        _require_numpy()
+        dictionaries = dict((key, Dictionary()) for key in cls.KEYS)
+        committees, candidates, races = (dictionaries[key] for key in cls.KEYS)
+
+        amount, date, committee, candidate, race, support = [], [], [], [], [], []
+        for e in expenditures:
+            value = _field(e, 'amount')
+            amount.append(float(value) if value not in (None, '') else 0.0)
+            date.append(_date(e))
+            committee.append(committees.encode(_field(e, 'fec_committee_id') or _field(e, 'committee')))
+            candidate.append(candidates.encode(_field(e, 'fec_candidate_id') or _field(e, 'candidate')))
+            race.append(races.encode(_race(e)))
+            flag = (_field(e, 'support_or_oppose') or '')[:1].upper()
+            support.append(SUPPORT if flag == 'S' else OPPOSE if flag == 'O' else -1)
+
+        return cls(
+            np.array(amount, dtype=np.float64),
+            np.array(date, dtype='datetime64[D]'),
+            np.array(committee, dtype=np.int32),
+            np.array(candidate, dtype=np.int32),
+            np.array(race, dtype=np.int32),
+            np.array(support, dtype=np.int8),
+            dictionaries,
+        )
+
+    def _codes(self, key):
+        if key not in self.KEYS:
+            raise CampaignFinanceError("Can't group expenditures by {0!r}; use one of {1}".format(key, self.KEYS))
+        return getattr(self, key), self.dictionaries[key]
+
+    def sums(self, key):
+        """
+        Return (support, oppose) arrays of totals, indexed by the codes of
+        ``key`` ('committee', 'candidate' or 'race').
+        """
+        codes, dictionary = self._codes(key)
+        size = len(dictionary)
+        support = np.bincount(codes, weights=self.amount * (self.support_or_oppose == SUPPORT), minlength=size)
+        oppose = np.bincount(codes, weights=self.amount * (self.support_or_oppose == OPPOSE), minlength=size)
+        return support, oppose
+
+    def totals_by(self, key):
+        "Return {value: {'support', 'oppose', 'total'}} for each committee, candidate or race"
+        support, oppose = self.sums(key)
+        _, dictionary = self._codes(key)
+        total = np.bincount(getattr(self, key), weights=self.amount, minlength=len(dictionary))
+        return dict(
+            (value, {'support': float(support[i]), 'oppose': float(oppose[i]), 'total': float(total[i])})
+            for i, value in enumerate(dictionary.values))
+
+    def totals_by_day(self):
+        "Return (days, totals): sorted datetime64[D] days and the amount spent on each"
+        valid = ~np.isnat(self.date)
+        days = self.date[valid].astype(np.int64)
+        if not len(days):
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+
+        first = days.min()
+        offsets = days - first
+        present = np.bincount(offsets) > 0
+        totals = np.bincount(offsets, weights=self.amount[valid])
+        return (np.flatnonzero(present) + first).astype('datetime64[D]'), totals[present]
+
+    def top(self, key, n=10, side=None):
+        """
+        Return the ``n`` committees, candidates or races with the most spending,
+        as (value, amount) pairs. ``side`` limits it to SUPPORT or OPPOSE.
+        """
+        support, oppose = self.sums(key)
+        totals = support + oppose if side is None else (support if side == SUPPORT else oppose)
+        order = np.argsort(totals)[::-1][:n]
+        values = self.dictionaries[key].values
+        return [(values[i], float(totals[i])) for i in order]
+
+    def to_arrays(self):
+        "Return every column as a plain array, with codes decoded to object arrays"
+        arrays = {
+            'amount': self.amount,
+            'date': self.date,
+            'support_or_oppose': np.where(self.support_or_oppose == SUPPORT, 'S',
+                                          np.where(self.support_or_oppose == OPPOSE, 'O', '')),
+        }
+        for key in self.KEYS:
+            arrays[key] = np.array(self.dictionaries[key].values, dtype=object)[getattr(self, key)]
+        return arrays
+
+    def to_parquet(self, path):
+        "Write the columns to a Parquet file, with dictionary-encoded strings (requires pyarrow)"
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+        columns = {'amount': pa.array(self.amount), 'date': pa.array(self.date)}
+        for key in self.KEYS:
+            columns[key] = pa.DictionaryArray.from_arrays(
+                pa.array(getattr(self, key)), pa.array(self.dictionaries[key].values, type=pa.string()))
+        columns['support_or_oppose'] = pa.DictionaryArray.from_arrays(
+            pa.array(np.where(self.support_or_oppose < 0, 2, self.support_or_oppose).astype(np.int8)),
+            pa.array(['S', 'O', '']))
+        pq.write_table(pa.table(columns), path)
+
+    def save(self, path):
+        """
+        Write the columns and their dictionaries to a compressed NumPy .npz file.
+        Dictionary values are stored as fixed-width unicode arrays, with a boolean
+        mask of which are missing (None) alongside, so no array needs pickling.
+        """
+        arrays = {}
+        for key in self.KEYS:
+            values = self.dictionaries[key].values
+            arrays[key + '_values'] = np.array(['' if value is None else value for value in values], dtype=np.str_)
+            arrays[key + '_null'] = np.array([value is None for value in values], dtype=np.bool_)
+        np.savez_compressed(
+            path, amount=self.amount, date=self.date, committee=self.committee, candidate=self.candidate,
+            race=self.race, support_or_oppose=self.support_or_oppose, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        "Read columns written by ``save``, without unpickling anything"
+        _require_numpy()
+        with np.load(path, allow_pickle=False) as data:
+            dictionaries = {}
+            for key in cls.KEYS:
+                values = data[key + '_values'].tolist()
+                for code in np.flatnonzero(data[key + '_null']):
+                    values[code] = None
+                dictionaries[key] = Dictionary(values)
+            return cls(data['amount'], data['date'], data['committee'], data['candidate'],
+                       data['race'], data['support_or_oppose'], dictionaries)
@@ -1,13 +1,26 @@
-from .client import Client
+from six.moves.urllib.parse import quote
+
+from .client import Client, all_results
+from .records import Committee, ElectioneeringCommunication, Filing
 from .utils import CURRENT_CYCLE
 
 
 class CommitteesClient(Client):
 
-    def search(self, query, cycle=CURRENT_CYCLE):
-        "Takes a query string, returns all FEC-recognized campaign committees with matching names"
-        path = "{cycle}/committees/search.json?query={query}".format(cycle=cycle, query=query)
-        return self.fetch(path)
+    def search(self, query, cycle=CURRENT_CYCLE, limit=None, local=True):
+        """
+        Takes a query string, returns all FEC-recognized campaign committees with matching names
+
+        Names are looked up in the client's local index for the cycle (see ``name_index()``)
+        first, and requested only when none match; committees the API returns are added to it.
+
+        Parameter	Description
+        =========   ===========
+        limit	    Return at most this many committees
+        local	    False to always ask the API
+        """
+        path = "{cycle}/committees/search.json?query={query}".format(cycle=cycle, query=quote(query))
+        return self.search_names(path, query, cycle, Committee, limit, local)
 
     def get(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -15,12 +28,32 @@ class CommitteesClient(Client):
         returns the specified FEC committee for the given cycle
         """
         path = "{cycle}/committees/{fec_id}.json".format(fec_id=fec_id, cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=Committee)
+
+    def get_many(self, fec_ids, cycle=CURRENT_CYCLE, ordered=True):
+        """
+        Takes FEC-assigned 9-character IDs and a campaign cycle, fetches each committee in parallel
+        and yields a BatchResult per ID, in input order or as they finish
+        """
+        return self.imap(lambda fec_id: self.get(fec_id, cycle), fec_ids, ordered)
+
+    def history(self, fec_id, cycles=None):
+        """
+        Takes an FEC-assigned 9-character ID, fetches the committee in every cycle from 1996
+        to the current one in parallel, and returns a History, a time series by cycle.
+        Cycles without the committee are gaps; closed cycles are cached for good.
+
+        Parameter	Description
+        =========   ===========
+        cycles	    Cycles to fetch instead of all of them
+        """
+        path = "{{cycle}}/committees/{fec_id}.json".format(fec_id=fec_id)
+        return self.fetch_history(fec_id, path, cycles, Committee)
 
     def recently_added(self, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle, returns the 20 most recently added FEC committees in the specified cycle"
         path = "{cycle}/committees/new.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=Committee)
 
     def recently_added_superpacs(self, cycle=CURRENT_CYCLE):
         """
@@ -28,17 +61,20 @@ class CommitteesClient(Client):
         expenditure-only committees, known as "super PACs," in the specified cycle
         """
         path = "{cycle}/committees/superpacs.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=Committee)
 
     def recent_committee_filings(self, fec_id, cycle=CURRENT_CYCLE):
         """
+        Takes a campaign cycle and FEC-assigned 9-character committee ID, returns the
+        committee's most recent electronic filings
+
         Parameter	Description
         =========   ===========
         fec_id	    The FEC-assigned 9-character ID of a committee. To find a committee official FEC ID,
                     use a committee search request or the FEC web site, https://www.fec.gov/.
         """
         path = "{cycle}/committees/{fec_id}/filings.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, all_results, Filing)
 
     def leadership_committees(self, cycle=CURRENT_CYCLE):
         """
@@ -47,7 +83,7 @@ class CommitteesClient(Client):
         by the FEC
         """
         path = "{cycle}/committees/leadership.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=Committee)
 
     def communications(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -62,7 +98,7 @@ class CommitteesClient(Client):
                     use a committee search request or `the FEC web site, <https://www.fec.gov/>`_.
         """
         path = "{cycle}/committees/{fec_id}/electioneering_communications.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=ElectioneeringCommunication)
 
     def bundlers(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -74,5 +110,15 @@ class CommitteesClient(Client):
         fec_id	    The FEC-assigned 9-character ID of a committee. To find a committee official FEC ID,
                     use a committee search request or `the FEC web site, <https://www.fec.gov/>`_.
         """
-        path = "{cycle}/committees/{fec_id}/lobbyist_bundlers.sjon".format(cycle=cycle, fec_id=fec_id)
+        path = "{cycle}/committees/{fec_id}/lobbyist_bundlers.json".format(cycle=cycle, fec_id=fec_id)
         return self.fetch(path)
+
+    def query(self, order=None, limit=None, **filters):
+        """
+        Returns committees saved in the local Store, without a request
+
+        Parameter	Description
+        =========   ===========
+        filters	    Any of key (FEC ID), cycle, name, party, state and committee_type
+        """
+        return self.query_store(Committee, None, None, order, limit, **filters)
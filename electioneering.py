@@ -1,4 +1,5 @@
 from .client import Client
+from .records import ElectioneeringCommunication
 from .utils import CURRENT_CYCLE
 
 
@@ -6,7 +7,12 @@ class ElectioneeringClient(Client):
 
     def recent(self, cycle=CURRENT_CYCLE):
         path = "{cycle}/electioneering_communications.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=ElectioneeringCommunication)
+
+    def iter_recent(self, cycle=CURRENT_CYCLE):
+        "Takes a campaign cycle, yields every electioneering communication in the cycle, most recent first"
+        path = "{cycle}/electioneering_communications.json".format(cycle=cycle)
+        return self.iter_pages(path, record=ElectioneeringCommunication)
     
     def by_date(self, year, month, day, cycle=CURRENT_CYCLE):
         """
@@ -16,10 +22,27 @@ class ElectioneeringClient(Client):
         month	    The two-digit month from 01-12
         day	        The two-digit day from 01-31
         """
-        path = "{cycle}/electioneering_communications/{year}/{month}/{day}".format(
+        path = "{cycle}/electioneering_communications/{year}/{month}/{day}.json".format(
             cycle=cycle,
             year=year,
             month=month,
             day=day
         )
-        self.fetch(path)
+        return self.fetch(path, record=ElectioneeringCommunication)
+
+    def by_date_range(self, start, end, cycle=None, checkpoint=None):
+        """
+        Takes a start and end date, yields every electioneering communication from start to end,
+        in date order. Days are fetched in parallel; pass a checkpoint file to make a long sweep resumable.
+        """
+        return self.sweep_dates(
+            "{cycle}/electioneering_communications/{year}/{month}/{day}.json",
+            start, end, cycle, checkpoint, ElectioneeringCommunication)
+
+
+    def query(self, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Returns electioneering communications saved in the local Store, optionally from start to end,
+        without a request. Filters are any of cycle, fec_committee_id and fec_candidate_id.
+        """
+        return self.query_store(ElectioneeringCommunication, start, end, order, limit, **filters)
@@ -1,4 +1,8 @@
-from .client import Client
+from six.moves.urllib.parse import quote
+
+from .amendments import AmendmentIndex
+from .client import Client, all_results
+from .records import Filing
 from .utils import CURRENT_CYCLE
 
 
@@ -9,13 +13,34 @@ class FilingsClient(Client):
         Takes a campaign cycle and query string, returns information about FEC reports filed electronically
         by committees with names matching the query string
         """
-        path = "{cycle}/filings/search.json?query={query}".format(cycle=cycle, query=query)
-        return self.fetch(path)
+        path = "{cycle}/filings/search.json?query={query}".format(cycle=cycle, query=quote(query))
+        return self.fetch(path, record=Filing)
 
     def by_date(self, year, month, day, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle and filing date, returns information about FEC reports filed electronically on that date"
         path = "{cycle}/filings/{year}/{month}/{day}.json".format(cycle=cycle, year=year, month=month, day=day)
-        return self.fetch(path)
+        return self.fetch(path, record=Filing)
+
+    def by_date_range(self, start, end, cycle=None, checkpoint=None):
+        """
+        Takes a start and end date, yields information about every FEC report filed electronically
+        from start to end, in date order. Days are fetched in parallel; pass a checkpoint file
+        to make a long sweep resumable.
+        """
+        return self.sweep_dates(
+            "{cycle}/filings/{year}/{month}/{day}.json",
+            start, end, cycle, checkpoint, Filing)
+
+    def latest_by_date_range(self, start, end, cycle=None, checkpoint=None, index=None):
+        """
+        Takes a start and end date, yields a Version for each FEC report filed electronically
+        from start to end that is the latest version of its report when it arrives,
+        with the filing it supersedes. Pass an AmendmentIndex to carry on from earlier filings;
+        one is started otherwise.
+        """
+        if index is None:
+            index = AmendmentIndex()
+        return index.stream(self.by_date_range(start, end, cycle, checkpoint))
 
     def types(self, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle, returns a list of available form types for FEC electronic filings"
@@ -30,7 +55,7 @@ class FilingsClient(Client):
         form_type_id	F + integer. To get form type IDs, use an electronic filing form types request.
         """
         path = "{cycle}/filings/types/{form_type_id}.json".format(cycle=cycle, form_type_id=form_type_id)
-        return self.fetch(path)
+        return self.fetch(path, record=Filing)
 
     def presidential_summary(self, filing_id, cycle=CURRENT_CYCLE):
         """
@@ -41,9 +66,20 @@ class FilingsClient(Client):
         filing_id	Integer representing the ID of a Form 3 electronic filing
         """
         path = "{cycle}/filings/{filing_id}.json".format(cycle=cycle, filing_id=filing_id)
-        return self.fetch(path)
+        return self.fetch(path, record=Filing)
 
     def recent_amendments(self, cycle=CURRENT_CYCLE):
         "Takes a campaign cycle, returns the most recent filings that are amendments of earlier filings"
         path = "{cycle}/filings/amendments.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, all_results, Filing)
+
+    def query(self, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Returns filings saved in the local Store, optionally filed from start to end, without a request
+
+        Parameter	Description
+        =========   ===========
+        start, end	Dates bounding date_filed, inclusive
+        filters	    Any of key (filing ID), cycle, fec_committee_id and form_type
+        """
+        return self.query_store(Filing, start, end, order, limit, **filters)
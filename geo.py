@@ -0,0 +1,234 @@
+"""
+Places: states, ZIP codes, House districts, and presidential totals by place
+
+``presidential.sweep_states`` and ``presidential.sweep_zips`` fetch totals
+for many places at once into a PlaceTotals table::
+
+    >>> states = client.presidential.sweep_states(2016)
+    >>> states.total('OH')
+    20554912.5
+    >>> states.column('sanders')[:3]
+    array('d', [512.0, 20044.0, 1881020.25])
+
+Rows are places and columns candidates, with totals and contribution counts
+in flat ``array`` buffers, so tens of thousands of ZIP codes stay compact.
+"""
+import array
+import bisect
+
+# the 50 states, DC and the territories the FEC reports on
+STATES = (
+    'AK', 'AL', 'AR', 'AS', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'GA', 'GU', 'HI', 'IA', 'ID',
+    'IL', 'IN', 'KS', 'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MO', 'MP', 'MS', 'MT', 'NC', 'ND',
+    'NE', 'NH', 'NJ', 'NM', 'NV', 'NY', 'OH', 'OK', 'OR', 'PA', 'PR', 'RI', 'SC', 'SD', 'TN', 'TX',
+    'UT', 'VA', 'VI', 'VT', 'WA', 'WI', 'WV', 'WY',
+)
+
+# (first, last) 3-digit ZIP prefixes by state; the few prefixes that
+# cross a state line are listed under the state that has most of them
+ZIP_PREFIXES = (
+    (5, 5, 'NY'), (6, 7, 'PR'), (8, 8, 'VI'), (9, 9, 'PR'), (10, 27, 'MA'), (28, 29, 'RI'),
+    (30, 38, 'NH'), (39, 49, 'ME'), (50, 54, 'VT'), (55, 55, 'MA'), (56, 59, 'VT'), (60, 69, 'CT'),
+    (70, 89, 'NJ'), (100, 149, 'NY'), (150, 196, 'PA'), (197, 199, 'DE'), (200, 200, 'DC'),
+    (201, 201, 'VA'), (202, 205, 'DC'), (206, 219, 'MD'), (220, 246, 'VA'), (247, 268, 'WV'),
+    (270, 289, 'NC'), (290, 299, 'SC'), (300, 319, 'GA'), (320, 339, 'FL'), (341, 349, 'FL'),
+    (350, 369, 'AL'), (370, 385, 'TN'), (386, 397, 'MS'), (398, 399, 'GA'), (400, 427, 'KY'),
+    (430, 459, 'OH'), (460, 479, 'IN'), (480, 499, 'MI'), (500, 528, 'IA'), (530, 549, 'WI'),
+    (550, 567, 'MN'), (569, 569, 'DC'), (570, 577, 'SD'), (580, 588, 'ND'), (590, 599, 'MT'),
+    (600, 629, 'IL'), (630, 658, 'MO'), (660, 679, 'KS'), (680, 693, 'NE'), (700, 715, 'LA'),
+    (716, 729, 'AR'), (730, 732, 'OK'), (733, 733, 'TX'), (734, 749, 'OK'), (750, 799, 'TX'),
+    (800, 816, 'CO'), (820, 831, 'WY'), (832, 838, 'ID'), (840, 847, 'UT'), (850, 865, 'AZ'),
+    (870, 884, 'NM'), (885, 885, 'TX'), (889, 898, 'NV'), (900, 961, 'CA'), (967, 968, 'HI'),
+    (969, 969, 'GU'), (970, 979, 'OR'), (980, 994, 'WA'), (995, 999, 'AK'),
+)
+
+_FIRSTS = [first for first, _, _ in ZIP_PREFIXES]
+
+# House seats by state after the 2010 census, for the 2012 to 2020 cycles
+_SEATS_2012 = {
+    'AL': 7, 'AK': 1, 'AZ': 9, 'AR': 4, 'CA': 53, 'CO': 7, 'CT': 5, 'DE': 1, 'FL': 27, 'GA': 14,
+    'HI': 2, 'ID': 2, 'IL': 18, 'IN': 9, 'IA': 4, 'KS': 4, 'KY': 6, 'LA': 6, 'ME': 2, 'MD': 8,
+    'MA': 9, 'MI': 14, 'MN': 8, 'MS': 4, 'MO': 8, 'MT': 1, 'NE': 3, 'NV': 4, 'NH': 2, 'NJ': 12,
+    'NM': 3, 'NY': 27, 'NC': 13, 'ND': 1, 'OH': 16, 'OK': 5, 'OR': 5, 'PA': 18, 'RI': 2, 'SC': 7,
+    'SD': 1, 'TN': 9, 'TX': 36, 'UT': 4, 'VT': 1, 'VA': 11, 'WA': 10, 'WV': 3, 'WI': 8, 'WY': 1,
+}
+
+
+def _reapportion(seats, changes):
+    seats = dict(seats)
+    seats.update(changes)
+    return seats
+
+
+_SEATS_2002 = _reapportion(_SEATS_2012, {
+    'AZ': 8, 'FL': 25, 'GA': 13, 'IL': 19, 'IA': 5, 'LA': 7, 'MA': 10, 'MI': 15, 'MO': 9,
+    'NV': 3, 'NJ': 13, 'NY': 29, 'OH': 18, 'PA': 19, 'SC': 6, 'TX': 32, 'UT': 3, 'WA': 9})
+
+# House seats by state for the cycles from each census's apportionment on
+APPORTIONMENTS = (
+    (1992, _reapportion(_SEATS_2002, {
+        'AZ': 6, 'CA': 52, 'CO': 6, 'FL': 23, 'GA': 11, 'NV': 2, 'NC': 12, 'TX': 30,
+        'CT': 6, 'IL': 20, 'IN': 10, 'MI': 16, 'MS': 5, 'NY': 31, 'OH': 19, 'OK': 6, 'PA': 21, 'WI': 9})),
+    (2002, _SEATS_2002),
+    (2012, _SEATS_2012),
+    (2022, _reapportion(_SEATS_2012, {
+        'TX': 38, 'FL': 28, 'CO': 8, 'MT': 2, 'NC': 14, 'OR': 6,
+        'CA': 52, 'IL': 17, 'MI': 13, 'NY': 26, 'OH': 15, 'PA': 17, 'WV': 2})),
+)
+
+# DC and the territories each elect one non-voting delegate
+DELEGATES = ('AS', 'DC', 'GU', 'MP', 'PR', 'VI')
+
+SENATE_STATES = tuple(state for state in STATES if state not in DELEGATES)
+
+
+def house_seats(cycle):
+    "Return ``{state: seats}`` for the House elected in a cycle, with a seat for each delegate"
+    seats = APPORTIONMENTS[0][1]
+    for first, apportionment in APPORTIONMENTS:
+        if cycle >= first:
+            seats = apportionment
+    seats = dict(seats)
+    seats.update((delegate, 1) for delegate in DELEGATES)
+    return seats
+
+
+def districts(cycle, states=None):
+    """
+    Yield ``(state, district)`` for every House seat in a cycle, in state order.
+    ``district`` is None for a state's single at-large seat.
+    """
+    seats = house_seats(cycle)
+    for state in states or STATES:
+        count = seats.get(state, 0)
+        if count == 1:
+            yield state, None
+            continue
+        for district in range(1, count + 1):
+            yield state, district
+
+
+def state_for_zip(zip):
+    "Return the state a 5-digit ZIP code is in, or None for military and unknown prefixes"
+    try:
+        prefix = int(str(zip)[:3])
+    except ValueError:
+        return None
+    i = bisect.bisect_right(_FIRSTS, prefix) - 1
+    if i < 0 or prefix > ZIP_PREFIXES[i][1]:
+        return None
+    return ZIP_PREFIXES[i][2]
+
+
+class PlaceTotals(object):
+    """
+    Presidential totals for many places in one cycle: a dense table with a
+    row per place and a column per candidate, indexed both ways.
+
+    ``totals`` (float) and ``counts`` (contribution counts, int) are flat
+    row-major arrays of ``len(places) * len(candidates)``; a candidate with
+    no money from a place is 0. Places that returned no results or
+    NotFound have a row of zeros. Places the sweep did not get to, because
+    the quota or ``budget`` ran out or a request failed, are in ``pending``,
+    with any errors in ``errors``; pass the table back as ``previous`` to
+    fetch just those. For state sweeps that is all ``previous`` does: it
+    resumes an unfinished sweep, and does not refresh the states it has.
+
+    For ZIP sweeps, ``states`` is the state table the sweep compared against
+    the previous one, to skip ZIP codes in states whose totals hadn't changed.
+    """
+
+    def __init__(self, cycle, places, candidates, names, totals, counts, pending=(), errors=None, states=None):
+        self.cycle = cycle
+        self.places = list(places)
+        self.candidates = list(candidates)
+        self.names = list(names)
+        self.totals = totals
+        self.counts = counts
+        self.pending = list(pending)
+        self.errors = errors or {}
+        self.states = states
+        self.index = dict((place, row) for row, place in enumerate(self.places))
+        self.columns = dict((candidate, col) for col, candidate in enumerate(self.candidates))
+
+    def __repr__(self):
+        return "<PlaceTotals {0}: {1} places x {2} candidates, {3} pending>".format(
+            self.cycle, len(self.places), len(self.candidates), len(self.pending))
+
+    def __len__(self):
+        return len(self.places)
+
+    def __contains__(self, place):
+        return place in self.index
+
+    @classmethod
+    def build(cls, cycle, places, results, pending=(), errors=None, states=None):
+        """
+        Build a table from ``{place: [result, ...]}`` responses, with rows in
+        the order of ``places``; places missing from ``results`` are skipped.
+        """
+        places = [place for place in places if place in results]
+        candidates, names, columns = [], [], {}
+        for place in places:
+            for result in results[place]:
+                if result.get('candidate') not in columns:
+                    columns[result.get('candidate')] = len(candidates)
+                    candidates.append(result.get('candidate'))
+                    names.append(result.get('full_name'))
+
+        width = len(candidates)
+        totals = array.array('d', bytes(8 * len(places) * width))
+        counts = array.array('q', bytes(8 * len(places) * width))
+        for row, place in enumerate(places):
+            for result in results[place]:
+                cell = row * width + columns[result.get('candidate')]
+                totals[cell] += float(result.get('total') or 0)
+                counts[cell] += int(result.get('contribution_count') or 0)
+
+        return cls(cycle, places, candidates, names, totals, counts, pending, errors, states)
+
+    def _row(self, place):
+        width = len(self.candidates)
+        start = self.index[place] * width
+        return start, start + width
+
+    def row(self, place):
+        "Return ``{candidate: total}`` for one place, leaving out zeros"
+        start, end = self._row(place)
+        return dict((candidate, total) for candidate, total in zip(self.candidates, self.totals[start:end]) if total)
+
+    def results(self, place):
+        "Return one place's results as the API gave them: a dict per candidate with money from it"
+        start, end = self._row(place)
+        return [{'candidate': candidate, 'full_name': name, 'total': self.totals[cell],
+                 'contribution_count': self.counts[cell]}
+                for cell, candidate, name in zip(range(start, end), self.candidates, self.names)
+                if self.totals[cell] or self.counts[cell]]
+
+    def total(self, place, candidate=None):
+        "Total for a place, from one candidate or all of them"
+        if candidate is not None:
+            return self.totals[self.index[place] * len(self.candidates) + self.columns[candidate]]
+        start, end = self._row(place)
+        return sum(self.totals[start:end])
+
+    def column(self, candidate):
+        "Return one candidate's totals in every place, in ``places`` order"
+        col, width = self.columns[candidate], len(self.candidates)
+        return self.totals[col::width] if width else array.array('d')
+
+    def top(self, candidate=None, n=10):
+        "Return the ``n`` places with the most money, for one candidate or all, as (place, total) pairs"
+        if candidate is None:
+            values = [self.total(place) for place in self.places]
+        else:
+            values = self.column(candidate)
+        ranked = sorted(range(len(self.places)), key=values.__getitem__, reverse=True)[:n]
+        return [(self.places[row], values[row]) for row in ranked]
+
+    def to_numpy(self):
+        "Return (totals, counts) as 2-D NumPy arrays of places by candidates, without copying"
+        import numpy as np
+        shape = (len(self.places), len(self.candidates))
+        return (np.frombuffer(self.totals, dtype=np.float64).reshape(shape),
+                np.frombuffer(self.counts, dtype=np.int64).reshape(shape))
@@ -0,0 +1,317 @@
+"""
+Committees, candidates and races linked by independent spending, in memory
+
+``client.graph`` builds an EntityGraph for a cycle. It fetches a
+candidate's or committee's independent expenditures the first time they
+are asked about, in batches on the worker pool, and answers from its
+adjacency indexes after that::
+
+    >>> graph = client.graph(2016)
+    >>> graph.top_spenders('P60007168', 3)
+    [('C00575795', Spending(support=1250000.0, oppose=0.0)), ...]
+    >>> for committee, funded in graph.also_funded('P60007168', 'S').items():
+    ...     print(committee, sorted(funded))
+    >>> graph.path('C00575795', 'S6OH00163', fetch=True)
+    ['C00575795', 'P60007168', 'C00495861', 'S6OH00163']
+
+Edges run from committees to the candidates they spent for or against,
+weighted by the amounts on each side, and from committees and candidates
+to races. Each expenditure is counted once, however many listings it
+arrives in.
+"""
+import collections
+
+from .races import Race
+from .utils import CURRENT_CYCLE, NotFound
+
+# races by the office letter in expenditures and race totals
+CHAMBERS = {'H': 'house', 'S': 'senate', 'P': 'president'}
+
+CANDIDATE = 'candidate'
+COMMITTEE = 'committee'
+
+
+class Spending(collections.namedtuple('Spending', ['support', 'oppose'])):
+    "Independent expenditure totals in support of and in opposition to a candidate"
+    __slots__ = ()
+
+    @property
+    def total(self):
+        return self.support + self.oppose
+
+
+def _field(record, name):
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def _amount(value):
+    return float(value) if value not in (None, '') else 0.0
+
+
+def kind(fec_id):
+    "Whether an FEC ID is a committee's (C...) or a candidate's (H..., S..., P...)"
+    return COMMITTEE if str(fec_id).upper().startswith('C') else CANDIDATE
+
+
+def race_of(item):
+    """
+    The Race an expenditure or race total is for, or None. ``district`` is None
+    for Senate and at-large House races, and ``state`` is None for president.
+    """
+    chamber = CHAMBERS.get(str(_field(item, 'office') or '')[:1].upper())
+    if chamber is None:
+        return None
+    district = None
+    if chamber == 'house':
+        try:
+            district = int(_field(item, 'district')) or None
+        except (TypeError, ValueError):
+            pass
+    return Race(_field(item, 'state') if chamber != 'president' else None, chamber, district)
+
+
+def _side(spending, side):
+    if side is None:
+        return spending.total
+    return spending.support if side.upper().startswith('S') else spending.oppose
+
+
+class EntityGraph(object):
+    """
+    Committees, candidates and races in one cycle, with committee -> candidate
+    spending edges indexed both ways, so each neighbour costs a dict lookup.
+
+    Queries fetch what they need the first time (pass ``fetch=False`` to
+    answer from what is loaded): a candidate's expenditures from
+    ``independent_spending.iter_by_candidate``, a committee's from
+    ``iter_by_committee`` and ``committee_race_totals``. Neighbourhoods
+    whose requests failed are left to fetch again, with their errors in
+    ``errors``, keyed by ``(kind, fec_id)``.
+    """
+
+    def __init__(self, client, cycle=CURRENT_CYCLE):
+        self.client = client
+        self.cycle = cycle
+        self.committees = {}
+        self.candidates = {}
+        self.errors = {}
+        self.edges = 0
+
+        self._recipients = {}
+        self._spenders = {}
+        self._committee_races = {}
+        self._candidate_race = {}
+        self._race_candidates = collections.defaultdict(set)
+        self._seen = set()
+        self._expanded = set()
+
+    def __repr__(self):
+        return "<EntityGraph {0}: {1} committees, {2} candidates, {3} edges, {4} pending>".format(
+            self.cycle, len(self._recipients), len(self._spenders), self.edges, len(self.errors))
+
+    def __contains__(self, fec_id):
+        return fec_id in self._recipients or fec_id in self._spenders
+
+    def add_expenditures(self, expenditures):
+        "Add spending edges from independent expenditures (dicts or records), skipping ones already added"
+        for item in expenditures:
+            committee, candidate = _field(item, 'fec_committee_id'), _field(item, 'fec_candidate_id')
+            if not committee or not candidate:
+                continue
+            uid = _field(item, 'unique_id') or (committee, _field(item, 'transaction_id'), _field(item, 'filing_id'))
+            if uid in self._seen:
+                continue
+            self._seen.add(uid)
+
+            edge = self._recipients.setdefault(committee, {}).get(candidate)
+            if edge is None:
+                # one list per edge, shared by both directions
+                edge = self._recipients[committee][candidate] = [0.0, 0.0]
+                self._spenders.setdefault(candidate, {})[committee] = edge
+                self.edges += 1
+            edge[0 if str(_field(item, 'support_or_oppose')).upper() == 'S' else 1] += _amount(_field(item, 'amount'))
+            self._link(candidate, race_of(item))
+
+    def add_race_totals(self, fec_committee_id, totals):
+        "Set a committee's spending by race from ``committee_race_totals`` results, replacing any before"
+        races = {}
+        for item in totals:
+            race = race_of(item)
+            if race is None:
+                continue
+            edge = races.setdefault(race, [0.0, 0.0])
+            edge[0] += _amount(_field(item, 'support_total'))
+            edge[1] += _amount(_field(item, 'oppose_total'))
+            self._link(_field(item, 'fec_candidate_id'), race)
+        self._committee_races[fec_committee_id] = races
+
+    def _link(self, candidate, race):
+        if candidate and race is not None and candidate not in self._candidate_race:
+            self._candidate_race[candidate] = race
+            self._race_candidates[race].add(candidate)
+
+    def _fetch(self, node):
+        node_kind, fec_id = node
+        spending = self.client.independent_spending
+        if node_kind == CANDIDATE:
+            return list(spending.iter_by_candidate(fec_id, self.cycle)), None
+        try:
+            races = spending.committee_race_totals(fec_id, self.cycle) or []
+        except NotFound:
+            races = []
+        return list(spending.iter_by_committee(fec_id, self.cycle)), races
+
+    def expand(self, fec_ids):
+        """
+        Fetch the spending of every candidate and committee in ``fec_ids`` not
+        fetched already, in parallel, and return the IDs whose requests failed
+        """
+        nodes = []
+        for fec_id in fec_ids:
+            node = (kind(fec_id), fec_id)
+            if node not in self._expanded and node not in nodes:
+                nodes.append(node)
+
+        for result in self.client.pool.imap(self._fetch, nodes, False):
+            node = result.key
+            if result.ok:
+                expenditures, races = result.value
+            elif isinstance(result.error, NotFound):
+                expenditures, races = [], []
+            else:
+                self.errors[node] = result.error
+                continue
+
+            self.add_expenditures(expenditures)
+            if races is not None:
+                self.add_race_totals(node[1], races)
+            self._expanded.add(node)
+            self.errors.pop(node, None)
+
+        return [fec_id for node_kind, fec_id in nodes if (node_kind, fec_id) in self.errors]
+
+    def load(self, fec_ids):
+        """
+        Fetch the committee or candidate record for every ID in ``fec_ids`` not
+        loaded already, in parallel, into ``committees`` and ``candidates``
+        """
+        wanted = {COMMITTEE: [], CANDIDATE: []}
+        for fec_id in fec_ids:
+            loaded = self.committees if kind(fec_id) == COMMITTEE else self.candidates
+            if fec_id not in loaded and fec_id not in wanted[kind(fec_id)]:
+                wanted[kind(fec_id)].append(fec_id)
+
+        for node_kind, loaded, subclient in ((COMMITTEE, self.committees, self.client.committees),
+                                             (CANDIDATE, self.candidates, self.client.candidates)):
+            for result in subclient.get_many(wanted[node_kind], self.cycle, False):
+                if result.ok:
+                    loaded[result.key] = result.value
+                elif isinstance(result.error, NotFound):
+                    loaded[result.key] = None
+                else:
+                    self.errors[node_kind, result.key] = result.error
+
+    def entity(self, fec_id):
+        "Return a committee or candidate record, fetching it the first time, or None if the API has none"
+        self.load([fec_id])
+        return (self.committees if kind(fec_id) == COMMITTEE else self.candidates).get(fec_id)
+
+    def neighbours(self, fec_id, fetch=True):
+        """
+        Return a committee's ``{candidate: Spending}``, or a candidate's
+        ``{committee: Spending}``: everyone it is linked to by spending
+        """
+        if fetch:
+            self.expand([fec_id])
+        index = self._recipients if kind(fec_id) == COMMITTEE else self._spenders
+        return dict((other, Spending(*edge)) for other, edge in index.get(fec_id, {}).items())
+
+    def spending(self, committee, candidate):
+        "Return what a committee spent for and against a candidate, from what is loaded"
+        edge = self._recipients.get(committee, {}).get(candidate)
+        return Spending(*edge) if edge is not None else Spending(0.0, 0.0)
+
+    def races(self, fec_committee_id, fetch=True):
+        "Return ``{Race: Spending}`` for a committee, from its race totals"
+        if fetch:
+            self.expand([fec_committee_id])
+        return dict((race, Spending(*edge)) for race, edge in self._committee_races.get(fec_committee_id, {}).items())
+
+    def race(self, fec_candidate_id, fetch=True):
+        "Return the Race a candidate is running in, or None"
+        if fetch and fec_candidate_id not in self._candidate_race:
+            self.expand([fec_candidate_id])
+        return self._candidate_race.get(fec_candidate_id)
+
+    def candidates_in(self, race):
+        "Return the IDs of candidates seen in a race, from what is loaded"
+        return set(self._race_candidates.get(Race(*race), ()))
+
+    def top_spenders(self, fec_candidate_id, n=10, side=None, fetch=True):
+        """
+        Return the ``n`` committees that spent the most on a candidate, as
+        ``(committee, Spending)`` pairs, by total or by one ``side``, 'S' or 'O'
+        """
+        ranked = sorted(self.neighbours(fec_candidate_id, fetch).items(),
+                        key=lambda pair: _side(pair[1], side), reverse=True)
+        return [pair for pair in ranked if _side(pair[1], side)][:n]
+
+    def top_recipients(self, fec_committee_id, n=10, side=None, fetch=True):
+        "Return the ``n`` candidates a committee spent the most on, as ``(candidate, Spending)`` pairs"
+        ranked = sorted(self.neighbours(fec_committee_id, fetch).items(),
+                        key=lambda pair: _side(pair[1], side), reverse=True)
+        return [pair for pair in ranked if _side(pair[1], side)][:n]
+
+    def also_funded(self, fec_candidate_id, side=None, fetch=True):
+        """
+        Return ``{committee: {candidate: Spending}}``: every other candidate
+        that the committees spending on this one (on ``side``, if given)
+        spent for or against. The committees are fetched in one batch.
+        """
+        spenders = [committee for committee, spending in self.neighbours(fec_candidate_id, fetch).items()
+                    if _side(spending, side)]
+        if fetch:
+            self.expand(spenders)
+        return dict((committee, dict((candidate, Spending(*edge))
+                                     for candidate, edge in self._recipients.get(committee, {}).items()
+                                     if candidate != fec_candidate_id))
+                    for committee in spenders)
+
+    def path(self, source, target, max_hops=4, fetch=False):
+        """
+        Return the shortest chain of IDs linking two committees or candidates
+        through spending, or None if there is none within ``max_hops`` edges.
+        With ``fetch``, each step's frontier is fetched in one batch first.
+        """
+        if source == target:
+            return [source]
+
+        parents = {source: None}
+        frontier = [source]
+        for _ in range(max_hops):
+            if fetch:
+                self.expand(frontier)
+            following = []
+            for node in frontier:
+                index = self._recipients if kind(node) == COMMITTEE else self._spenders
+                for other in index.get(node, ()):
+                    if other in parents:
+                        continue
+                    parents[other] = node
+                    if other == target:
+                        chain = [other]
+                        while parents[chain[-1]] is not None:
+                            chain.append(parents[chain[-1]])
+                        return chain[::-1]
+                    following.append(other)
+            if not following:
+                break
+            frontier = following
+        return None
+
+    def to_rows(self):
+        "Return one dict per spending edge: ``fec_committee_id``, ``fec_candidate_id``, ``support`` and ``oppose``"
+        return [{'fec_committee_id': committee, 'fec_candidate_id': candidate, 'support': edge[0], 'oppose': edge[1]}
+                for committee, candidates in self._recipients.items() for candidate, edge in candidates.items()]
@@ -0,0 +1,101 @@
+"""
+Cross-cycle histories of one candidate or committee
+
+``candidates.history`` and ``committees.history`` fetch a record in every
+cycle at once and return a History, a time series by cycle::
+
+    >>> history = client.candidates.history('P60007168')
+    >>> history.cycles
+    [2008, 2010, 2012, 2014, 2016]
+    >>> history.series('total_receipts')
+    [(2008, 1234.5), (2010, 0.0), ...]
+
+Cycles where the API has no record are ``gaps``.
+"""
+import collections
+
+from .utils import CURRENT_CYCLE, FIRST_CYCLE
+
+
+def history_cycles(first=FIRST_CYCLE, last=CURRENT_CYCLE):
+    "Every cycle from first to last, oldest first"
+    return range(first, last + 1, 2)
+
+
+def _get(result, field):
+    if isinstance(result, dict):
+        return result.get(field)
+    return getattr(result, field, None)
+
+
+class History(object):
+    """
+    One record's results by cycle, oldest first. Iterating yields
+    ``(cycle, result)`` pairs for the cycles that have a result.
+    """
+
+    def __init__(self, fec_id, cycles, results):
+        self.fec_id = fec_id
+        self.requested = sorted(cycles)
+        self.results = collections.OrderedDict(
+            (cycle, results[cycle]) for cycle in self.requested if cycle in results)
+
+    def __repr__(self):
+        return "<History {0}: {1} cycles, {2} gaps>".format(self.fec_id, len(self), len(self.gaps))
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return iter(self.results.items())
+
+    def __contains__(self, cycle):
+        return cycle in self.results
+
+    def __getitem__(self, cycle):
+        return self.results[cycle]
+
+    @property
+    def cycles(self):
+        "Cycles with a result"
+        return list(self.results)
+
+    @property
+    def gaps(self):
+        "Cycles requested that had no result"
+        return [cycle for cycle in self.requested if cycle not in self.results]
+
+    @property
+    def latest(self):
+        "The most recent result, or None"
+        if not self.results:
+            return None
+        return next(reversed(self.results.values()))
+
+    def series(self, field):
+        "Return ``[(cycle, value)]`` for one field, for each cycle with a result"
+        return [(cycle, _get(result, field)) for cycle, result in self.results.items()]
+
+    def to_rows(self):
+        "Return one dict per cycle, with the cycle under ``cycle``"
+        rows = []
+        for cycle, result in self.results.items():
+            row = dict(result.to_dict() if hasattr(result, 'to_dict') else result)
+            row['cycle'] = cycle
+            rows.append(row)
+        return rows
+
+    def to_columns(self, fields=None):
+        """
+        Return a dict of lists, one per field plus ``cycle``, aligned by
+        cycle; a field missing from a cycle's result is None.
+        """
+        rows = self.to_rows()
+        if fields is None:
+            fields = []
+            for row in rows:
+                fields.extend(field for field in row if field != 'cycle' and field not in fields)
+        columns = {'cycle': [row['cycle'] for row in rows]}
+        for field in fields:
+            columns[field] = [row.get(field) for row in rows]
+        return columns
@@ -1,4 +1,5 @@
-from .client import Client
+from .client import Client, all_results
+from .records import IndependentExpenditure
 from .utils import CURRENT_CYCLE
 
 
@@ -9,10 +10,18 @@ class IndependentSpendingClient(Client):
         Takes a campaign cycle and an optional offset in multiples of 20, 
         returns the 200 most recent independent expenditures
         """
-        path = "{cycle}/independent_expenditures.json"
+        path = "{cycle}/independent_expenditures.json".format(cycle=cycle)
         if offset:
             path = path + "?offset={offset}".format(offset=offset)
-        return self.fetch(path)
+        return self.fetch(path, record=IndependentExpenditure)
+
+    def iter_all(self, cycle=CURRENT_CYCLE):
+        """
+        Takes a campaign cycle, yields every independent expenditure in the cycle, most recent first,
+        fetching page after page in the background
+        """
+        path = "{cycle}/independent_expenditures.json".format(cycle=cycle)
+        return self.iter_pages(path, record=IndependentExpenditure)
 
     def by_date(self, year, month, day, cycle=CURRENT_CYCLE):
         """
@@ -32,7 +41,17 @@ class IndependentSpendingClient(Client):
             month=month,
             day=day
         )
-        return self.fetch(path)
+        return self.fetch(path, record=IndependentExpenditure)
+
+    def by_date_range(self, start, end, cycle=None, checkpoint=None):
+        """
+        Takes a start and end date (dates of activity), yields every independent expenditure
+        from start to end, in date order. Days are fetched in parallel; pass a checkpoint file
+        to make a long sweep resumable.
+        """
+        return self.sweep_dates(
+            "{cycle}/independent_expenditures/{year}/{month}/{day}.json",
+            start, end, cycle, checkpoint, IndependentExpenditure)
     
     def by_committee(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -45,7 +64,12 @@ class IndependentSpendingClient(Client):
                     use a committee search request or `the FEC web site, <https://www.fec.gov/>`_.
         """
         path = "{cycle}/committees/{fec_id}/independent_expenditures.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=IndependentExpenditure)
+
+    def iter_by_committee(self, fec_id, cycle=CURRENT_CYCLE):
+        "Takes a campaign cycle and committee ID, yields every independent expenditure by the committee"
+        path = "{cycle}/committees/{fec_id}/independent_expenditures.json".format(cycle=cycle, fec_id=fec_id)
+        return self.iter_pages(path, record=IndependentExpenditure)
 
     def by_candidate(self, fec_id, cycle=CURRENT_CYCLE):
         """
@@ -59,7 +83,12 @@ class IndependentSpendingClient(Client):
                     use a candidate search request or `the FEC web site, <https://www.fec.gov/>`_.
         """
         path = "{cycle}/candidates/{fec_id}/independent_expenditures.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, record=IndependentExpenditure)
+
+    def iter_by_candidate(self, fec_id, cycle=CURRENT_CYCLE):
+        "Takes a campaign cycle and candidate ID, yields every independent expenditure for or against the candidate"
+        path = "{cycle}/candidates/{fec_id}/independent_expenditures.json".format(cycle=cycle, fec_id=fec_id)
+        return self.iter_pages(path, record=IndependentExpenditure)
 
     def by_presidential(self, cycle=CURRENT_CYCLE):
         """
@@ -67,7 +96,21 @@ class IndependentSpendingClient(Client):
         support of or opposition to any presidential candidate
         """
         path = "{cycle}/president/independent_expenditures.json".format(cycle=cycle)
-        return self.fetch(path)
+        return self.fetch(path, record=IndependentExpenditure)
+
+    def iter_by_presidential(self, cycle=CURRENT_CYCLE):
+        "Takes a campaign cycle, yields every independent expenditure for or against a presidential candidate"
+        path = "{cycle}/president/independent_expenditures.json".format(cycle=cycle)
+        return self.iter_pages(path, record=IndependentExpenditure)
+
+    def to_columns(self, expenditures):
+        """
+        Takes an iterable of independent expenditures (dicts or records), such as `iter_all()` or
+        `iter_by_candidate()`, returns them as ExpenditureColumns: NumPy arrays with vectorized totals
+        per candidate, committee, race and day, and columnar export. Requires numpy.
+        """
+        from .columnar import ExpenditureColumns
+        return ExpenditureColumns.from_records(expenditures)
 
     def by_office(self, office, cycle=CURRENT_CYCLE):
         """
@@ -93,4 +136,15 @@ class IndependentSpendingClient(Client):
                     use a committee search request or `the FEC web site, <https://www.fec.gov/>`_.
         """
         path = "{cycle}/committees/{fec_id}/independent_expenditures/races.json".format(cycle=cycle, fec_id=fec_id)
-        return self.fetch(path)
+        return self.fetch(path, all_results)
+
+    def query(self, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Returns independent expenditures saved in the local Store, optionally from start to end, without a request
+
+        Parameter	        Description
+        =========           ===========
+        start, end	        Dates bounding the expenditure date, inclusive
+        filters	            Any of cycle, fec_committee_id, fec_candidate_id, support_or_oppose and amount
+        """
+        return self.query_store(IndependentExpenditure, start, end, order, limit, **filters)
@@ -0,0 +1,126 @@
+"""
+Candidate leaderboards for many categories and cycles, ranked once
+
+``candidates.leaders_matrix`` fetches every category for every cycle at
+once and indexes the rankings, so lookups need no more requests::
+
+    >>> leaders = client.candidates.leaders_matrix(cycles=[2014, 2016])
+    >>> leaders.rank('P60007168', 'receipts-total', 2016)
+    3
+    >>> leaders.ranks('P60007168', 2016)
+    {'receipts-total': 3, 'individual-total': 1, 'end-cash': 7}
+"""
+import collections
+
+# the candidate total each leaders category is ranked by
+CATEGORY_FIELDS = collections.OrderedDict([
+    ('candidate-loan', 'candidate_loans'),
+    ('contribution-total', 'total_contributions'),
+    ('debts-owed', 'debts_owed'),
+    ('disbursements-total', 'total_disbursements'),
+    ('end-cash', 'end_cash'),
+    ('individual-total', 'total_from_individuals'),
+    ('pac-total', 'total_from_pacs'),
+    ('receipts-total', 'total_receipts'),
+    ('refund-total', 'total_refunds'),
+])
+
+
+def _field(candidate, name):
+    if isinstance(candidate, dict):
+        return candidate.get(name)
+    return getattr(candidate, name, None)
+
+
+class LeadersMatrix(object):
+    """
+    Leaderboards by ``(category, cycle)``, in the API's order, with every
+    rank (from 1) and amount indexed by candidate, category and cycle.
+
+    Leaderboards whose request failed are in ``pending``, with their errors
+    in ``errors``; a leaderboard that came back NotFound is empty.
+    """
+
+    def __init__(self, boards, pending=(), errors=None):
+        self.boards = collections.OrderedDict(boards)
+        self.pending = list(pending)
+        self.errors = errors or {}
+
+        self.categories = []
+        self.cycles = []
+        self.candidates = {}
+        self._ranks = {}
+        self._by_candidate = collections.defaultdict(dict)
+        for (category, cycle), leaders in self.boards.items():
+            if category not in self.categories:
+                self.categories.append(category)
+            if cycle not in self.cycles:
+                self.cycles.append(cycle)
+            for rank, candidate in enumerate(leaders, 1):
+                fec_id = _field(candidate, 'id')
+                self.candidates.setdefault(fec_id, candidate)
+                self._ranks[fec_id, category, cycle] = rank
+                self._by_candidate[fec_id][category, cycle] = rank
+
+    def __repr__(self):
+        return "<LeadersMatrix: {0} categories x {1} cycles, {2} candidates, {3} pending>".format(
+            len(self.categories), len(self.cycles), len(self.candidates), len(self.pending))
+
+    def __len__(self):
+        return len(self.boards)
+
+    def __contains__(self, fec_id):
+        return fec_id in self._by_candidate
+
+    def leaders(self, category, cycle):
+        "Return one leaderboard, highest first"
+        return self.boards[category, cycle]
+
+    def leader(self, category, cycle, rank=1):
+        "Return the candidate at a rank, or None"
+        leaders = self.boards.get((category, cycle), ())
+        return leaders[rank - 1] if 0 < rank <= len(leaders) else None
+
+    def rank(self, fec_id, category, cycle):
+        "Return a candidate's rank in one leaderboard, or None if they aren't on it"
+        return self._ranks.get((fec_id, category, cycle))
+
+    def amount(self, fec_id, category, cycle):
+        "Return the total a candidate is ranked by in one leaderboard, or None"
+        rank = self._ranks.get((fec_id, category, cycle))
+        if rank is None:
+            return None
+        return _field(self.boards[category, cycle][rank - 1], CATEGORY_FIELDS.get(category, category))
+
+    def ranks(self, fec_id, cycle=None):
+        """
+        Return a candidate's ranks: ``{category: rank}`` in one cycle,
+        or ``{(category, cycle): rank}`` across all of them
+        """
+        ranks = self._by_candidate.get(fec_id, {})
+        if cycle is None:
+            return dict(ranks)
+        return dict((category, rank) for (category, c), rank in ranks.items() if c == cycle)
+
+    def compare(self, category, other, cycle):
+        """
+        Return ``(fec_id, rank, other_rank)`` for candidates on both leaderboards
+        in a cycle, ordered by their rank in ``category``
+        """
+        return [(_field(candidate, 'id'), rank, self._ranks[_field(candidate, 'id'), other, cycle])
+                for rank, candidate in enumerate(self.boards.get((category, cycle), ()), 1)
+                if (_field(candidate, 'id'), other, cycle) in self._ranks]
+
+    def movement(self, fec_id, category):
+        "Return ``[(cycle, rank)]`` for a candidate in one category, oldest cycle first, None where unranked"
+        return [(cycle, self._ranks.get((fec_id, category, cycle))) for cycle in sorted(self.cycles)]
+
+    def to_rows(self):
+        "Return one dict per ranking, with ``category``, ``cycle`` and ``rank`` added"
+        rows = []
+        for (category, cycle), leaders in self.boards.items():
+            for rank, candidate in enumerate(leaders, 1):
+                row = dict(candidate.to_dict() if hasattr(candidate, 'to_dict') else candidate)
+                row.update(category=category, cycle=cycle, rank=rank)
+                rows.append(row)
+        return rows
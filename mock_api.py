@@ -0,0 +1,467 @@
+"""
+A local stand-in for the ProPublica Campaign Finance API
+
+Serves realistic fixture responses for every path the subclients build,
+so that tests and benchmarks can run offline without using any quota::
+
+    >>> from campaign_finance import CampaignFinance
+    >>> from campaign_finance.mock_api import MockAPI
+    >>> with MockAPI() as api:
+    ...     client = CampaignFinance('key', cache=None, base_uri=api.url)
+    ...     client.candidates.get('P80003338')
+
+Or in its own process, for load tests::
+
+    python -m campaign_finance.mock_api --port 8000 --latency 0.05
+
+Fixtures are generated from each path, so the same path always returns the
+same results. Listings of independent expenditures and late contributions
+are paged by ``offset``, 20 at a time, up to ``page_total`` results. Paths
+with ``NOTFOUND`` in them return the API's "Record not found" error, those
+with ``SLOW`` take ``slow`` seconds, and those with ``FAIL`` answer 500
+with an HTML body. ``latency`` delays every response, and a ``failure_rate``
+share of requests are answered 503 with ``Retry-After: 0``.
+
+Like the real API, responses carry an ETag and Last-Modified, conditional
+requests for unchanged results are answered 304 Not Modified, and bodies
+are gzipped for clients that accept it.
+"""
+import functools
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .leaders import CATEGORY_FIELDS
+
+PAGE_SIZE = 20
+PREFIX = re.compile(r'^/(?:campaign-finance/v1/)?')
+
+STATES = ('AZ', 'CA', 'FL', 'GA', 'IL', 'MI', 'NC', 'NY', 'OH', 'PA', 'TX', 'WI')
+PARTIES = ('REP', 'DEM', 'IND', 'LIB')
+PRESIDENTIAL = ('clinton', 'sanders', 'trump', 'cruz', 'rubio', 'kasich')
+FORM_TYPES = ('F3', 'F3X', 'F3P', 'F24', 'F5', 'F6', 'F9', 'F1', 'F2', 'F99')
+
+
+def _money(rand):
+    return round(rand.random() * 1000000, 2)
+
+
+def _fec_id(rand, prefix='C'):
+    return '{0}{1:08d}'.format(prefix, rand.randrange(10 ** 8))
+
+
+def _day(rand, cycle):
+    return '{0}-{1:02d}-{2:02d}'.format(cycle - rand.randrange(2), rand.randrange(1, 13), rand.randrange(1, 29))
+
+
+def _totals(rand):
+    return dict((name, _money(rand)) for name in (
+        'total_receipts', 'total_contributions', 'total_from_individuals', 'total_from_pacs',
+        'candidate_loans', 'total_disbursements', 'begin_cash', 'end_cash', 'total_refunds', 'debts_owed'))
+
+
+def candidate(rand, cycle, fec_id=None):
+    fec_id = fec_id or '{0}{1}{2}{3:05d}'.format(
+        rand.choice('HSP'), cycle % 10, rand.choice(STATES), rand.randrange(10 ** 5))
+    state = fec_id[2:4] if fec_id[2:4].isalpha() else rand.choice(STATES)
+    item = {
+        'id': fec_id, 'name': 'CANDIDATE, {0}'.format(fec_id), 'party': rand.choice(PARTIES),
+        'district': '/seats/{0}/house/{1:02d}.json'.format(state, rand.randrange(1, 30)),
+        'fec_uri': 'https://www.fec.gov/data/candidate/{0}/'.format(fec_id),
+        'committee': '/committees/{0}.json'.format(_fec_id(rand)), 'state': '/states/{0}.json'.format(state),
+        'mailing_address': '{0} MAIN ST'.format(rand.randrange(1, 9999)), 'mailing_city': 'SPRINGFIELD',
+        'mailing_state': state, 'mailing_zip': '{0:05d}'.format(rand.randrange(10 ** 5)), 'status': 'C',
+        'date_coverage_from': '{0}-01-01'.format(cycle - 1), 'date_coverage_to': '{0}-09-30'.format(cycle),
+    }
+    item.update(_totals(rand))
+    return item
+
+
+def committee(rand, cycle, fec_id=None):
+    fec_id = fec_id or _fec_id(rand)
+    item = {
+        'id': fec_id, 'name': 'COMMITTEE {0}'.format(fec_id), 'address': '{0} K ST NW'.format(rand.randrange(1, 9999)),
+        'city': 'WASHINGTON', 'state': rand.choice(STATES), 'zip': '{0:05d}'.format(rand.randrange(10 ** 5)),
+        'treasurer': 'TREASURER, PAT', 'party': rand.choice(PARTIES),
+        'fec_uri': 'https://www.fec.gov/data/committee/{0}/'.format(fec_id), 'candidate': None,
+        'leadership': False, 'super_pac': rand.random() < 0.2, 'sponsor_name': None,
+        'designation': 'U', 'designation_full': 'Unauthorized', 'committee_type': 'Q',
+        'committee_type_full': 'PAC - Qualified', 'filing_frequency': 'Q', 'interest_group': None,
+        'date_coverage_from': '{0}-01-01'.format(cycle - 1), 'date_coverage_to': '{0}-09-30'.format(cycle),
+    }
+    item.update(_totals(rand))
+    return item
+
+
+def expenditure(rand, cycle, fec_committee_id=None, fec_candidate_id=None):
+    fec_committee_id = fec_committee_id or _fec_id(rand)
+    fec_candidate_id = fec_candidate_id or '{0}{1}{2}{3:05d}'.format(
+        rand.choice('HS'), cycle % 10, rand.choice(STATES), rand.randrange(10 ** 5))
+    day = _day(rand, cycle)
+    return {
+        'fec_committee_id': fec_committee_id, 'committee': '/committees/{0}.json'.format(fec_committee_id),
+        'committee_name': 'COMMITTEE {0}'.format(fec_committee_id), 'fec_candidate_id': fec_candidate_id,
+        'candidate': '/candidates/{0}.json'.format(fec_candidate_id), 'candidate_name': 'CANDIDATE, {0}'.format(fec_candidate_id),
+        'office': fec_candidate_id[0], 'state': fec_candidate_id[2:4], 'district': '{0:02d}'.format(rand.randrange(0, 30)),
+        'support_or_oppose': rand.choice('SO'), 'date': day, 'date_received': day, 'dissemination_date': day,
+        'amount': _money(rand) / 100, 'purpose': rand.choice(('TV AD', 'DIGITAL ADS', 'MAILERS', 'CANVASSING')),
+        'payee': 'MEDIA BUYERS LLC', 'transaction_id': 'SE.{0}'.format(rand.randrange(10 ** 7)),
+        'unique_id': '{0}-{1}'.format(fec_committee_id, rand.randrange(10 ** 9)),
+        'filing_id': rand.randrange(10 ** 6, 2 * 10 ** 6), 'amendment': 'N',
+        'fec_uri': 'https://docquery.fec.gov/cgi-bin/forms/{0}/'.format(fec_committee_id),
+    }
+
+
+def filing(rand, cycle, fec_committee_id=None, filing_id=None, form_type=None):
+    fec_committee_id = fec_committee_id or _fec_id(rand)
+    filing_id = filing_id or rand.randrange(10 ** 6, 2 * 10 ** 6)
+    amended = rand.random() < 0.1
+    return {
+        'id': filing_id, 'filing_id': filing_id, 'fec_committee_id': fec_committee_id,
+        'committee': '/committees/{0}.json'.format(fec_committee_id), 'committee_name': 'COMMITTEE {0}'.format(fec_committee_id),
+        'committee_type': 'Q', 'candidate': None, 'report_title': 'OCTOBER QUARTERLY', 'report_period': 'Q3',
+        'form_type': form_type or rand.choice(FORM_TYPES), 'date_filed': _day(rand, cycle),
+        'date_coverage_from': '{0}-07-01'.format(cycle), 'date_coverage_to': '{0}-09-30'.format(cycle),
+        'fec_uri': 'https://docquery.fec.gov/dcdev/posted/{0}.fec'.format(filing_id), 'paper': False,
+        'amended': amended, 'is_amendment': amended, 'amended_uri': None,
+        'original_filing': filing_id - rand.randrange(1, 1000) if amended else None, 'original_uri': None,
+        'receipts_total': _money(rand), 'contributions_total': _money(rand), 'disbursements_total': _money(rand),
+        'cash_on_hand': _money(rand), 'loans': _money(rand) / 10, 'debts': _money(rand) / 10,
+    }
+
+
+def late_contribution(rand, cycle, fec_candidate_id=None, fec_committee_id=None):
+    fec_candidate_id = fec_candidate_id or '{0}{1}{2}{3:05d}'.format(
+        rand.choice('HS'), cycle % 10, rand.choice(STATES), rand.randrange(10 ** 5))
+    fec_committee_id = fec_committee_id or _fec_id(rand)
+    return {
+        'fec_committee_id': fec_committee_id, 'committee': '/committees/{0}.json'.format(fec_committee_id),
+        'committee_name': 'COMMITTEE {0}'.format(fec_committee_id), 'fec_candidate_id': fec_candidate_id,
+        'candidate': '/candidates/{0}.json'.format(fec_candidate_id), 'candidate_name': 'CANDIDATE, {0}'.format(fec_candidate_id),
+        'contributor_fname': 'ALEX', 'contributor_lname': 'DONOR', 'contributor_name': 'DONOR, ALEX',
+        'contributor_city': 'ALBANY', 'contributor_state': rand.choice(STATES),
+        'contributor_zip': '{0:05d}'.format(rand.randrange(10 ** 5)), 'contributor_employer': 'SELF',
+        'contributor_occupation': 'RETIRED', 'contribution_amount': float(rand.choice((1000, 2700, 5000))),
+        'contribution_date': '{0}-10-{1:02d}'.format(cycle, rand.randrange(20, 32)),
+        'transaction_id': 'SA.{0}'.format(rand.randrange(10 ** 7)), 'fec_filing_id': rand.randrange(10 ** 6, 2 * 10 ** 6),
+        'fec_uri': 'https://docquery.fec.gov/cgi-bin/forms/{0}/'.format(fec_committee_id),
+    }
+
+
+def communication(rand, cycle, fec_committee_id=None):
+    fec_committee_id = fec_committee_id or _fec_id(rand)
+    item = expenditure(rand, cycle, fec_committee_id)
+    for name in ('support_or_oppose', 'date_received', 'dissemination_date', 'unique_id', 'amendment'):
+        del item[name]
+    item.update({'communication_date': item['date'], 'filing_date': item['date']})
+    return item
+
+
+def race_candidate(rand, cycle, state, chamber=None, district=None):
+    chamber = chamber or rand.choice(('house', 'senate'))
+    fec_id = '{0}{1}{2}{3:05d}'.format(chamber[0].upper(), cycle % 10, state, rand.randrange(10 ** 5))
+    return {
+        'candidate': {'id': fec_id, 'name': 'CANDIDATE, {0}'.format(fec_id), 'party': rand.choice(PARTIES),
+                      'relative_uri': '/candidates/{0}.json'.format(fec_id)},
+        'committee': '/committees/{0}.json'.format(_fec_id(rand)),
+        'district': '/seats/{0}/{1}/{2:02d}.json'.format(state, chamber, int(district or 0)),
+        'total_receipts': _money(rand), 'total_disbursements': _money(rand), 'cash_on_hand': _money(rand),
+        'date_coverage_from': '{0}-01-01'.format(cycle - 1), 'date_coverage_to': '{0}-09-30'.format(cycle),
+    }
+
+
+def presidential_totals(rand, cycle, fec_id=None):
+    fec_id = fec_id or _fec_id(rand)
+    item = {'name': 'CANDIDATE, {0}'.format(fec_id), 'committee_id': fec_id, 'party': rand.choice(PARTIES),
+            'candidate_id': 'P{0}{1:07d}'.format(cycle % 10, rand.randrange(10 ** 7)),
+            'contributions_less_than_200': _money(rand), 'contributions_2700': _money(rand)}
+    item.update(_totals(rand))
+    return item
+
+
+def place_totals(rand, cycle, place, name):
+    return {'candidate': name, 'full_name': name.title(),
+            'contribution_count': rand.randrange(1, 5000), 'total': _money(rand), 'zip': place, 'state': place}
+
+
+def race_totals(rand, cycle, *args):
+    fec_id = '{0}{1}{2}{3:05d}'.format(rand.choice('HS'), cycle % 10, rand.choice(STATES), rand.randrange(10 ** 5))
+    return {'fec_candidate_id': fec_id, 'candidate_name': 'CANDIDATE, {0}'.format(fec_id), 'office': fec_id[0],
+            'state': fec_id[2:4], 'district': '{0:02d}'.format(rand.randrange(0, 30)),
+            'support_total': _money(rand), 'oppose_total': _money(rand)}
+
+
+def form_type(rand, cycle, form):
+    return {'id': form, 'name': 'Form {0}'.format(form[1:])}
+
+
+# how a route turns a fixture into results; each takes
+# (api, key, cycle, offset, *groups) and returns a list
+
+def many(count, make):
+    def route(api, key, cycle, offset, *groups):
+        rand = random.Random(key)
+        return [make(rand, cycle, *groups) for _ in range(count)]
+    return route
+
+
+def one(make):
+    return many(1, make)
+
+
+def paged(make):
+    "Results ``offset`` to ``offset + 20`` of ``page_total``, the same wherever they are paged from"
+    def route(api, key, cycle, offset, *groups):
+        return [make(random.Random('{0}#{1}'.format(key, i)), cycle, *groups)
+                for i in range(offset, min(offset + PAGE_SIZE, api.page_total))]
+    return route
+
+
+def daily(make):
+    def route(api, key, cycle, offset, *groups):
+        rand = random.Random(key)
+        return [make(rand, cycle, *groups) for _ in range(api.day_size)]
+    return route
+
+
+def field(make):
+    "One result for each presidential candidate with money from a place; some places have none"
+    def route(api, key, cycle, offset, place):
+        rand = random.Random(key)
+        return [make(rand, cycle, place, name) for name in PRESIDENTIAL if rand.random() < 0.8]
+    return route
+
+
+def leaders(api, key, cycle, offset, category):
+    "20 of a cycle's 40 best-funded candidates, ranked by the category's total"
+    field = CATEGORY_FIELDS.get(category, 'total_receipts')
+    field_pool = [candidate(random.Random('leaders/{0}#{1}'.format(cycle, i)), cycle) for i in range(40)]
+    ranked = random.Random(key).sample(field_pool, 20)
+    return sorted(ranked, key=lambda item: item[field], reverse=True)
+
+
+def races(api, key, cycle, offset, state, chamber=None, district=None):
+    rand = random.Random(key)
+    return [race_candidate(rand, cycle, state, chamber, district) for _ in range(rand.randrange(2, 8))]
+
+
+def types(api, key, cycle, offset):
+    return [form_type(None, cycle, form) for form in FORM_TYPES]
+
+
+DATE = r'\d{4}/\d{1,2}/\d{1,2}'
+ID = r'([A-Z0-9]+)'
+
+# matched in order against each path, after its cycle
+ROUTES = [(re.compile(r'^(\d{4})/' + pattern + r'\.(?:json|sjon)$'), route) for pattern, route in [
+    (r'candidates/search', many(5, candidate)),
+    (r'candidates/leaders/([\w-]+)', leaders),
+    (r'candidates/{0}/48hour'.format(ID), paged(lambda r, c, i: late_contribution(r, c, i))),
+    (r'candidates/{0}/independent_expenditures'.format(ID), paged(lambda r, c, i: expenditure(r, c, None, i))),
+    (r'candidates/{0}'.format(ID), one(candidate)),
+    (r'committees/search', many(5, committee)),
+    (r'committees/(?:new|superpacs|leadership)', many(20, committee)),
+    (r'committees/{0}/filings'.format(ID), many(20, filing)),
+    (r'committees/{0}/48hour'.format(ID), paged(lambda r, c, i: late_contribution(r, c, None, i))),
+    (r'committees/{0}/independent_expenditures/races'.format(ID), many(10, race_totals)),
+    (r'committees/{0}/independent_expenditures'.format(ID), paged(expenditure)),
+    (r'committees/{0}/electioneering_communications'.format(ID), many(20, communication)),
+    (r'committees/{0}/lobbyist_bundlers'.format(ID), many(10, late_contribution)),
+    (r'committees/{0}'.format(ID), one(committee)),
+    (r'races/([A-Z]{2})(?:/(house|senate))?(?:/(\d+))?', races),
+    (r'contributions/48hour/' + DATE, daily(late_contribution)),
+    (r'contributions/48hour', paged(late_contribution)),
+    (r'electioneering_communications/' + DATE, daily(communication)),
+    (r'electioneering_communications', many(20, communication)),
+    (r'filings/search', many(20, filing)),
+    (r'filings/' + DATE, daily(filing)),
+    (r'filings/types', types),
+    (r'filings/types/(F\w+)', many(20, lambda r, c, form: filing(r, c, form_type=form))),
+    (r'filings/amendments', many(20, filing)),
+    (r'filings/(\d+)', one(lambda r, c, i: filing(r, c, filing_id=int(i)))),
+    (r'independent_expenditures/race_totals/(\w+)', many(20, race_totals)),
+    (r'independent_expenditures/' + DATE, daily(expenditure)),
+    (r'independent_expenditures', paged(expenditure)),
+    (r'president/totals', many(20, presidential_totals)),
+    (r'president/candidates/([\w-]+)', one(lambda r, c, name: presidential_totals(r, c))),
+    (r'president/states/([A-Z]{2})', field(place_totals)),
+    (r'president/zips/(\d{5})', field(place_totals)),
+    (r'president/independent_expenditures', paged(lambda r, c: expenditure(r, c, None, 'P{0}0000000'.format(c % 10)))),
+]]
+
+OFFSET = re.compile(r'[?&]offset=(\d+)')
+
+NOT_FOUND = {'status': 'ERROR', 'errors': [{'error': 'Record not found'}]}
+
+# fixtures never change, so they were all last modified at once
+LAST_MODIFIED = 'Tue, 08 Nov 2016 12:00:00 GMT'
+
+
+class MockAPI(object):
+    """
+    Serves fixture responses from a thread, on ``host`` and ``port``
+    (0 picks a free port). ``url`` is the base URI to give a client.
+    ``requests`` counts the requests answered.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, slow=1.0, failure_rate=0,
+                 page_total=2000, day_size=50, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.slow = slow
+        self.failure_rate = failure_rate
+        self.page_total = page_total
+        self.day_size = day_size
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}/campaign-finance/v1/'.format(self.host, self.port)
+
+    def bind(self):
+        "Open the listening socket, so that ``url`` has the real port"
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        return self
+
+    def start(self):
+        "Start serving in a daemon thread, and return self"
+        self.bind()
+        threading.Thread(target=self._server.serve_forever, name='mock_api', daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def response(self, path, headers=None):
+        "Return (status, headers, body) for a request path"
+        with self._lock:
+            self.requests += 1
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+
+        if self.latency:
+            time.sleep(self.latency)
+        if 'SLOW' in path:
+            time.sleep(self.slow)
+
+        if headers is not None and not headers.get('X-API-Key'):
+            return 403, {}, _json({'status': 'ERROR', 'errors': [{'error': 'Forbidden'}]})
+        if failed:
+            return 503, {'Retry-After': '0'}, b'<html><body>Service Unavailable</body></html>'
+        if 'FAIL' in path:
+            return 500, {}, b'<html><body>Internal Server Error</body></html>'
+
+        path = PREFIX.sub('', path)
+        key, _, query = path.partition('?')
+        match = OFFSET.search('?' + query)
+        offset = int(match.group(1)) if match else 0
+
+        if 'NOTFOUND' in key:
+            return 404, {}, _json(NOT_FOUND)
+
+        body, etag, compressed = self.encoded(key, offset)
+        validators = {'ETag': etag, 'Last-Modified': LAST_MODIFIED}
+        if headers is not None and (headers.get('If-None-Match') == etag or
+                                    headers.get('If-Modified-Since') == LAST_MODIFIED):
+            return 304, validators, b''
+        if headers is not None and 'gzip' in (headers.get('Accept-Encoding') or ''):
+            validators.update({'Content-Encoding': 'gzip', 'Content-Type': 'application/json'})
+            return 200, validators, compressed
+        return 200, validators, body
+
+    @functools.lru_cache(maxsize=4096)
+    def encoded(self, key, offset=0):
+        "The body for a path, its ETag, and the body gzipped, cached"
+        body = self.body(key, offset)
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest()[:16])
+        return body, etag, gzip.compress(body, 6)
+
+    def body(self, key, offset=0):
+        "The encoded response for a path without its query string"
+        for pattern, route in ROUTES:
+            match = pattern.match(key)
+            if match:
+                cycle = int(match.group(1))
+                results = route(self, key, cycle, offset, *match.groups()[1:])
+                return _json({
+                    'status': 'OK', 'copyright': 'Copyright (c) ProPublica Inc. All Rights Reserved.',
+                    'cycle': cycle, 'num_results': len(results), 'offset': offset, 'results': results,
+                })
+        return _json(NOT_FOUND)
+
+
+def _json(data):
+    return json.dumps(data).encode('utf-8')
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # send headers and body in one write, without waiting on Nagle's algorithm
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            status, headers, body = api.response(self.path, self.headers)
+            self.send_response(status)
+            self.send_header('Content-Type', headers.pop(
+                'Content-Type', 'application/json' if body[:1] == b'{' else 'text/html'))
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Campaign Finance API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help="0 picks a free port")
+    parser.add_argument('--latency', type=float, default=0, help="seconds to delay every response")
+    parser.add_argument('--failure-rate', type=float, default=0, help="share of requests answered 503")
+    parser.add_argument('--page-total', type=int, default=2000, help="results in each paged listing")
+    args = parser.parse_args()
+
+    api = MockAPI(args.host, args.port, args.latency, failure_rate=args.failure_rate, page_total=args.page_total)
+    api.bind()
+    print(api.url, flush=True)
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
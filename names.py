@@ -0,0 +1,161 @@
+"""
+A local index of candidate and committee names, for search as you type
+
+``candidates.search`` and ``committees.search`` look in the client's
+NameIndex for the cycle first, and ask the API only when nothing local
+matches, adding what comes back. Records fetched some other way can be
+added in bulk::
+
+    >>> index = client.candidates.name_index(2016)
+    >>> index.add(client.candidates.query(cycle=2016))
+    >>> [c['name'] for c in client.candidates.search('clin', 2016)]
+    ['CLINE, BEN', 'CLINTON, HILLARY RODHAM']
+
+Names are matched on prefixes, whole and word by word, through sorted
+arrays searched with bisect, so a keystroke costs microseconds rather
+than a request. Shared trigrams then match misspellings such as
+``'clintn'``.
+"""
+import bisect
+import collections
+import math
+import re
+import threading
+
+_NON_WORD = re.compile(r'[^0-9A-Z]+')
+
+
+def _field(record, name):
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def normalize(name):
+    "Upper-case a name and reduce punctuation and runs of spaces to single spaces"
+    return _NON_WORD.sub(' ', (name or '').upper()).strip()
+
+
+def trigrams(name):
+    "The set of three-character substrings of a normalized name, padded at word edges"
+    padded = '  ' + name + ' '
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class NameIndex(object):
+    """
+    Records by ID, indexed for prefix search by their normalized ``name``
+    and by each word of it, in sorted arrays, and by trigrams for fuzzy
+    search. Adding a record with an ID already indexed replaces it.
+
+    ``search`` ranks an exact name first, then names starting with the
+    query, alphabetically, then names with a word starting with each word
+    of the query, by that word. Prefix lookups stop once ``limit`` names
+    are found. With ``fuzzy``, names with at least ``threshold`` of the
+    query's trigrams fill any places left, closest first.
+    """
+
+    def __init__(self, records=()):
+        self.records = {}
+        self._names = {}
+        self._full = []
+        self._words = []
+        self._trigrams = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self.add(records)
+
+    def __repr__(self):
+        return "<NameIndex: {0} names>".format(len(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, fec_id):
+        return fec_id in self.records
+
+    def add(self, records):
+        "Index records (dicts or typed records) with an ``id`` and ``name``"
+        with self._lock:
+            full, words = [], []
+            for record in records:
+                fec_id, name = _field(record, 'id'), normalize(_field(record, 'name'))
+                if fec_id is None or not name:
+                    continue
+                if self._names.get(fec_id) != name:
+                    self._remove(fec_id)
+                    self._names[fec_id] = name
+                    full.append((name, fec_id))
+                    words.extend((word, fec_id) for word in set(name.split()))
+                    for gram in trigrams(name):
+                        self._trigrams[gram].add(fec_id)
+                self.records[fec_id] = record
+
+            # one sort merges each new run into its sorted array
+            for index, new in ((self._full, full), (self._words, words)):
+                if new:
+                    index.extend(new)
+                    index.sort()
+
+    def _remove(self, fec_id):
+        name = self._names.pop(fec_id, None)
+        if name is None:
+            return
+        for index, keys in ((self._full, [name]), (self._words, set(name.split()))):
+            for key in keys:
+                del index[bisect.bisect_left(index, (key, fec_id))]
+        for gram in trigrams(name):
+            self._trigrams[gram].discard(fec_id)
+
+    def search(self, query, limit=10, fuzzy=True, threshold=0.5):
+        "Return up to ``limit`` indexed records whose names match ``query``, best first"
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            return [self.records[fec_id] for fec_id in self._search(query, limit, fuzzy, threshold)]
+
+    def _search(self, query, limit, fuzzy, threshold):
+        ids, found = [], set()
+
+        def full():
+            return limit is not None and len(ids) >= limit
+
+        for index, prefix, check in ((self._full, query, False), (self._words, self._selective(query), True)):
+            i = bisect.bisect_left(index, (prefix,))
+            while i < len(index) and index[i][0].startswith(prefix) and not full():
+                fec_id = index[i][1]
+                i += 1
+                if fec_id in found or (check and not self._matches(query, fec_id)):
+                    continue
+                ids.append(fec_id)
+                found.add(fec_id)
+
+        if fuzzy and not full():
+            # a name with enough of the query's trigrams has one of its rarest
+            # len(grams) - needed + 1, so only those names need counting
+            grams = sorted(trigrams(query), key=lambda gram: len(self._trigrams.get(gram, ())))
+            needed = max(1, int(math.ceil(threshold * len(grams))))
+            candidates = set()
+            for gram in grams[:len(grams) - needed + 1]:
+                candidates.update(self._trigrams.get(gram, ()))
+
+            close = []
+            for fec_id in candidates - found:
+                shared = sum(1 for gram in grams if fec_id in self._trigrams.get(gram, ()))
+                if shared >= needed:
+                    close.append((-shared, self._names[fec_id], fec_id))
+            ids.extend(fec_id for _, _, fec_id in sorted(close))
+
+        return ids[:limit]
+
+    def _selective(self, query):
+        "The word of a query that starts the fewest words in the index"
+        def matching(word):
+            following = word[:-1] + chr(ord(word[-1]) + 1)
+            return bisect.bisect_left(self._words, (following,)) - bisect.bisect_left(self._words, (word,))
+        return min(query.split(), key=matching)
+
+    def _matches(self, query, fec_id):
+        "Whether each word of the query starts a word of the name"
+        words = self._names[fec_id].split()
+        return all(any(word.startswith(prefix) for word in words) for prefix in query.split())
@@ -1,5 +1,6 @@
-from .client import Client
-from .utils import CURRENT_CYCLE
+from .client import Client, all_results
+from .geo import STATES, PlaceTotals, state_for_zip
+from .utils import CURRENT_CYCLE, NotFound
 
 
 class PresidentialClient(Client):
@@ -44,3 +45,91 @@ class PresidentialClient(Client):
         """
         path = "{cycle}/president/zips/{zip}.json".format(cycle=cycle, zip=zip)
         return self.fetch(path)
+
+    def sweep_states(self, cycle=CURRENT_CYCLE, states=None, previous=None, budget=None):
+        """
+        Takes a campaign cycle, fetches totals for every state (or just ``states``) in parallel,
+        and returns them as a PlaceTotals table of states by candidates
+
+        Parameter	Description
+        =========   ===========
+        previous	An earlier table to resume: only its pending states are fetched, and
+                    the rest are carried over as they were, however old. To refresh every
+                    state, sweep again without it
+        budget	    The most requests to send; states beyond it are left pending
+        """
+        known = {}
+        if previous is not None:
+            known = dict((state, previous.results(state)) for state in previous.places)
+        path = "{cycle}/president/states/{{place}}.json".format(cycle=cycle)
+        return self.sweep_places(path, cycle, STATES if states is None else states, known, budget)
+
+    def sweep_zips(self, zips, cycle=CURRENT_CYCLE, previous=None, budget=None, states=None):
+        """
+        Takes 5-digit ZIP codes and a campaign cycle, fetches totals for each in parallel,
+        and returns them as a PlaceTotals table of ZIP codes by candidates
+
+        The totals of the states the ZIP codes are in are fetched first, unless a
+        ``states`` table is passed in. With a ``previous`` table, only ZIP codes in
+        states whose totals changed since, or that were pending, are fetched again;
+        the rest are carried over.
+
+        Parameter	Description
+        =========   ===========
+        previous	The table from an earlier sweep of these ZIP codes
+        budget	    The most requests to send, state totals included; the rest are left pending
+        states	    A state table from ``sweep_states`` for the cycle, used instead of fetching one
+        """
+        zips = list(zips)
+        if states is None:
+            wanted = sorted(set(filter(None, map(state_for_zip, zips))))
+            states = self.sweep_states(cycle, wanted, budget=budget)
+            if budget is not None:
+                budget = max(0, budget - len(wanted))
+
+        path = "{cycle}/president/zips/{{place}}.json".format(cycle=cycle)
+        table = self.sweep_places(path, cycle, zips, self.carried_zips(zips, cycle, previous, states), budget)
+        table.states = states
+        return table
+
+    def carried_zips(self, zips, cycle, previous, states):
+        "Return ``{zip: results}`` from a previous table for ZIP codes in states whose totals haven't changed"
+        known = {}
+        if previous is not None and previous.cycle == cycle:
+            unchanged = set(
+                state for state in states.places
+                if previous.states is not None and state in previous.states
+                and states.row(state) == previous.states.row(state))
+            for zip in zips:
+                if zip in previous and state_for_zip(zip) in unchanged:
+                    known[zip] = previous.results(zip)
+        return known
+
+    def sweep_places(self, path, cycle, places, known=None, budget=None):
+        """
+        Fetch ``path``, a template with ``{place}``, for each place not in ``known``
+        on the worker pool, and build a PlaceTotals table. A place with no results
+        or NotFound gets an empty row. Places beyond ``budget``, and those whose request
+        failed, such as with QuotaExceeded once the daily quota runs out, are left pending.
+        """
+        results = dict(known or {})
+        todo = [place for place in places if place not in results]
+        if budget is not None:
+            todo = todo[:budget]
+
+        fetched = self.imap(lambda place: self.fetch(path.format(place=place), all_results), todo, False)
+        return self.tabulate(cycle, places, results, fetched)
+
+    def tabulate(self, cycle, places, results, fetched):
+        "Add a sweep's BatchResults to ``{place: results}`` and build its PlaceTotals table"
+        errors = {}
+        for result in fetched:
+            if result.ok:
+                results[result.key] = result.value or []
+            elif isinstance(result.error, NotFound):
+                results[result.key] = []
+            else:
+                errors[result.key] = result.error
+
+        pending = [place for place in places if place not in results]
+        return PlaceTotals.build(cycle, places, results, pending, errors)
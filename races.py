@@ -0,0 +1,143 @@
+"""
+Every House and Senate race in a cycle, held and indexed in memory
+
+``candidates.race_matrix`` fetches the state x chamber x district table
+once, from the district map in ``geo.py``, and answers questions about
+the whole field without more requests::
+
+    >>> matrix = client.candidates.race_matrix(2018)
+    >>> matrix.money_by_state()['TX']
+    104857600.0
+    >>> for race, candidate in matrix.competitive_candidates():
+    ...     print(race.state, race.district, candidate['candidate']['name'])
+"""
+import collections
+
+Race = collections.namedtuple('Race', 'state chamber district')
+
+
+def race_path(cycle, state, chamber=None, district=None):
+    "The races path for a state, and optionally a chamber and district"
+    path = "{cycle}/races/{state}".format(cycle=cycle, state=state)
+    if chamber:
+        path = path + "/{chamber}".format(chamber=chamber)
+    if district:
+        path = path + "/{district}".format(district=district)
+    return path + ".json"
+
+
+def _field(candidate, name):
+    if isinstance(candidate, dict):
+        return candidate.get(name)
+    return getattr(candidate, name, None)
+
+
+def _amount(candidate, field):
+    value = _field(candidate, field)
+    return float(value) if value not in (None, '') else 0.0
+
+
+def candidate_id(candidate):
+    "The FEC ID of a candidate in a race listing"
+    inner = _field(candidate, 'candidate')
+    if isinstance(inner, dict):
+        return inner.get('id')
+    return inner
+
+
+def _party(candidate):
+    inner = _field(candidate, 'candidate')
+    if isinstance(inner, dict):
+        return inner.get('party')
+    return _field(candidate, 'party')
+
+
+class RaceMatrix(object):
+    """
+    Candidates in every race fetched for one cycle, keyed by
+    ``Race(state, chamber, district)``, where ``district`` is None for
+    Senate and at-large House races. Indexed by state and by candidate.
+
+    Races with no candidates, or NotFound, are empty. Races whose request
+    failed are in ``pending``, with their errors in ``errors``.
+    """
+
+    def __init__(self, cycle, races, pending=(), errors=None):
+        self.cycle = cycle
+        self.races = collections.OrderedDict(races)
+        self.pending = list(pending)
+        self.errors = errors or {}
+
+        self.by_state = collections.OrderedDict()
+        self.by_candidate = {}
+        for race, candidates in self.races.items():
+            self.by_state.setdefault(race.state, []).append(race)
+            for candidate in candidates:
+                self.by_candidate[candidate_id(candidate)] = race
+
+    def __repr__(self):
+        return "<RaceMatrix {0}: {1} races, {2} candidates, {3} pending>".format(
+            self.cycle, len(self.races), len(self.by_candidate), len(self.pending))
+
+    def __len__(self):
+        return len(self.races)
+
+    def __iter__(self):
+        return iter(self.races.items())
+
+    def __getitem__(self, race):
+        return self.races[Race(*race)]
+
+    def race(self, state, chamber, district=None):
+        "Return the candidates in one race"
+        return self.races[Race(state, chamber, district)]
+
+    def race_of(self, fec_id):
+        "Return the Race a candidate is running in, or None"
+        return self.by_candidate.get(fec_id)
+
+    def candidates(self, state=None, chamber=None, party=None):
+        "Return (race, candidate) pairs, optionally for one state, chamber or party"
+        races = self.by_state.get(state, []) if state is not None else self.races
+        return [(race, candidate) for race in races if chamber is None or race.chamber == chamber
+                for candidate in self.races[race] if party is None or _party(candidate) == party]
+
+    def money(self, race, field='total_receipts'):
+        "Return the total of ``field`` over a race's candidates"
+        return sum(_amount(candidate, field) for candidate in self.races[Race(*race)])
+
+    def money_by_state(self, field='total_receipts', chamber=None):
+        "Return ``{state: total}`` of ``field`` over every candidate, optionally in one chamber"
+        return collections.OrderedDict(
+            (state, sum(self.money(race, field) for race in races if chamber is None or race.chamber == chamber))
+            for state, races in self.by_state.items())
+
+    def competitive(self, ratio=0.5, field='total_receipts'):
+        """
+        Return races with at least two candidates where the runner-up
+        has ``ratio`` or more of the leader's ``field``, closest first.
+        """
+        close = []
+        for race, candidates in self.races.items():
+            amounts = sorted((_amount(candidate, field) for candidate in candidates), reverse=True)
+            if len(amounts) >= 2 and amounts[0] > 0 and amounts[1] >= amounts[0] * ratio:
+                close.append((amounts[1] / amounts[0], race))
+        close.sort(key=lambda pair: pair[0], reverse=True)
+        return [race for _, race in close]
+
+    def competitive_candidates(self, ratio=0.5, field='total_receipts'):
+        "Return (race, candidate) pairs for every candidate in a competitive race"
+        return [(race, candidate) for race in self.competitive(ratio, field) for candidate in self.races[race]]
+
+    def to_rows(self):
+        """
+        Return one dict per candidate, with its race's ``state``, ``chamber`` and
+        ``race_district`` (``district`` in a listing is the seat's URI)
+        """
+        rows = []
+        for race, candidates in self.races.items():
+            for candidate in candidates:
+                row = dict(candidate.to_dict() if hasattr(candidate, 'to_dict') else candidate)
+                row.update(state=race.state, chamber=race.chamber, race_district=race.district)
+                rows.append(row)
+        return rows
@@ -0,0 +1,187 @@
+"""
+Client-side rate limiting and retries
+
+A CampaignFinance instance owns one RateLimiter, shared by all of its
+subclients, so every request counts against the same quota. Clients
+created for different workloads can share a limiter too, with a priority
+each, so that interactive lookups jump ahead of background backfills::
+
+    >>> limiter = RateLimiter(rate=5, daily=5000)
+    >>> web = CampaignFinance(limiter=limiter, priority=INTERACTIVE)
+    >>> backfill = CampaignFinance(limiter=limiter, priority=BACKGROUND)
+"""
+import datetime
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from .utils import QuotaExceeded
+
+# priorities: lower goes first
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+
+class RateLimiter(object):
+    """
+    A token bucket refilled at ``rate`` requests per second, holding up to
+    ``burst`` tokens, with an optional cap of ``daily`` requests per UTC day.
+
+    Waiting callers are served in priority order. The rate adapts: it is
+    halved whenever the API answers 429 Too Many Requests, and climbs back
+    towards ``rate`` a little with every successful request, so throughput
+    settles just under the real quota.
+    """
+
+    def __init__(self, rate=5.0, burst=None, daily=None, min_rate=0.1):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.burst = burst or max(1.0, self.max_rate)
+        self.daily = daily
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.day = _utc_today()
+        self.used_today = 0
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        today = _utc_today()
+        if today != self.day:
+            self.day, self.used_today = today, 0
+
+    def _take(self):
+        if self.daily is not None and self.used_today >= self.daily:
+            raise QuotaExceeded("Daily quota of {0} requests used up".format(self.daily))
+        self.tokens -= 1
+        self.used_today += 1
+
+    def acquire(self, priority=NORMAL):
+        """
+        Block until a request may be sent. Raises QuotaExceeded
+        once the daily quota is used up.
+        """
+        with self._cond:
+            ticket = self._join(priority)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self.tokens >= 1:
+                        self._take()
+                        return
+                    if self._waiters[0] == ticket:
+                        self._cond.wait((1 - self.tokens) / self.rate)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._leave(ticket)
+
+    async def acquire_async(self, priority=NORMAL):
+        """
+        Wait until a request may be sent, without blocking the event loop.
+        Coroutines queue with ``acquire``'s threads, so both are served in
+        one priority order. Raises QuotaExceeded once the daily quota is used up.
+        """
+        import asyncio
+
+        with self._cond:
+            ticket = self._join(priority)
+        try:
+            while True:
+                with self._cond:
+                    self._refill()
+                    if self._waiters[0] != ticket:
+                        # the caller ahead takes the next token
+                        wait = 1 / self.rate
+                    elif self.tokens >= 1:
+                        self._take()
+                        return
+                    else:
+                        wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+        finally:
+            with self._cond:
+                self._leave(ticket)
+
+    def _join(self, priority):
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _leave(self, ticket):
+        self._waiters.remove(ticket)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def feedback(self, status):
+        "Adapt the rate to a response status"
+        with self._cond:
+            if status == 429:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, 0)
+            elif status < 400 and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            self._cond.notify_all()
+
+
+class RetryPolicy(object):
+    """
+    Retries failed requests with exponential backoff and jitter,
+    honoring the API's ``Retry-After`` header when it sends one.
+
+    Every API request is an idempotent GET, so retrying is always safe.
+    Connection errors and responses with a status in ``statuses`` are retried,
+    up to ``retries`` times.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, statuses=(429, 500, 502, 503, 504)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+
+    def should_retry(self, attempt, status=None):
+        "Whether to retry after the given (zero-based) attempt; status is None for connection errors"
+        if attempt >= self.retries:
+            return False
+        return status is None or status in self.statuses
+
+    def delay(self, attempt, retry_after=None):
+        "Seconds to wait before the next attempt"
+        if retry_after:
+            seconds = _parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_backoff)
+
+        cap = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+
+def _utc_today():
+    return datetime.date(*time.gmtime()[:3])
+
+
+def _parse_retry_after(value):
+    "Retry-After is either a number of seconds or an HTTP date"
+    from email.utils import parsedate_tz, mktime_tz
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - time.time())
@@ -0,0 +1,231 @@
+"""
+Compact typed records for API results
+
+With ``records=True``, clients return these instead of raw dicts. Known
+fields live in ``__slots__``, so there is no per-record dict and no copy
+of every key string; amounts are stored as numbers, strings of up to 64
+characters (states, parties, IDs, names) are interned so that repeats share
+memory, and dates are parsed with
+``utils.parse_date`` only when first accessed. Unexpected fields are kept
+in ``extra``.
+
+Records also support ``record['field']`` and ``record.get('field')``,
+so code written against the dicts keeps working.
+"""
+import sys
+
+import six
+
+from .utils import parse_date
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass
+
+
+class LazyDate(object):
+    "Descriptor that parses a raw date string on first access, then keeps the result"
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, record, cls):
+        if record is None:
+            return self
+
+        value = getattr(record, self.slot)
+        if isinstance(value, six.string_types):
+            value = parse_date(value) if value else None
+            setattr(record, self.slot, value)
+        return value
+
+
+def _number(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Record(object):
+    """
+    Base class for typed records. Subclasses list their ``fields``,
+    the ``amounts`` to store as numbers and the ``dates`` to parse lazily,
+    and build ``__slots__`` from them with ``slots()``.
+    """
+    __slots__ = ('extra',)
+
+    fields = ()
+    amounts = ()
+    dates = ()
+
+    def __init__(self, data):
+        cls = type(self)
+        extra = None
+
+        for key, value in data.items():
+            if key in cls._amounts:
+                setattr(self, key, _number(value))
+            elif key in cls._dates:
+                setattr(self, '_' + key, value)
+            elif key in cls._fields:
+                if isinstance(value, str) and len(value) <= 64:
+                    value = intern(value)
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+
+        self.extra = extra
+
+    def __getattr__(self, name):
+        # only reached for slots that were never set, and unknown names
+        cls = type(self)
+        if name in cls._slot_names:
+            return None
+
+        extra = self.extra
+        if extra and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def to_dict(self):
+        "Return the record as a plain dict"
+        cls = type(self)
+        data = dict(self.extra or {})
+        for name in cls.fields + cls.amounts + cls.dates:
+            value = getattr(self, '_' + name if name in cls._dates else name)
+            if value is not None:
+                data[name] = value
+        return data
+
+    def __repr__(self):
+        label = getattr(self, 'name', None) or getattr(self, 'id', None)
+        return "<{0}: {1}>".format(type(self).__name__, label)
+
+
+def slots(fields, amounts=(), dates=()):
+    "Build __slots__ for a Record subclass; raw dates live in underscored slots"
+    return tuple(fields) + tuple(amounts) + tuple('_' + name for name in dates)
+
+
+def _prepare(cls):
+    cls._fields = frozenset(cls.fields)
+    cls._amounts = frozenset(cls.amounts)
+    cls._dates = frozenset(cls.dates)
+    cls._slot_names = frozenset(cls.__slots__)
+    for name in cls.dates:
+        setattr(cls, name, LazyDate('_' + name))
+    return cls
+
+
+FINANCIAL_TOTALS = (
+    'total_receipts', 'total_contributions', 'total_from_individuals', 'total_from_pacs',
+    'contributions_from_candidate', 'candidate_loans', 'total_loans', 'total_disbursements',
+    'begin_cash', 'end_cash', 'total_refunds', 'debts_owed',
+    'independent_expenditures', 'coordinated_expenditures',
+)
+
+
+@_prepare
+class Candidate(Record):
+    "A candidate and their campaign's financial totals for a cycle"
+    fields = (
+        'id', 'name', 'party', 'state', 'district', 'status', 'fec_uri', 'committee',
+        'mailing_address', 'mailing_city', 'mailing_state', 'mailing_zip',
+    )
+    amounts = FINANCIAL_TOTALS
+    dates = ('date_coverage_from', 'date_coverage_to')
+    __slots__ = slots(fields, amounts, dates)
+
+
+@_prepare
+class Committee(Record):
+    "A committee and its financial totals for a cycle"
+    fields = (
+        'id', 'name', 'address', 'city', 'state', 'zip', 'treasurer', 'party', 'fec_uri',
+        'candidate', 'leadership', 'super_pac', 'sponsor_name', 'designation', 'designation_full',
+        'committee_type', 'committee_type_full', 'filing_frequency', 'interest_group',
+    )
+    amounts = FINANCIAL_TOTALS
+    dates = ('date_coverage_from', 'date_coverage_to')
+    __slots__ = slots(fields, amounts, dates)
+
+
+@_prepare
+class IndependentExpenditure(Record):
+    "Spending by a committee in support of or opposition to a candidate"
+    fields = (
+        'fec_committee_id', 'committee', 'committee_name', 'fec_candidate_id', 'candidate',
+        'candidate_name', 'office', 'state', 'district', 'support_or_oppose', 'purpose', 'payee',
+        'transaction_id', 'unique_id', 'filing_id', 'amendment', 'fec_uri',
+    )
+    amounts = ('amount',)
+    dates = ('date', 'date_received', 'dissemination_date')
+    __slots__ = slots(fields, amounts, dates)
+
+
+@_prepare
+class Filing(Record):
+    "An electronic FEC filing, with its summary figures"
+    fields = (
+        'id', 'filing_id', 'fec_committee_id', 'committee', 'committee_name', 'committee_type',
+        'candidate', 'report_title', 'report_period', 'form_type', 'fec_uri', 'paper',
+        'amended', 'is_amendment', 'amended_uri', 'original_filing', 'original_uri',
+    )
+    amounts = (
+        'receipts_total', 'contributions_total', 'disbursements_total',
+        'cash_on_hand', 'loans', 'debts',
+    )
+    dates = ('date_filed', 'date_coverage_from', 'date_coverage_to')
+    __slots__ = slots(fields, amounts, dates)
+
+
+@_prepare
+class LateContribution(Record):
+    "A contribution of $1,000 or more reported within 48 hours, shortly before an election"
+    fields = (
+        'fec_committee_id', 'committee', 'committee_name', 'fec_candidate_id', 'candidate',
+        'candidate_name', 'contributor_fname', 'contributor_lname', 'contributor_name',
+        'contributor_city', 'contributor_state', 'contributor_zip', 'contributor_employer',
+        'contributor_occupation', 'transaction_id', 'fec_filing_id', 'fec_uri',
+    )
+    amounts = ('contribution_amount',)
+    dates = ('contribution_date',)
+    __slots__ = slots(fields, amounts, dates)
+
+
+@_prepare
+class ElectioneeringCommunication(Record):
+    "A broadcast ad naming a federal candidate, aired shortly before an election"
+    fields = (
+        'fec_committee_id', 'committee', 'committee_name', 'fec_candidate_id', 'candidate',
+        'candidate_name', 'office', 'state', 'district', 'payee', 'purpose', 'filing_id',
+        'transaction_id', 'fec_uri',
+    )
+    amounts = ('amount',)
+    dates = ('date', 'communication_date', 'filing_date')
+    __slots__ = slots(fields, amounts, dates)
+
+
+def to_records(record, content):
+    "Wrap a parsed result, or a list of them, in a record class"
+    if isinstance(content, dict):
+        return record(content)
+    if isinstance(content, list):
+        return [record(item) if isinstance(item, dict) else item for item in content]
+    return content
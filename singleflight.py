@@ -0,0 +1,104 @@
+"""
+Request coalescing: concurrent fetches of the same URL share one request
+"""
+import threading
+
+
+class _Call(object):
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    runs the function, and everyone who asks for the same key while it is
+    running waits for, and shares, its result or exception.
+
+    Works across threads with ``do``, and across coroutines with ``do_async``.
+    ``calls`` counts every call, ``coalesced`` those that shared another's result.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self._waiting = {}
+
+    def do(self, key, fn):
+        "Return fn(), or the result of a call with the same key already in flight"
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.value
+
+    async def do_async(self, key, fn):
+        """
+        Await fn(), or the result of a coroutine with the same key already in flight.
+        The shared task is cancelled once every caller awaiting it has been cancelled.
+        """
+        import asyncio
+
+        key = (id(asyncio.get_running_loop()), key)
+
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda t: self._forget(key, t))
+            else:
+                self.coalesced += 1
+            self._waiting[task] = self._waiting.get(task, 0) + 1
+
+        try:
+            # shielded, so one caller being cancelled doesn't cancel the rest
+            return await asyncio.shield(task)
+        finally:
+            with self._lock:
+                self._waiting[task] -= 1
+                abandoned = not self._waiting[task]
+                if abandoned:
+                    del self._waiting[task]
+            if abandoned and not task.done():
+                task.cancel()
+
+    def _forget(self, key, task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+        # mark the error retrieved, so a task no caller is left to await isn't logged
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {'calls': self.calls, 'coalesced': self.coalesced}
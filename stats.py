@@ -0,0 +1,245 @@
+"""
+Request metrics, grouped by endpoint
+
+Give a client a Stats object to count what its requests cost::
+
+    >>> stats = Stats()
+    >>> client = CampaignFinance(stats=stats)
+    >>> client.committees.get('C00575795')
+    >>> print(stats.to_prometheus())
+
+Each path is reduced to the endpoint template it was built from, such as
+``{cycle}/committees/{fec_id}.json``, and for each endpoint Stats keeps
+request counts by status, a latency histogram, bytes received, cache hits
+and misses, JSON decode time, retries, rate-limiter waits and errors by
+type. Without a Stats object, clients skip all of it.
+
+Bytes ``transferred`` are response bodies as read from the network, gzipped
+and 304s included; bytes ``served`` are the bodies those requests answered
+with, decompressed, with the cached body for a 304. ``bandwidth()`` compares
+the two, to show what compression and revalidation save.
+"""
+import collections
+import re
+import threading
+
+# latency histogram bucket bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# path rewrites, applied in order, that turn a path back into its template
+TEMPLATES = [(re.compile(pattern), template) for pattern, template in (
+    (r'\?.*$', ''),
+    (r'^\d{4}/', '{cycle}/'),
+    (r'/\d{4}/\d{1,2}/\d{1,2}\.json$', '/{year}/{month}/{day}.json'),
+    (r'/[CHSP]\d[0-9A-Z]{7}(?=[/.])', '/{fec_id}'),
+    (r'/leaders/[\w-]+\.json$', '/leaders/{category}.json'),
+    (r'/filings/types/\w+\.json$', '/filings/types/{form_type_id}.json'),
+    (r'/filings/\d+\.json$', '/filings/{filing_id}.json'),
+    (r'/president/candidates/[\w-]+\.json$', '/president/candidates/{candidate_name}.json'),
+    (r'/president/states/\w+\.json$', '/president/states/{state}.json'),
+    (r'/president/zips/\w+\.json$', '/president/zips/{zip}.json'),
+    (r'/race_totals/\w+\.json$', '/race_totals/{office}.json'),
+    (r'/races/[A-Za-z]{2}(?=[/.])', '/races/{state}'),
+    (r'/races/\{state\}/(?:house|senate)(?=[/.])', '/races/{state}/{chamber}'),
+    (r'/races/\{state\}/\{chamber\}/\d+\.json$', '/races/{state}/{chamber}/{district}.json'),
+)]
+
+
+def template(path):
+    "Return the endpoint template a path was built from"
+    for pattern, replacement in TEMPLATES:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+class Endpoint(object):
+    "Counters for one endpoint template"
+
+    __slots__ = ('statuses', 'buckets', 'seconds', 'bytes', 'transferred', 'served', 'hits', 'misses',
+                 'decode_seconds', 'decodes', 'retries', 'wait_seconds', 'errors')
+
+    def __init__(self):
+        self.statuses = collections.Counter()
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.seconds = 0.0
+        self.bytes = 0
+        self.transferred = 0
+        self.served = 0
+        self.hits = 0
+        self.misses = 0
+        self.decode_seconds = 0.0
+        self.decodes = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self.errors = collections.Counter()
+
+    @property
+    def requests(self):
+        return sum(self.statuses.values())
+
+    def to_dict(self):
+        return {
+            'requests': self.requests, 'statuses': dict(self.statuses),
+            'seconds': self.seconds, 'bytes': self.bytes, 'cache_hits': self.hits, 'cache_misses': self.misses,
+            'transferred_bytes': self.transferred, 'served_bytes': self.served,
+            'decode_seconds': self.decode_seconds, 'decodes': self.decodes, 'retries': self.retries,
+            'wait_seconds': self.wait_seconds, 'errors': dict(self.errors),
+            'buckets': dict(zip(BUCKETS + (float('inf'),), self.buckets)),
+        }
+
+
+class Stats(object):
+    """
+    Thread-safe request metrics for one or more clients, by endpoint template.
+
+    Clients call the recording methods from their request path; any object
+    with the same methods can stand in for this one, to send metrics elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = collections.defaultdict(Endpoint)
+        self._templates = {}
+
+    def endpoint(self, path):
+        "Return the template for a path, remembering recent ones"
+        name = self._templates.get(path)
+        if name is None:
+            if len(self._templates) > 10000:
+                self._templates.clear()
+            name = self._templates[path] = template(path)
+        return name
+
+    def request(self, path, seconds, size, status, transferred=None):
+        """
+        Record one HTTP request: its latency, body size, status, and the
+        bytes read from the network for it, if different from the body size
+        """
+        name = self.endpoint(path)
+        bucket = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+
+        with self._lock:
+            endpoint = self._endpoints[name]
+            endpoint.statuses[status] += 1
+            endpoint.buckets[bucket] += 1
+            endpoint.seconds += seconds
+            endpoint.bytes += size
+            endpoint.transferred += size if transferred is None else transferred
+
+    def serve(self, path, size):
+        "Record the size of the body a request answered with, after decompression or revalidation"
+        name = self.endpoint(path)
+        with self._lock:
+            self._endpoints[name].served += size
+
+    def cache(self, path, hit):
+        "Record whether a fetch was answered from a cache (or Store) or went to the API"
+        name = self.endpoint(path)
+        with self._lock:
+            endpoint = self._endpoints[name]
+            if hit:
+                endpoint.hits += 1
+            else:
+                endpoint.misses += 1
+
+    def decode(self, path, seconds):
+        "Record the time spent decoding a response body"
+        name = self.endpoint(path)
+        with self._lock:
+            endpoint = self._endpoints[name]
+            endpoint.decode_seconds += seconds
+            endpoint.decodes += 1
+
+    def retry(self, path):
+        name = self.endpoint(path)
+        with self._lock:
+            self._endpoints[name].retries += 1
+
+    def wait(self, path, seconds):
+        "Record time spent waiting on the rate limiter"
+        name = self.endpoint(path)
+        with self._lock:
+            self._endpoints[name].wait_seconds += seconds
+
+    def error(self, path, error):
+        "Record an error raised for a fetch, by exception type"
+        name = self.endpoint(path)
+        with self._lock:
+            self._endpoints[name].errors[type(error).__name__] += 1
+
+    def snapshot(self):
+        "Return every endpoint's counters as plain dicts"
+        with self._lock:
+            return dict((name, endpoint.to_dict()) for name, endpoint in self._endpoints.items())
+
+    def bandwidth(self):
+        "Return bytes transferred and served across every endpoint, and the share saved"
+        with self._lock:
+            transferred = sum(endpoint.transferred for endpoint in self._endpoints.values())
+            served = sum(endpoint.served for endpoint in self._endpoints.values())
+        return {'transferred': transferred, 'served': served,
+                'saved': 1 - float(transferred) / served if served else 0.0}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self, prefix='campaign_finance'):
+        "Return the metrics in the Prometheus text exposition format"
+        with self._lock:
+            endpoints = sorted((name, endpoint.to_dict()) for name, endpoint in self._endpoints.items())
+
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append("# HELP {0}_{1} {2}".format(prefix, name, help))
+            lines.append("# TYPE {0}_{1} {2}".format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                lines.append("{0}_{1}{2}{{{3}}} {4}".format(
+                    prefix, name, suffix, ','.join('{0}="{1}"'.format(k, _escape(v)) for k, v in labels), _number(value)))
+
+        metric('requests_total', 'counter', "Requests sent to the API, by endpoint and HTTP status", [
+            ('', [('endpoint', name), ('status', status)], count)
+            for name, e in endpoints for status, count in sorted(e['statuses'].items())])
+
+        samples = []
+        for name, e in endpoints:
+            cumulative = 0
+            for bound, count in sorted(e['buckets'].items()):
+                cumulative += count
+                samples.append(('_bucket', [('endpoint', name), ('le', '+Inf' if bound == float('inf') else repr(bound))], cumulative))
+            samples.append(('_sum', [('endpoint', name)], e['seconds']))
+            samples.append(('_count', [('endpoint', name)], e['requests']))
+        metric('request_seconds', 'histogram', "Time from sending a request to reading its body", samples)
+
+        for key, name, kind, help in (
+                ('bytes', 'response_bytes_total', 'counter', "Response body bytes received"),
+                ('transferred_bytes', 'transferred_bytes_total', 'counter', "Response body bytes read from the network"),
+                ('served_bytes', 'served_bytes_total', 'counter', "Response body bytes served, decompressed or revalidated"),
+                ('cache_hits', 'cache_hits_total', 'counter', "Fetches answered from a cache or Store"),
+                ('cache_misses', 'cache_misses_total', 'counter', "Fetches that went to the API"),
+                ('decode_seconds', 'decode_seconds_total', 'counter', "Time spent decoding JSON responses"),
+                ('decodes', 'decodes_total', 'counter', "JSON responses decoded"),
+                ('retries', 'retries_total', 'counter', "Requests retried"),
+                ('wait_seconds', 'limiter_wait_seconds_total', 'counter', "Time spent waiting on the rate limiter")):
+            metric(name, kind, help, [('', [('endpoint', endpoint)], e[key]) for endpoint, e in endpoints])
+
+        metric('errors_total', 'counter', "Errors raised, by endpoint and exception type", [
+            ('', [('endpoint', name), ('error', error)], count)
+            for name, e in endpoints for error, count in sorted(e['errors'].items())])
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
@@ -0,0 +1,261 @@
+"""
+A local, indexed mirror of fetched records
+
+With a Store, every candidate, committee, filing, expenditure and
+contribution a client fetches is saved in a normalized SQLite database,
+indexed by FEC ID, cycle, date and form type::
+
+    >>> client = CampaignFinance(store='campaign_finance.sqlite')
+    >>> client.committees.recent_committee_filings('C00575795', 2018)
+    >>> client.filings.query(fec_committee_id='C00575795', start='2018-01-01', end='2018-12-31')
+
+Responses fetched within ``max_age`` seconds are answered from the store
+without a request, so reporting jobs can run entirely against local data.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+
+import six
+
+from .utils import CampaignFinanceError, loads
+
+CYCLE = re.compile(r'^(\d{4})/')
+FEC_ID = re.compile(r'([CHSP][0-9A-Z]\w{6,7})(?:\.json)?$')
+
+
+def _fec_id(item, field, uri_field):
+    "An FEC ID from its own field, or from the end of a URI like /committees/C00575795.json"
+    value = item.get(field)
+    if value:
+        return value
+    uri = item.get(uri_field)
+    if isinstance(uri, six.string_types):
+        match = FEC_ID.search(uri)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _date(value):
+    return value[:10] if isinstance(value, six.string_types) and value else None
+
+
+def _join(*values):
+    if not any(values):
+        return None
+    return '|'.join(six.text_type(v) for v in values if v is not None)
+
+
+class Table(object):
+    """
+    How one kind of record is stored: its table, how to derive a unique
+    key from a result, and which fields become indexed columns.
+    """
+
+    def __init__(self, name, key, columns, date=None):
+        self.name = name
+        self.key = key
+        self.columns = columns
+        self.date = date
+
+    def row(self, item):
+        return [getter(item) for _, getter in self.columns]
+
+
+TABLES = {
+    'Candidate': Table('candidates', lambda i: i.get('id'), [
+        ('name', lambda i: i.get('name')),
+        ('party', lambda i: i.get('party')),
+        ('state', lambda i: i.get('state')),
+        ('district', lambda i: i.get('district')),
+    ]),
+    'Committee': Table('committees', lambda i: i.get('id'), [
+        ('name', lambda i: i.get('name')),
+        ('party', lambda i: i.get('party')),
+        ('state', lambda i: i.get('state')),
+        ('committee_type', lambda i: i.get('committee_type')),
+    ]),
+    'Filing': Table('filings', lambda i: i.get('filing_id') or i.get('id'), [
+        ('fec_committee_id', lambda i: _fec_id(i, 'fec_committee_id', 'committee')),
+        ('form_type', lambda i: i.get('form_type')),
+        ('date_filed', lambda i: _date(i.get('date_filed'))),
+    ], date='date_filed'),
+    'IndependentExpenditure': Table('independent_expenditures', lambda i: i.get('unique_id') or _join(
+        _fec_id(i, 'fec_committee_id', 'committee'), i.get('filing_id'), i.get('transaction_id')), [
+        ('fec_committee_id', lambda i: _fec_id(i, 'fec_committee_id', 'committee')),
+        ('fec_candidate_id', lambda i: _fec_id(i, 'fec_candidate_id', 'candidate')),
+        ('support_or_oppose', lambda i: i.get('support_or_oppose')),
+        ('date', lambda i: _date(i.get('date'))),
+        ('amount', lambda i: i.get('amount')),
+    ], date='date'),
+    'LateContribution': Table('late_contributions', lambda i: _join(
+        i.get('fec_filing_id'), i.get('transaction_id'), _fec_id(i, 'fec_committee_id', 'committee')), [
+        ('fec_candidate_id', lambda i: _fec_id(i, 'fec_candidate_id', 'candidate')),
+        ('fec_committee_id', lambda i: _fec_id(i, 'fec_committee_id', 'committee')),
+        ('contribution_date', lambda i: _date(i.get('contribution_date'))),
+        ('contribution_amount', lambda i: i.get('contribution_amount')),
+    ], date='contribution_date'),
+    'ElectioneeringCommunication': Table('electioneering_communications', lambda i: _join(
+        i.get('filing_id'), i.get('transaction_id'), _fec_id(i, 'fec_committee_id', 'committee')), [
+        ('fec_committee_id', lambda i: _fec_id(i, 'fec_committee_id', 'committee')),
+        ('fec_candidate_id', lambda i: _fec_id(i, 'fec_candidate_id', 'candidate')),
+        ('date', lambda i: _date(i.get('date'))),
+    ], date='date'),
+}
+
+
+class Store(object):
+    """
+    Normalized SQLite store of decoded records, shared by a client's subclients.
+
+    ``max_age`` is how many seconds a fetched response may be answered from
+    the store instead of the API; None means forever, 0 means never. Clients
+    cap it at each path's cache TTL, so fast-moving listings are not served stale.
+    """
+
+    def __init__(self, path='campaign_finance.sqlite', max_age=24 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._create()
+
+    def _create(self):
+        with self._db:
+            for table in TABLES.values():
+                columns = ''.join(", {0}".format(name) for name, _ in table.columns)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS {0} (key TEXT NOT NULL, cycle INTEGER{1}, "
+                    "data TEXT NOT NULL, fetched REAL NOT NULL, PRIMARY KEY (key, cycle))".format(table.name, columns))
+                self._db.execute("CREATE INDEX IF NOT EXISTS {0}_cycle ON {0} (cycle)".format(table.name))
+                for name, _ in table.columns:
+                    if name not in ('name', 'amount', 'contribution_amount'):
+                        self._db.execute("CREATE INDEX IF NOT EXISTS {0}_{1} ON {0} ({1}, cycle)".format(table.name, name))
+
+            # which records each fetched path returned, in order
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (path TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+                "cycle INTEGER, keys TEXT NOT NULL, fetched REAL NOT NULL)")
+
+    def save(self, path, kind, results):
+        "Save the results of a fetched path, as records of the given kind (a record class name)"
+        table = TABLES.get(kind)
+        if table is None or not isinstance(results, list):
+            return
+
+        match = CYCLE.match(path)
+        cycle = int(match.group(1)) if match else None
+        now = time.time()
+
+        items = [(table.key(item), item) for item in results if isinstance(item, dict)]
+        if not items or any(key is None for key, _ in items):
+            return
+
+        names = ['key', 'cycle'] + [name for name, _ in table.columns] + ['data', 'fetched']
+        insert = "INSERT OR REPLACE INTO {0} ({1}) VALUES ({2})".format(
+            table.name, ', '.join(names), ', '.join('?' * len(names)))
+
+        with self._lock, self._db:
+            rows = []
+            for key, item in items:
+                key = six.text_type(key)
+                # results from different endpoints carry different fields; keep them all
+                old = self._db.execute(
+                    "SELECT data FROM {0} WHERE key = ? AND cycle IS ?".format(table.name), (key, cycle)).fetchone()
+                if old is not None:
+                    merged = loads(old[0])
+                    merged.update(item)
+                    item = merged
+                rows.append([key, cycle] + table.row(item) + [json.dumps(item), now])
+
+            self._db.executemany(insert, rows)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (path, kind, cycle, keys, fetched) VALUES (?, ?, ?, ?, ?)",
+                (path, kind, cycle, json.dumps([row[0] for row in rows]), now))
+
+    def response(self, path, kind, max_age=None):
+        """
+        Rebuild a decoded response for a path from stored records, or return
+        None if it was never fetched, is older than ``max_age`` (the lower of
+        the argument and the store's), or is incomplete.
+        """
+        if max_age is None or (self.max_age is not None and self.max_age < max_age):
+            max_age = self.max_age
+
+        table = TABLES.get(kind)
+        if table is None or max_age == 0:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cycle, keys, fetched FROM responses WHERE path = ? AND kind = ?", (path, kind)).fetchone()
+            if row is None:
+                return None
+
+            cycle, keys, fetched = row
+            if max_age is not None and time.time() - fetched > max_age:
+                return None
+
+            keys = loads(keys)
+            found = {}
+            for key, data in self._db.execute(
+                    "SELECT key, data FROM {0} WHERE cycle IS ? AND key IN ({1})".format(
+                        table.name, ', '.join('?' * len(keys))), [cycle] + keys):
+                found[key] = data
+
+        if len(found) < len(set(keys)):
+            return None
+
+        results = [loads(found[key]) for key in keys]
+        return {'status': 'OK', 'num_results': len(results), 'results': results}
+
+    def query(self, kind, start=None, end=None, order=None, limit=None, **filters):
+        """
+        Return stored records of a kind matching every filter, e.g.
+        ``query('Filing', fec_committee_id='C00575795', cycle=2018)``.
+        ``start`` and ``end`` bound the kind's date column (inclusive).
+        """
+        table = TABLES.get(kind)
+        if table is None:
+            raise CampaignFinanceError("No local table for {0}".format(kind))
+
+        allowed = set(['key', 'cycle'] + [name for name, _ in table.columns])
+        clauses, params = [], []
+        for name, value in sorted(filters.items()):
+            if name not in allowed:
+                raise CampaignFinanceError("Can't filter {0} by {1!r}; use one of {2}".format(
+                    table.name, name, sorted(allowed)))
+            clauses.append("{0} = ?".format(name))
+            params.append(value)
+
+        if start is not None or end is not None:
+            if table.date is None:
+                raise CampaignFinanceError("{0} have no date to filter by".format(table.name))
+            if start is not None:
+                clauses.append("{0} >= ?".format(table.date))
+                params.append(_date(six.text_type(start)))
+            if end is not None:
+                clauses.append("{0} <= ?".format(table.date))
+                params.append(_date(six.text_type(end)))
+
+        sql = "SELECT data FROM {0}".format(table.name)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        order = order or table.date
+        if order:
+            if order.lstrip('-') not in allowed and order.lstrip('-') != table.date:
+                raise CampaignFinanceError("Can't order {0} by {1!r}".format(table.name, order))
+            sql += " ORDER BY {0}{1}".format(order.lstrip('-'), ' DESC' if order.startswith('-') else '')
+        if limit:
+            sql += " LIMIT {0:d}".format(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [loads(data) for data, in rows]
+
+    def close(self):
+        self._db.close()
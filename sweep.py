@@ -0,0 +1,129 @@
+"""
+Date-range sweeps over the API's by-date endpoints, with resumable checkpoints
+"""
+import datetime
+import json
+import os
+
+import six
+
+from .utils import NotFound, parse_date
+
+
+def to_date(d):
+    "Return a datetime.date for a date, datetime or date string"
+    d = parse_date(d)
+    if isinstance(d, datetime.datetime):
+        d = d.date()
+    return d
+
+
+def date_range(start, end):
+    "Yield each day from start to end, inclusive"
+    day, end = to_date(start), to_date(end)
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def cycle_for(day):
+    "Return the two-year campaign cycle a date falls in (cycles end in even years)"
+    return day.year + day.year % 2
+
+
+def day_path(path, day, cycle=None):
+    "Fill a by-date path template for one day, in ``cycle`` or the cycle the day falls in"
+    return path.format(
+        cycle=cycle or cycle_for(day),
+        year=day.year,
+        month="{0:02d}".format(day.month),
+        day="{0:02d}".format(day.day)
+    )
+
+
+def sweep_key(path, start, end, cycle=None):
+    "The checkpoint key for a sweep of a path template over a date range"
+    return ":".join([path, to_date(start).isoformat(), to_date(end).isoformat(), str(cycle)])
+
+
+class Checkpoint(object):
+    """
+    Remembers the last day each sweep finished, in a small JSON file,
+    so that an interrupted sweep can pick up where it stopped.
+
+    One file can hold checkpoints for several sweeps; each is keyed by
+    endpoint, date range and cycle.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write(self, state):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def load(self, key):
+        "Return the last finished day for a sweep, or None"
+        done = self._read().get(key)
+        return to_date(done) if done else None
+
+    def save(self, key, day):
+        state = self._read()
+        state[key] = day.isoformat()
+        self._write(state)
+
+    def clear(self, key):
+        state = self._read()
+        if state.pop(key, None) is not None:
+            self._write(state)
+
+
+def resume(start, end, checkpoint=None, key=None):
+    """
+    Return a sweep's Checkpoint, or None, and the days from start to end
+    it has still to fetch: those after the last day checkpointed under ``key``
+    """
+    if isinstance(checkpoint, six.string_types):
+        checkpoint = Checkpoint(checkpoint)
+
+    days = date_range(start, end)
+    if checkpoint is not None:
+        done = checkpoint.load(key)
+        if done is not None:
+            days = date_range(done + datetime.timedelta(days=1), end)
+    return checkpoint, days
+
+
+def sweep(pool, fetch_day, start, end, checkpoint=None, key=None):
+    """
+    Call ``fetch_day(day)`` for every day from start to end on a worker pool,
+    yielding each day's records in date order.
+
+    Days with no data (NotFound) yield nothing; any other error stops the sweep.
+    With a checkpoint, every finished day is recorded under ``key``, and a
+    sweep restarted with the same key skips the days already done. The key
+    is cleared once the sweep runs to the end.
+    """
+    checkpoint, days = resume(start, end, checkpoint, key)
+
+    for result in pool.imap(fetch_day, days):
+        if result.error is not None and not isinstance(result.error, NotFound):
+            raise result.error
+
+        for record in result.value or ():
+            yield record
+
+        if checkpoint is not None:
+            checkpoint.save(key, result.key)
+
+    if checkpoint is not None:
+        checkpoint.clear(key)
@@ -0,0 +1,257 @@
+"""
+Incremental sync: a change feed over the API's polling endpoints
+
+A Sync polls new filings, recent amendments, late contributions and newly
+added committees, and yields only what it has not seen before::
+
+    >>> sync = client.sync(state='.sync.json')
+    >>> for change in sync.poll():
+    ...     print(change.feed, change.kind, change.key)
+
+Each feed keeps a high-water mark: the latest filing ID or date it has
+processed. Feeds listed newest first are read only until they drop below
+the mark, and filings by date are fetched only from the mark's day on,
+so each poll costs about as much as the activity since the last one.
+Records at or past the mark are checked against a de-duplication index
+of fingerprints, which tells new records from changed ones and drops
+repeats. Marks and the index are saved to ``state`` once the consumer has
+taken all of a feed's changes, so a crash or early ``break`` loses nothing.
+"""
+import collections
+import datetime
+import hashlib
+import json
+import time
+
+import six
+
+from .client import all_results
+from .records import Committee, Filing, LateContribution
+from .sweep import Checkpoint
+from .utils import CURRENT_CYCLE
+
+NEW = 'new'
+CHANGED = 'changed'
+
+
+class Change(collections.namedtuple('Change', ['feed', 'kind', 'key', 'record'])):
+    "A record that is new to a feed, or has changed since it was last seen"
+    __slots__ = ()
+
+
+def _field(record, name):
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def _plain(record):
+    return record.to_dict() if hasattr(record, 'to_dict') else record
+
+
+def _filing_id(record):
+    value = _field(record, 'filing_id') or _field(record, 'id') or _field(record, 'fec_filing_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _day(name):
+    def mark(record):
+        value = _field(record, name)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return value[:10] if isinstance(value, six.string_types) and value else None
+    return mark
+
+
+def _late_contribution_key(record):
+    values = [_field(record, name) for name in (
+        'fec_filing_id', 'transaction_id', 'fec_committee_id', 'fec_candidate_id')]
+    if not any(values):
+        return None
+    return '|'.join(six.text_type(value or '') for value in values)
+
+
+def fingerprint(record):
+    "A short hash of a record's contents, to tell whether it changed"
+    data = json.dumps(_plain(record), sort_keys=True, default=six.text_type)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class Feed(object):
+    """
+    One polled endpoint.
+
+    ``fetch(mark)`` returns the feed's records, given its current
+    high-water mark (None on the first poll). ``key(record)`` identifies
+    a record, and ``mark(record)`` is its position in the feed, which only
+    grows: a filing ID or an ISO date. With ``newest_first``, reading stops
+    at the first record below the high-water mark.
+    """
+
+    def __init__(self, name, fetch, key, mark=None, newest_first=False):
+        self.name = name
+        self.fetch = fetch
+        self.key = key
+        self.mark = mark
+        self.newest_first = newest_first
+
+
+def default_feeds(client, cycle=CURRENT_CYCLE, lookback=1):
+    """
+    Feeds for new filings by date, recent amendments, late contributions
+    and newly added committees. On the first poll, filings are fetched from
+    ``lookback`` days ago.
+
+    Every feed is fetched ``fresh``, from the server rather than the
+    ResponseCache or Store, which would hide new records until they expired;
+    what comes back is still cached and saved.
+    """
+    def filings(mark):
+        today = datetime.date.today()
+        start = mark or today - datetime.timedelta(days=lookback)
+        return client.filings.sweep_dates(
+            "{cycle}/filings/{year}/{month}/{day}.json", start, today, record=Filing, fresh=True)
+
+    def amendments(mark):
+        path = "{cycle}/filings/amendments.json".format(cycle=cycle)
+        return client.filings.fetch(path, all_results, Filing, fresh=True)
+
+    def late_contributions(mark):
+        # the first poll takes the latest page; later ones page back to the mark
+        path = "{cycle}/contributions/48hour.json".format(cycle=cycle)
+        if mark is None:
+            return client.candidates.fetch(path, all_results, LateContribution, fresh=True)
+        return client.candidates.iter_pages(path, record=LateContribution, fresh=True)
+
+    def committees(mark):
+        path = "{cycle}/committees/new.json".format(cycle=cycle)
+        return client.committees.fetch(path, all_results, Committee, fresh=True)
+
+    return [
+        Feed('filings', filings, _filing_id, _day('date_filed')),
+        Feed('amendments', amendments, _filing_id, _filing_id, newest_first=True),
+        Feed('late_contributions', late_contributions, _late_contribution_key, _filing_id, newest_first=True),
+        Feed('committees', committees, lambda record: _field(record, 'id')),
+    ]
+
+
+class SyncState(Checkpoint):
+    """
+    High-water marks and de-duplication indexes for each feed,
+    in a small JSON file. Without a path, state is kept in memory.
+    """
+
+    def __init__(self, path=None):
+        super(SyncState, self).__init__(path)
+        self._memory = {}
+
+    def _read(self):
+        if self.path is None:
+            return self._memory
+        return super(SyncState, self)._read()
+
+    def _write(self, state):
+        if self.path is None:
+            self._memory = state
+        else:
+            super(SyncState, self)._write(state)
+
+    def feed(self, name):
+        "Return (mark, index) for a feed; the index maps keys to fingerprints, oldest first"
+        saved = self._read().get(name) or {}
+        return saved.get('mark'), collections.OrderedDict(saved.get('seen') or ())
+
+    def update(self, name, mark, index):
+        state = self._read()
+        state[name] = {'mark': mark, 'seen': list(index.items())}
+        self._write(state)
+
+
+class Sync(object):
+    """
+    Polls a set of feeds and yields a Change for each record that is new
+    or changed since the last poll, oldest first within each feed.
+    Delivery is at least once: a feed's progress is saved only after the
+    consumer has taken every change it yielded.
+
+    ``state`` is a path (or SyncState) to persist marks and indexes
+    across runs. ``window`` bounds how many fingerprints each feed keeps.
+    """
+
+    def __init__(self, client, feeds=None, state=None, window=5000, cycle=CURRENT_CYCLE):
+        if not isinstance(state, SyncState):
+            state = SyncState(state)
+        self.client = client
+        self.feeds = feeds if feeds is not None else default_feeds(client, cycle)
+        self.state = state
+        self.window = window
+
+    def poll(self, feeds=None):
+        """
+        Yield every Change from the given feed names, or from all of them.
+
+        A feed's new mark and index are saved only once all of its changes
+        have been taken, so if the consumer stops part way through a feed,
+        the next poll yields that feed's changes again.
+        """
+        for feed in self.feeds:
+            if feeds is not None and feed.name not in feeds:
+                continue
+            changes, pending = self.poll_feed(feed)
+            for change in changes:
+                yield change
+            self.commit(feed, pending)
+
+    def poll_feed(self, feed):
+        """
+        Fetch one feed past its high-water mark and return ``(changes, pending)``,
+        where ``pending`` is the feed's new state. Nothing is saved: pass
+        ``pending`` to ``commit`` once the changes have been handled.
+        """
+        mark, index = self.state.feed(feed.name)
+        high = mark
+        changes = []
+
+        for record in feed.fetch(mark):
+            position = feed.mark(record) if feed.mark is not None else None
+            if mark is not None and position is not None and position < mark:
+                if feed.newest_first:
+                    break
+                continue
+
+            key = feed.key(record)
+            if key is None:
+                continue
+            key = six.text_type(key)
+
+            digest = fingerprint(record)
+            seen = index.pop(key, None)
+            index[key] = digest
+            if seen != digest:
+                changes.append(Change(feed.name, NEW if seen is None else CHANGED, key, record))
+
+            if position is not None and (high is None or position > high):
+                high = position
+
+        while len(index) > self.window:
+            index.popitem(last=False)
+
+        if feed.newest_first:
+            changes.reverse()
+        return changes, (high, index)
+
+    def commit(self, feed, pending):
+        "Save a feed's new mark and index, from ``poll_feed``, after its changes have been handled"
+        high, index = pending
+        self.state.update(feed.name, high, index)
+
+    def watch(self, interval=60, feeds=None):
+        "Poll forever, every ``interval`` seconds, yielding changes as they appear"
+        while True:
+            started = time.time()
+            for change in self.poll(feeds):
+                yield change
+            time.sleep(max(0, interval - (time.time() - started)))
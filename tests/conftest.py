@@ -0,0 +1,15 @@
+import pytest
+
+from campaign_finance import CampaignFinance
+from campaign_finance.mock_api import MockAPI
+
+
+@pytest.fixture
+def api():
+    with MockAPI(page_total=60, day_size=5) as api:
+        yield api
+
+
+@pytest.fixture
+def client(api):
+    return CampaignFinance('key', cache=None, base_uri=api.url, limiter=False)
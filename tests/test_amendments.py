@@ -0,0 +1,52 @@
+import datetime
+
+from campaign_finance import AmendmentIndex
+from campaign_finance.amendments import Version
+
+
+def filing(fid, original=None, committee='C00000001'):
+    return {'filing_id': fid, 'original_filing': original, 'fec_committee_id': committee}
+
+
+def test_amendment_supersedes_its_original():
+    index = AmendmentIndex()
+    assert index.add(filing(10)) == Version(filing(10), None)
+    assert index.add(filing(20, 10)) == Version(filing(20, 10), filing(10))
+    assert index.add(filing(20, 10)) is None
+    # an older amendment of the same report is not the latest version
+    assert index.add(filing(15, 10)) is None
+    assert index.chain(10) == [10, 15, 20]
+    assert index.current(15)['filing_id'] == 20
+    assert index.superseded('C00000001') == [10, 15]
+
+
+def test_chains_merge_when_a_missing_link_arrives():
+    index = AmendmentIndex()
+    index.add(filing(1))
+    index.add(filing(5, 3))
+    assert index.current(1)['filing_id'] == 1
+    assert index.current(3)['filing_id'] == 5
+
+    assert index.add(filing(3, 1)) == Version(None, filing(1))
+    assert index.chain(5) == [1, 3, 5]
+    assert index.current(1)['filing_id'] == 5
+    assert [f['filing_id'] for f in index.latest()] == [5]
+    assert index.superseded('C00000001') == [1, 3]
+
+
+def test_index_over_api_listings(client):
+    filings = list(client.filings.by_date_range(datetime.date(2016, 3, 1), datetime.date(2016, 3, 3), 2016))
+    amendments = client.filings.recent_amendments(2016)
+    index = AmendmentIndex.from_filings(filings)
+    index.update(amendments)
+
+    for amendment in amendments:
+        assert index.current(amendment['filing_id']) is not None
+        if amendment['original_filing']:
+            assert index.current(amendment['original_filing']) is index.current(amendment['filing_id'])
+
+
+def test_latest_by_date_range_yields_versions(client):
+    versions = list(client.filings.latest_by_date_range(datetime.date(2016, 3, 1), datetime.date(2016, 3, 3), 2016))
+    assert versions
+    assert all(isinstance(version, Version) for version in versions)
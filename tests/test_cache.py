@@ -0,0 +1,62 @@
+from campaign_finance import CampaignFinance, ResponseCache
+
+IDS = ('P60007168', 'P60007169', 'P60007170')
+
+
+def cached_client(api, cache):
+    return CampaignFinance('key', cache=cache, base_uri=api.url, limiter=False)
+
+
+def entry_sizes(api):
+    cache = ResponseCache(None)
+    client = cached_client(api, cache)
+    sizes = []
+    for fec_id in IDS:
+        before = cache.memory.size
+        client.candidates.get(fec_id, 2016)
+        sizes.append(cache.memory.size - before)
+    return sizes
+
+
+def test_least_recently_used_entry_is_evicted(api):
+    a, b, c = entry_sizes(api)
+    cache = ResponseCache(None, memory_bytes=a + c)
+    client = cached_client(api, cache)
+
+    client.candidates.get(IDS[0], 2016)
+    client.candidates.get(IDS[1], 2016)
+    client.candidates.get(IDS[0], 2016)
+    client.candidates.get(IDS[2], 2016)
+    assert cache.stats()['memory_evictions'] == 1
+    assert cache.memory.size == a + c
+
+    requests = api.requests
+    client.candidates.get(IDS[0], 2016)
+    client.candidates.get(IDS[2], 2016)
+    assert api.requests == requests
+    client.candidates.get(IDS[1], 2016)
+    assert api.requests == requests + 1
+
+
+def test_evicted_entries_are_served_from_disk(api, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), memory_bytes=1)
+    client = cached_client(api, cache)
+
+    first = client.candidates.get(IDS[0], 2016)
+    requests = api.requests
+    assert client.candidates.get(IDS[0], 2016) == first
+    assert api.requests == requests
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_expired_entries_are_revalidated_with_their_etag(api):
+    cache = ResponseCache(None, default_ttl=0)
+    client = cached_client(api, cache)
+
+    first = client.candidates.get(IDS[0], 2016)
+    assert cache.get(client.candidates.BASE_URI + '2016/candidates/{0}.json'.format(IDS[0])) is None
+    assert cache.stale(client.candidates.BASE_URI + '2016/candidates/{0}.json'.format(IDS[0])).etag
+
+    assert client.candidates.get(IDS[0], 2016) == first
+    assert api.requests == 2
+    assert cache.stats()['revalidations'] == 1
@@ -0,0 +1,46 @@
+from campaign_finance import EntityGraph
+from campaign_finance.graph import Spending
+
+CANDIDATE = 'P60007168'
+
+
+def expenditure(committee, candidate, side, amount, uid, **race):
+    item = {'fec_committee_id': committee, 'fec_candidate_id': candidate,
+            'support_or_oppose': side, 'amount': amount, 'unique_id': uid}
+    item.update(race)
+    return item
+
+
+def test_repeated_expenditures_are_counted_once():
+    graph = EntityGraph(None, 2016)
+    graph.add_expenditures([
+        expenditure('C1', 'H6TX01000', 'S', 10, 'a', office='H', state='TX', district='01'),
+        expenditure('C1', 'H6TX01000', 'O', 3, 'b'),
+        expenditure('C1', 'H6TX01000', 'O', 3, 'b'),
+        expenditure('C2', 'H6TX01000', 'S', 50, 'c'),
+        expenditure('C2', 'S6OH00000', 'S', 5, 'd', office='S', state='OH'),
+    ])
+    graph.add_expenditures([expenditure('C2', 'H6TX01000', 'S', 50, 'c')])
+
+    assert graph.edges == 3
+    assert graph.spending('C1', 'H6TX01000') == Spending(10.0, 3.0)
+    assert graph.top_spenders('H6TX01000', fetch=False) == [('C2', Spending(50.0, 0.0)),
+                                                           ('C1', Spending(10.0, 3.0))]
+    assert graph.path('C1', 'S6OH00000') == ['C1', 'H6TX01000', 'C2', 'S6OH00000']
+    assert graph.race('H6TX01000', False) == ('TX', 'house', 1)
+
+
+def test_refetched_expenditures_do_not_double_count(api, client):
+    graph = client.graph(2016)
+    spenders = graph.neighbours(CANDIDATE)
+    assert spenders
+    edges = graph.edges
+
+    graph.add_expenditures(client.independent_spending.iter_by_candidate(CANDIDATE, 2016))
+    assert graph.neighbours(CANDIDATE, fetch=False) == spenders
+    assert graph.edges == edges
+
+    # expanding again costs no requests
+    requests = api.requests
+    assert graph.top_spenders(CANDIDATE, 3) == graph.top_spenders(CANDIDATE, 3, fetch=False)
+    assert api.requests == requests
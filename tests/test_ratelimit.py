@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from campaign_finance import BACKGROUND, INTERACTIVE, CampaignFinance, QuotaExceeded, RateLimiter
+
+
+def queue_up(limiter, priority, names, served):
+    threads = []
+    for name in names:
+        def take(name=name):
+            limiter.acquire(priority)
+            served.append(name)
+        threads.append(threading.Thread(target=take))
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def wait_for_waiters(limiter, n):
+    deadline = time.time() + 5
+    while len(limiter._waiters) < n and time.time() < deadline:
+        time.sleep(0.001)
+    assert len(limiter._waiters) >= n
+
+
+def test_interactive_callers_jump_the_queue():
+    limiter = RateLimiter(rate=20, burst=1)
+    limiter.tokens = 0
+    served = []
+
+    threads = queue_up(limiter, BACKGROUND, ['bg%d' % i for i in range(5)], served)
+    wait_for_waiters(limiter, 5)
+    threads += queue_up(limiter, INTERACTIVE, ['fg%d' % i for i in range(3)], served)
+    for thread in threads:
+        thread.join()
+
+    assert sorted(served) == ['bg%d' % i for i in range(5)] + ['fg%d' % i for i in range(3)]
+    # at most one background caller already holding the head of the queue goes first
+    assert set(served[:4]) >= {'fg0', 'fg1', 'fg2'}
+    assert limiter._waiters == []
+
+
+def test_shared_daily_quota(api):
+    limiter = RateLimiter(rate=100, daily=3)
+    web = CampaignFinance('key', cache=None, base_uri=api.url, limiter=limiter, priority=INTERACTIVE)
+    backfill = CampaignFinance('key', cache=None, base_uri=api.url, limiter=limiter, priority=BACKGROUND)
+
+    web.candidates.get('P60007168', 2016)
+    backfill.committees.get('C00575795', 2016)
+    web.committees.get('C00575796', 2016)
+    with pytest.raises(QuotaExceeded):
+        backfill.candidates.get('P60007169', 2016)
+    assert api.requests == 3
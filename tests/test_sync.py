@@ -0,0 +1,34 @@
+import json
+
+from campaign_finance.sync import NEW
+
+
+def test_marks_are_saved_only_after_a_feed_is_consumed(client):
+    sync = client.sync(cycle=2016)
+
+    feed = sync.poll(['amendments'])
+    first = next(feed)
+    assert first.feed == 'amendments' and first.kind == NEW
+    feed.close()
+    assert sync.state.feed('amendments') == (None, {})
+
+    # stopping early loses nothing: the next poll yields the feed again
+    changes = list(sync.poll(['amendments']))
+    assert changes[0] == first
+    assert len(changes) == len(set(change.key for change in changes)) > 1
+
+    mark, index = sync.state.feed('amendments')
+    assert mark == max(int(change.key) for change in changes)
+    assert set(index) == set(change.key for change in changes)
+    assert list(sync.poll(['amendments'])) == []
+
+
+def test_state_survives_a_restart(client, tmp_path):
+    path = str(tmp_path / 'sync.json')
+    changes = list(client.sync(state=path, cycle=2016).poll(['committees']))
+    assert changes
+
+    with open(path) as f:
+        saved = json.load(f)
+    assert len(saved['committees']['seen']) == len(changes)
+    assert list(client.sync(state=path, cycle=2016).poll(['committees'])) == []
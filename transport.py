@@ -0,0 +1,44 @@
+"""
+The httplib2 transport clients build for themselves
+
+httplib2 decompresses gzipped responses before returning them, so the
+body a client sees is larger than what crossed the network. ``Http``
+records the size on the wire, so that Stats can report bandwidth saved
+by compression and revalidation. Imported on first use, with httplib2.
+"""
+import httplib2
+
+
+class Http(httplib2.Http):
+    """
+    An httplib2.Http that sets ``transferred`` to the number of body bytes
+    read from the network for the last request: the compressed size for
+    gzipped responses, and 0 when httplib2's own cache answered it.
+    Not thread-safe, like httplib2.Http; each worker has its own.
+    """
+
+    transferred = 0
+
+    def request(self, *args, **kwargs):
+        self.transferred = 0
+        return super(Http, self).request(*args, **kwargs)
+
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        if not getattr(conn, '_counted', False):
+            conn.getresponse = self._counting(conn.getresponse)
+            conn._counted = True
+        return super(Http, self)._conn_request(conn, request_uri, method, body, headers)
+
+    def _counting(self, getresponse):
+        def counted():
+            response = getresponse()
+            read = response.read
+
+            def read_counted(*args):
+                data = read(*args)
+                self.transferred += len(data)
+                return data
+
+            response.read = read_counted
+            return response
+        return counted
@@ -2,9 +2,19 @@
 Utility functions and error classes used throughout client classes
 """
 import datetime
+import json
 import math
 import six
 
+# decode JSON straight from response bytes, with the fastest backend installed
+try:
+    from orjson import loads
+except ImportError:
+    try:
+        from ujson import loads
+    except ImportError:
+        loads = json.loads
+
 
 class CampaignFinanceError(Exception):
     """
@@ -23,26 +33,46 @@ class NotFound(CampaignFinanceError):
     """
 
 
+class QuotaExceeded(CampaignFinanceError):
+    """
+    Exception for requests beyond the client-side daily quota
+    """
+
+
+FIRST_CYCLE = 1996
+
+
 def get_cycle(year):
     "Return the most recent Campaign Finance cycle for a given year"
-    if year < 1996:
+    if year < FIRST_CYCLE:
         raise CampaignFinanceError('The CampaignFinance API only supports even-numbered years from 1996 to the present.')
 
     return year - (year % 2)
 
 
+_parse = None
+
+
 def parse_date(s):
     """
     Parse a date using dateutil.parser.parse if available,
     falling back to datetime.datetime.strptime if not
     """
+    global _parse
     if isinstance(s, (datetime.datetime, datetime.date)):
         return s
+    if _parse is None:
+        _parse = _date_parser()
+    return _parse(s)
+
+
+def _date_parser():
+    "Find the date parser once, on first use"
     try:
         from dateutil.parser import parse
     except ImportError:
         parse = lambda d: datetime.datetime.strptime(d, "%Y-%m-%d")
-    return parse(s)
+    return parse
 
 
 def u(text, encoding='utf-8'):